@@ -0,0 +1,68 @@
+"""
+Rows/sec benchmark: to_sql(method='multi') vs the COPY-based upload_to_postgres.
+
+Parses a sample report, repeats it up to --rows, and loads it into a scratch
+table with both paths. Uses the PG_* settings from .env, so point it at a
+throwaway database.
+
+    python -m benchmarks.bench_uploader --pipeline inbound_shipments --rows 100000
+"""
+import argparse
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from etl.daily_detail_sales_etl import run_etl as run_sales_etl
+from etl.inbound_shipments_etl import run_etl as run_shipments_etl
+from etl.daily_sales_tax_etl import run_etl as run_sales_tax_etl
+from utils.postgres_uploader import get_engine, upload_to_postgres
+
+SAMPLES = {
+    "daily_detail_sales": (run_sales_etl, "data_files/daily_detail_sales/234707234 DAILYSALES.txt"),
+    "inbound_shipments": (run_shipments_etl, "data_files/inbound_shipments/IncomingInvReportNew.tsv"),
+    "daily_sales_tax": (run_sales_tax_etl, "data_files/daily_sales_tax/salestaxnightly_4_20250529.txt"),
+}
+
+def build_frame(pipeline, rows):
+    etl_function, sample_path = SAMPLES[pipeline]
+    sample = etl_function(sample_path)
+    repeats = -(-rows // len(sample))
+    return pd.concat([sample] * repeats, ignore_index=True).head(rows)
+
+def time_load(label, load, df, table_name):
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+    df.head(0).to_sql(table_name, con=engine, index=False)
+
+    start = time.perf_counter()
+    load(df, table_name)
+    elapsed = time.perf_counter() - start
+
+    with engine.begin() as conn:
+        loaded = conn.execute(text(f'SELECT COUNT(*) FROM "{table_name}"')).scalar()
+        conn.execute(text(f'DROP TABLE "{table_name}"'))
+
+    print(f"{label:<10} {loaded:>10,} rows  {elapsed:8.2f}s  {loaded / elapsed:12,.0f} rows/sec")
+    return elapsed
+
+def insert_multi(df, table_name):
+    df.to_sql(table_name, con=get_engine(), index=False, if_exists="append", method="multi")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipeline", choices=SAMPLES, default="inbound_shipments")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.pipeline, args.rows)
+    table_name = f"bench_{args.pipeline}"
+    print(f"\n📊 Loading {len(df):,} rows of {args.pipeline} into {table_name}")
+
+    multi = time_load("to_sql", insert_multi, df, table_name)
+    copy = time_load("COPY", upload_to_postgres, df, table_name)
+    print(f"⚡ COPY speedup: {multi / copy:.1f}x")
+
+if __name__ == "__main__":
+    main()
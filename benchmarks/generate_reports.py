@@ -0,0 +1,285 @@
+"""
+Synthetic report generator for the three incoming formats.
+
+Writes files that match the layout of the samples in data_files/ at any size:
+
+- daily_detail_sales: "For Store No:" preamble, one "MM/DD/YY Transaction Totals:"
+  marker per business day, and the card/tax summary with its "* Indicates" footer
+- inbound_shipments: IncomingInvReportNew-style TSV with pre-header lines before
+  the "Vendor No" header
+- daily_sales_tax: salestaxnightly file with its two-row banner and grand totals
+
+Rows are generated in vectorized blocks of BLOCK_ROWS, so memory stays flat up
+to 10M-row files.
+
+    python -m benchmarks.generate_reports --format all --rows 10000 100000 --out benchmarks/data
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 200_000
+
+DETAIL_COLUMNS = [
+    "Customer Name (ID)", "Trns No", "Online Trans", "Trans Desc", "Taxable Merch",
+    "Non Taxable Merch", "Taxable Non-Merch", "Non Tax Non Merch", "Restock Charge",
+    "Sales Tax", "Cash Amount", "Check Amount", "Bank Card Amt", "Payment Type Code",
+    "Refund Amount", "Applied Amount", "Adjusted Amount", "A/R Amount", "Exchange",
+    "Financed", "Exception",
+]
+
+INBOUND_COLUMNS = [
+    "Vendor No", "Stock No", "Product Name", "Division", "Dept", "ETA Week",
+    "ETA Date", "Rqst Ship Date", "Confirm Date", "Qty", "Po No", "Container No",
+    "Confirmation No", "Last Cost", "Item Create Date", "Avail Qty", "Report Date", "PO Create Date",
+]
+
+SALES_TAX_COLUMNS = [
+    "Store No", "Customer Name (ID)", "Trns No", "Trns Date", "Online Trans", "Org Inv No",
+    "Trans Desc", "Sales Tax Rate", "Delivery Address 1", "Delivery Address 2", "Delivery City",
+    "Delivery State", "Delivery Zip Code", "Taxable Merch", "Non Taxable Merch",
+    "Taxable Non-Merch", "Non Tax Non Merch", "Restock Charge", "Sales Tax",
+]
+
+LAST_NAMES = np.array(["Kojic", "Beach", "Byall", "Bohn", "Aaron", "Mackie", "Gold", "Olack",
+                       "Young", "Felix", "Mehta", "Nagle", "Soares", "Brye", "Ormsby", "Patel"])
+FIRST_NAMES = np.array(["Snezana", "Pamela", "Carol", "Frederik", "Nelson", "Leah", "Joan",
+                        "Madelyn", "Brandon", "Inri", "Puneet", "Robert", "Silvana", "Susan"])
+TRANS_DESCS = np.array(["Mrch Sale", "Mrch Sale", "Mrch Sale", "Mrch Return", "Payment",
+                        "Rtn Payment", "Exch Merch Pending"])
+PAYMENT_CODES = np.array(["V", "M", "A", "D", "P", "Z", ""])
+CITIES = np.array([("LOS ANGELES", "90045"), ("SANTA MONICA", "90403"), ("CULVER CITY", "90230"),
+                   ("MARINA DEL REY", "90292"), ("W. HOLLYWOOD", "90069"), ("PHOENIX", "85004")])
+VENDORS = np.array(["A04", "B11", "C07", "D22", "S13", "T05"])
+DIVISIONS = np.array(["DI", "DC"])
+DEPTS = np.array(["ACC", "WALL", "LIV", "BED", "DIN", "OUT"])
+PRODUCTS = np.array(["COOPER PILLOW 20X20", "COOPER THROW", "ULIN 48\" WALNUT SHELF",
+                     "ULIN 60\" WHITE OAK SHELF", "HUGO SOFA", "ANDO DINING TABLE"])
+
+def _blocks(rows, block_rows=BLOCK_ROWS):
+    for start in range(0, rows, block_rows):
+        yield start, min(block_rows, rows - start)
+
+def _money(values, blank_mask=None):
+    """Format amounts like the exports do: whole numbers without decimals, blanks for empty."""
+    values = np.round(np.asarray(values, dtype=float), 2)
+    whole = values == np.floor(values)
+    text = np.where(whole, values.astype(np.int64).astype(str), values.astype(str)).astype(object)
+    if blank_mask is not None:
+        text[blank_mask] = ""
+    return text
+
+def _fixed2(values):
+    return np.char.mod("%.2f", np.asarray(values, dtype=float))
+
+def _join(frame):
+    """Tab-join every column of a string DataFrame into one line per row."""
+    columns = [frame[col].astype(str) for col in frame.columns]
+    return columns[0].str.cat(columns[1:], sep="\t")
+
+def _line(width, *cells, at=0):
+    """A row of `width` tab-separated fields with `cells` placed from field `at`."""
+    fields = [""] * width
+    fields[at:at + len(cells)] = [str(cell) for cell in cells]
+    return "\t".join(fields)
+
+def _dates(rng, n, base, spread, fmt="%m/%d/%y"):
+    """Random dates around `base`, formatted once per distinct day and looked up."""
+    days = pd.date_range(pd.Timestamp(base) - pd.Timedelta(days=spread), periods=2 * spread)
+    lookup = np.array(days.strftime(fmt), dtype=object)
+    return lookup[rng.integers(0, 2 * spread, n)]
+
+def _customers(rng, n):
+    last = rng.choice(LAST_NAMES, n)
+    first = rng.choice(FIRST_NAMES, n)
+    ids = rng.integers(1_000_000, 9_999_999, n).astype(str)
+    return pd.Series(last).str.cat([pd.Series(first)], sep=", ").str.cat(
+        [pd.Series(ids)], sep=" (") + ")"
+
+def _totals_line(fields, day, payment_code):
+    """A daily detail "MM/DD/YY Transaction Totals:" marker row."""
+    return _line(fields, f"{day:%m/%d/%y} Transaction Totals:", "", "", "",
+                 *["0"] * 9, payment_code, *["0"] * 4)
+
+def generate_daily_detail(path, rows, seed=0, store_no=20, rows_per_day=500, start=date(2025, 1, 1)):
+    rng = np.random.default_rng(seed)
+    fields = len(DETAIL_COLUMNS)
+
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(_line(fields, f"For Store No: {store_no}", at=4) + "\n")
+        f.write(_line(fields) + "\n")
+        f.write("\t".join(DETAIL_COLUMNS) + "\n")
+
+        trns_no = 30_000
+        for block_start, n in _blocks(rows):
+            merch = -rng.integers(20, 5000, n).astype(float)
+            tax = np.round(merch * 0.086, 2)
+            is_sale = rng.random(n) < 0.8
+            ar_flag = rng.random(n) < 0.03
+
+            block = pd.DataFrame({
+                "Customer Name (ID)": '"' + _customers(rng, n) + '"',
+                "Trns No": np.arange(trns_no, trns_no + n).astype(str),
+                "Online Trans": rng.choice(["Y", "N"], n),
+                "Trans Desc": rng.choice(TRANS_DESCS, n),
+                "Taxable Merch": _money(merch, ~is_sale),
+                "Non Taxable Merch": "",
+                "Taxable Non-Merch": "",
+                "Non Tax Non Merch": _money(-rng.choice([0, 149, 299], n).astype(float), rng.random(n) < 0.8),
+                "Restock Charge": "",
+                "Sales Tax": _money(tax, ~is_sale),
+                "Cash Amount": "",
+                "Check Amount": "",
+                "Bank Card Amt": _money(-(merch + tax)),
+                "Payment Type Code": rng.choice(PAYMENT_CODES, n),
+                "Refund Amount": "",
+                "Applied Amount": "",
+                "Adjusted Amount": "",
+                "A/R Amount": np.where(ar_flag, "0.00 *", "0"),
+                "Exchange": "",
+                "Financed": "",
+                "Exception": "",
+            })
+            trns_no += n
+            lines = _join(block)
+
+            # Close each business day with a blank row and its "Transaction Totals:" marker
+            position = block_start + np.arange(n) + 1
+            for row in np.flatnonzero((position % rows_per_day == 0) | (position == rows)):
+                day = start + timedelta(days=int((position[row] - 1) // rows_per_day))
+                lines.iat[row] += "\n" + _line(fields) + "\n" + _totals_line(fields, day, "V")
+            f.write("\n".join(lines) + "\n")
+
+        last_day = start + timedelta(days=max(rows - 1, 0) // rows_per_day)
+        f.write("\n".join([
+            _line(fields),
+            _line(fields, "    Sales Tax Detail Info", at=4),
+            _line(fields, "8.6", "0", at=4),
+            _line(fields),
+            _line(fields, "Credit Card Detail Info - Total....", "", "Credit Card Detail Info - Online....", "",
+                  "Credit Card Detail Info - Store....", at=4),
+            _line(fields, "Master Card", "0", "Master Card - Online", "0", "Master Card - Store", "0", at=4),
+            _line(fields, "Visa", "0", "Visa - Online", "0", "Visa - Store", "0", at=4),
+            _line(fields),
+            _line(fields, "Mngr's Signature:  ______________________________", at=4),
+            _line(fields, "Report Grand Totals:", at=4),
+            _totals_line(fields, last_day, "Z"),
+            _line(fields),
+            _line(fields, "* Indicates an AR subtotal for transactions that have multiple checks and/or credit cards.", at=4),
+        ]) + "\n")
+
+def generate_inbound_shipments(path, rows, seed=0, report_date=date(2025, 5, 16)):
+    rng = np.random.default_rng(seed)
+
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("Incoming Inventory Report\n")
+        f.write(f"Run Date: {report_date:%m/%d/%Y}\n\n")
+        f.write("\t".join(INBOUND_COLUMNS) + "\n")
+
+        for _, n in _blocks(rows):
+            vendor = rng.choice(VENDORS, n)
+            block = pd.DataFrame({
+                "Vendor No": vendor,
+                "Stock No": pd.Series(rng.integers(1000, 9999, n).astype(str)) + "-20/FG",
+                "Product Name": rng.choice(PRODUCTS, n),
+                "Division": rng.choice(DIVISIONS, n),
+                "Dept": rng.choice(DEPTS, n),
+                "ETA Week": rng.integers(20, 52, n).astype(str),
+                "ETA Date": _dates(rng, n, "2025-08-11", 90),
+                "Rqst Ship Date": _dates(rng, n, "2025-08-04", 90),
+                "Confirm Date": np.where(rng.random(n) < 0.5, "", _dates(rng, n, "2025-05-26", 30)),
+                "Qty": rng.integers(1, 300, n).astype(str),
+                "Po No": rng.integers(166_000, 167_000, n).astype(str),
+                "Container No": np.where(rng.random(n) < 0.6, "", rng.integers(10_000, 99_999, n).astype(str)),
+                "Confirmation No": rng.choice(["OCDI", "OC", "OCDC", "OC91-25 DI"], n),
+                "Last Cost": np.where(rng.random(n) < 0.3, "", np.round(rng.random(n) * 300, 2).astype(str)),
+                "Item Create Date": _dates(rng, n, "2024-12-11", 180),
+                "Avail Qty": rng.integers(0, 10, n).astype(str),
+                "Report Date": f"{report_date:%m/%d/%y}",
+                "PO Create Date": _dates(rng, n, "2025-02-25", 60),
+            })
+            f.write("\n".join(_join(block)) + "\n")
+
+def generate_sales_tax(path, rows, seed=0, store_no=4, trns_date=date(2025, 1, 15)):
+    rng = np.random.default_rng(seed)
+    # Every salestaxnightly row ends with a trailing tab, i.e. one empty extra field
+    fields = len(SALES_TAX_COLUMNS) + 1
+
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(_line(fields, f"For Store No: {store_no}", at=13) + "\n")
+        f.write(_line(fields) + "\n")
+        f.write(_line(fields, *SALES_TAX_COLUMNS) + "\n")
+
+        trns_no = 661_000
+        for _, n in _blocks(rows):
+            is_sale = rng.random(n) < 0.7
+            merch = -rng.integers(20, 5000, n).astype(float)
+            city = CITIES[rng.integers(0, len(CITIES), n)]
+            block = pd.DataFrame({
+                "Store No": str(store_no),
+                "Customer Name (ID)": _customers(rng, n),
+                "Trns No": np.arange(trns_no, trns_no + n).astype(str),
+                "Trns Date": f"{trns_date:%m/%d/%Y}",
+                "Online Trans": rng.choice(["Y", "N"], n),
+                "Org Inv No": "",
+                "Trans Desc": np.where(is_sale, "Mrch Sale", "Payment"),
+                "Sales Tax Rate": np.where(is_sale, "09.50000", ""),
+                "Delivery Address 1": pd.Series(rng.integers(100, 20000, n).astype(str)) + " MAIN ST",
+                "Delivery Address 2": np.where(rng.random(n) < 0.3, "UNIT 206", ""),
+                "Delivery City": city[:, 0],
+                "Delivery State": "CA",
+                "Delivery Zip Code": city[:, 1],
+                "Taxable Merch": np.where(is_sale, _fixed2(merch), ""),
+                "Non Taxable Merch": "",
+                "Taxable Non-Merch": "",
+                "Non Tax Non Merch": "",
+                "Restock Charge": "",
+                "Sales Tax": np.where(is_sale, _fixed2(merch * 0.095), ""),
+            })
+            trns_no += n
+            f.write("\n".join(_join(block) + "\t") + "\n")
+
+        f.write("\n".join([
+            _line(fields),
+            _line(fields, "Report Grand Totals:", at=13),
+            _line(fields, store_no, *[""] * 12, *["0.00"] * 6),
+            _line(fields),
+            _line(fields, "    Sales Tax Detail Info", at=13),
+            _line(fields, "09.50000", "0.00", at=13),
+        ]) + "\n")
+
+GENERATORS = {
+    "daily_detail_sales": (generate_daily_detail, "{rows} - Synthetic Daily Detail.txt"),
+    "inbound_shipments": (generate_inbound_shipments, "IncomingInvReport_{rows}.tsv"),
+    "daily_sales_tax": (generate_sales_tax, "salestaxnightly_synthetic_{rows}.txt"),
+}
+
+def generate(pipeline, rows, out_dir, seed=0, overwrite=False):
+    """Write one synthetic file (reusing an existing one unless `overwrite`) and return its path."""
+    generator, name = GENERATORS[pipeline]
+    folder = os.path.join(out_dir, pipeline)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name.format(rows=rows))
+    if overwrite or not os.path.exists(path):
+        generator(path, rows, seed=seed)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=[*GENERATORS, "all"], default="all")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--out", default=os.path.join("benchmarks", "data"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pipelines = list(GENERATORS) if args.format == "all" else [args.format]
+    for pipeline in pipelines:
+        for rows in args.rows:
+            path = generate(pipeline, rows, args.out, seed=args.seed, overwrite=True)
+            print(f"📝 {pipeline}: {rows:,} rows -> {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Benchmark harness for the three pipelines.
+
+For each format and size, generates a synthetic report (see generate_reports.py),
+then times run_etl and the upload separately in a fresh child process so peak RSS
+is per case, with the per-stage breakdown from utils.metrics. The upload is the one
+loaders use for a parsed file: its days' partitions are created, each chunk is
+COPYed into its partition and the store-day rollup is upserted. Uploads go to a
+throwaway database created from sql/ with the PG_* credentials from .env, and
+dropped afterwards.
+
+    python -m benchmarks.run_benchmarks --rows 10000 100000 --output bench.json
+    python -m benchmarks.run_benchmarks --rows 100000 --baseline bench.json
+
+With --baseline, any stage whose rows/sec fell by more than --tolerance is
+reported as a regression and the exit code is 1.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from benchmarks.generate_reports import GENERATORS, generate
+from utils.metrics import STAGES, finish_run, peak_rss_mb, stage, start_run
+
+load_dotenv()
+
+SQL_FOLDER = "sql"
+
+def admin_connection():
+    conn = psycopg2.connect(
+        dbname="postgres",
+        user=os.getenv("PG_USER"),
+        password=os.getenv("PG_PASSWORD"),
+        host=os.getenv("PG_HOST", "localhost"),
+        port=os.getenv("PG_PORT", "5432"),
+    )
+    conn.autocommit = True
+    return conn
+
+def create_scratch_database(name):
+    conn = admin_connection()
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        cur.execute(f'CREATE DATABASE "{name}"')
+    conn.close()
+
+    conn = psycopg2.connect(
+        dbname=name,
+        user=os.getenv("PG_USER"),
+        password=os.getenv("PG_PASSWORD"),
+        host=os.getenv("PG_HOST", "localhost"),
+        port=os.getenv("PG_PORT", "5432"),
+    )
+    with conn, conn.cursor() as cur:
+        for script in sorted(glob.glob(os.path.join(SQL_FOLDER, "create_*.sql"))):
+            with open(script, encoding="utf-8") as f:
+                cur.execute(f.read())
+    conn.close()
+
+def drop_scratch_database(name):
+    conn = admin_connection()
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+    conn.close()
+
+def reset_tables(conn, pipeline):
+    """Empty the pipeline's table and rollup and drop its partitions, so every case starts alike."""
+    from utils.postgres_uploader import quote_ident
+    from utils.rollups import ROLLUPS
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+                    (quote_ident(pipeline),))
+        for (partition,) in cur.fetchall():
+            cur.execute(f"DROP TABLE {partition}")
+        cur.execute(f"TRUNCATE {quote_ident(pipeline)}")
+        if pipeline in ROLLUPS:
+            cur.execute(f"TRUNCATE {quote_ident(ROLLUPS[pipeline]['table'])}")
+    conn.commit()
+
+def run_case(pipeline, file_path, upload, results):
+    """Child process: time one file through run_etl and, optionally, the upload."""
+    # Imported here so each case starts from a fresh interpreter with the scratch PG_DATABASE
+    from etl_runner import pipeline_map
+    from utils.partitions import prepare_partitions, upload_to_partitions
+    from utils.postgres_uploader import pooled_connection
+    from utils.rollups import has_rollup, upsert_rollup
+    from utils.staged_load import frame_chunks
+
+    result = {"pipeline": pipeline, "file_mb": os.path.getsize(file_path) / 1e6}
+    start_run(pipeline, os.path.basename(file_path))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = pipeline_map[pipeline](file_path)
+    result["parse_s"] = time.perf_counter() - start
+    result["rows"] = 0 if df is None else len(df)
+    result["parse_peak_rss_mb"] = peak_rss_mb()
+
+    if upload and result["rows"]:
+        start = time.perf_counter()
+        with pooled_connection() as conn, stage("upload"), contextlib.redirect_stdout(io.StringIO()):
+            prepare_partitions(df, pipeline)
+            upload_to_partitions(frame_chunks(df), pipeline, conn)
+            if has_rollup(pipeline):
+                upsert_rollup(conn, pipeline, df)
+            conn.commit()
+        result["upload_s"] = time.perf_counter() - start
+
+        with pooled_connection() as conn:
+            reset_tables(conn, pipeline)
+
+    run = finish_run("success", result["rows"])
+    result["stages"] = run["stages"]
+    result["peak_rss_mb"] = peak_rss_mb()
+    results.put(result)
+
+def rate(result, stage):
+    seconds = result.get(f"{stage}_s")
+    return result["rows"] / seconds if seconds else None
+
+def print_report(results):
+    print(f"\n{'pipeline':<20} {'rows':>10} {'MB':>8} {'parse s':>8} {'parse r/s':>11} "
+          f"{'upload s':>9} {'upload r/s':>11} {'total r/s':>10} {'peak MB':>8}")
+    for r in results:
+        upload_s = r.get("upload_s")
+        total_s = r["parse_s"] + (upload_s or 0)
+        print(f"{r['pipeline']:<20} {r['rows']:>10,} {r['file_mb']:>8.1f} {r['parse_s']:>8.2f} "
+              f"{rate(r, 'parse') or 0:>11,.0f} {upload_s or 0:>9.2f} {rate(r, 'upload') or 0:>11,.0f} "
+              f"{r['rows'] / total_s if total_s else 0:>10,.0f} {r['peak_rss_mb']:>8.0f}")
+
+    print(f"\n{'pipeline':<20} {'rows':>10} " + " ".join(f"{name + ' s':>11}" for name in STAGES))
+    for r in results:
+        stages = r.get("stages", {})
+        print(f"{r['pipeline']:<20} {r['rows']:>10,} "
+              + " ".join(f"{stages.get(name, 0):>11.3f}" for name in STAGES))
+
+def compare(results, baseline_path, tolerance):
+    """Return human-readable regressions against a previous --output file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["pipeline"], r["target_rows"]): r for r in json.load(f)}
+
+    regressions = []
+    for r in results:
+        old = baseline.get((r["pipeline"], r["target_rows"]))
+        if not old:
+            continue
+        for stage in ("parse", "upload"):
+            new_rate, old_rate = rate(r, stage), rate(old, stage)
+            if new_rate and old_rate and new_rate < old_rate * (1 - tolerance):
+                regressions.append(f"{r['pipeline']} @ {r['target_rows']:,} rows: {stage} "
+                                   f"{old_rate:,.0f} -> {new_rate:,.0f} rows/s")
+        if r["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{r['pipeline']} @ {r['target_rows']:,} rows: peak RSS "
+                               f"{old['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=[*GENERATORS, "all"], default="all")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--data", default=os.path.join("benchmarks", "data"),
+                        help="where generated files are cached between runs")
+    parser.add_argument("--no-upload", action="store_true", help="only time run_etl")
+    parser.add_argument("--keep-db", action="store_true", help="keep the scratch database afterwards")
+    parser.add_argument("--output", help="write results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed fractional slowdown before flagging a regression (default 0.2)")
+    args = parser.parse_args()
+
+    pipelines = list(GENERATORS) if args.format == "all" else [args.format]
+    scratch_db = f"etl_bench_{os.getpid()}"
+
+    if not args.no_upload:
+        create_scratch_database(scratch_db)
+        os.environ["PG_DATABASE"] = scratch_db
+        print(f"🧪 Scratch database: {scratch_db}")
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for pipeline in pipelines:
+            for rows in args.rows:
+                file_path = generate(pipeline, rows, args.data)
+                print(f"⏱️ {pipeline}: {rows:,} rows")
+
+                queue = context.Queue()
+                child = context.Process(target=run_case, args=(pipeline, file_path, not args.no_upload, queue))
+                child.start()
+                child.join()
+                if child.exitcode != 0:
+                    print(f"❌ {pipeline} @ {rows:,} rows failed (exit code {child.exitcode})")
+                    continue
+
+                result = queue.get()
+                result["target_rows"] = rows
+                results.append(result)
+    finally:
+        if not args.no_upload and not args.keep_db:
+            drop_scratch_database(scratch_db)
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"🐢 Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
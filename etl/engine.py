@@ -0,0 +1,414 @@
+import csv
+import mmap
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.cleaning import collapse_whitespace, parse_dates, strip_asterisks
+from utils.metrics import add_bytes, stage, timed_iter, timed_reader
+
+# One reader for every report, driven by a per-pipeline spec (SPEC in each etl module).
+#
+# A spec is a plain dict:
+#   name        pipeline / table name, for messages
+#   header      substrings that together identify the header line
+#   footer      optional text of the first line after the data; reading stops there
+#   skip_lines  optional regex for lines inside the data that are not rows (summaries)
+#   preamble    {name: {"pattern", "default"}}: values captured from lines above the header
+#   columns     {report header: {"name", "type", ...}} in report order. Only these
+#               columns are read. type is "text", "numeric", "integer" or "date";
+#               options: "format" (date), "fill", "flip_sign", "strip_asterisks",
+#               "category" (text with few distinct values, see LOW_MEMORY)
+#   missing     "fill" adds absent columns as blanks, "abort" rejects the file
+#   markers     {name: {"column", "pattern", "format"}}: a date read from marker rows
+#               (e.g. "01/28/25 Transaction Totals:") and back-filled onto the rows above
+#   required    columns that must hold a value; other rows are dropped
+#   derived     {name: [columns to add up]}, computed in order
+#   constants   {name: context key}; keys are "filename", "today" and the preamble names
+#   collapse_whitespace  collapse whitespace runs in text values
+#
+# Header names are matched after one normalization (printable characters, single
+# spaces, case-insensitive). Numeric columns are typed by the C parser while it
+# tokenizes, so there is no conversion pass afterwards and no object column for
+# them. If a value does not parse, the file is re-read from where it failed with
+# those columns as text and coerced to numbers, blanking what does not parse.
+# Dates are read as text and parsed with their declared format, once per distinct
+# string per file (parse_dates); values that do not match are counted and blanked.
+
+# Rows parsed per chunk; bounds peak memory regardless of file size
+CHUNK_ROWS = 50_000
+
+# Low-memory mode: "category" text columns and text constants are held as pandas
+# categoricals (one small array of codes plus the distinct strings) from parsing
+# through COPY and the Parquet archive, instead of one Python string per row.
+LOW_MEMORY = os.getenv("ETL_LOW_MEMORY", "").lower() in ("1", "true", "yes")
+
+READ_DTYPES = {"text": str, "numeric": "float64", "integer": "Int64", "date": str}
+
+# === Column specs ===
+def text(name, **options):
+    return {"name": name, "type": "text", **options}
+
+def numeric(name, **options):
+    return {"name": name, "type": "numeric", **options}
+
+def integer(name, **options):
+    return {"name": name, "type": "integer", **options}
+
+def date(name, date_format):
+    return {"name": name, "type": "date", "format": date_format}
+
+# === Locating the data ===
+def header_key(name):
+    """Normalize a header name for matching: printable only, single spaces, any case."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\x20-\x7E]", "", str(name))).strip().casefold()
+
+def _find_footer(mm, footer, start, encoding):
+    """Byte offset of the line holding the first `footer` after `start`, or None."""
+    if not footer:
+        return None
+    position = mm.find(footer.encode(encoding), start)
+    if position < 0:
+        return None
+    return mm.rfind(b"\n", start, position) + 1 or start
+
+def _skipped_lines(mm, pattern, start, end, encoding):
+    """Line numbers, counted from `start`, of the lines matching `pattern` (the parser's skiprows)."""
+    if not pattern:
+        return []
+    regex = re.compile(pattern.encode(encoding), re.MULTILINE)
+    lines, line, last = [], 0, start
+    for match in regex.finditer(mm, start, len(mm) if end is None else end):
+        line += mm[last:match.start()].count(b"\n")
+        last = match.start()
+        lines.append(line)
+    return lines
+
+def locate(spec, file_path):
+    """
+    Find the header line and the byte range of the data below it.
+
+    Returns a dict with the header fields, data_start, data_end (None: end of file),
+    the data lines to skip and the preamble values, or None if there is no header.
+    """
+    encoding = spec.get("encoding", "utf-8")
+    markers = [marker.encode(encoding) for marker in spec["header"]]
+    preamble = spec.get("preamble", {})
+    found = {}
+    with open(file_path, "rb") as f:
+        offset = 0
+        for line in f:
+            if all(marker in line for marker in markers):
+                break
+            decoded = line.decode(encoding, errors="replace")
+            for name, rule in preamble.items():
+                match = name not in found and re.search(rule["pattern"], decoded)
+                if match:
+                    found[name] = match.group(1)
+            offset += len(line)
+        else:
+            return None
+
+        header = line.decode(encoding, errors="replace").rstrip("\r\n")
+        data_start = offset + len(line)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_end = _find_footer(mm, spec.get("footer"), data_start, encoding)
+            skip_lines = _skipped_lines(mm, spec.get("skip_lines"), data_start, data_end, encoding)
+
+    for name, rule in preamble.items():
+        if name in found:
+            print(f"🔎 Parsed {name}: {found[name]}")
+        else:
+            found[name] = rule.get("default")
+            print(f"⚠️ Could not extract {name}")
+
+    return {
+        "fields": next(csv.reader([header], delimiter=spec.get("sep", "\t"))),
+        "header_offset": offset,
+        "data_start": data_start,
+        "data_end": data_end,
+        "skip_lines": skip_lines,
+        "preamble": found,
+    }
+
+# === Reading ===
+def resolve_columns(spec, fields):
+    """
+    Match spec columns to header positions. Returns ({position: report header}, missing
+    report headers, duplicated report headers).
+    """
+    keys = [header_key(field) for field in fields]
+    positions, missing, duplicated = {}, [], []
+    for source in spec["columns"]:
+        key = header_key(source)
+        if key not in keys:
+            missing.append(source)
+            continue
+        if keys.count(key) > 1:
+            duplicated.append(source)
+        positions[keys.index(key)] = source
+    return positions, missing, duplicated
+
+def read_dtypes(spec, positions, lenient=False, low_memory=False):
+    """Parser dtype per header position; numerics stay text if lenient or flagged."""
+    dtypes = {}
+    for position, source in positions.items():
+        column = spec["columns"][source]
+        as_text = column["type"] in ("numeric", "integer") and (lenient or column.get("strip_asterisks"))
+        if low_memory and column.get("category"):
+            dtypes[position] = "category"
+        else:
+            dtypes[position] = str if as_text else READ_DTYPES[column["type"]]
+    return dtypes
+
+def _drops_rows(spec):
+    return bool(spec.get("required") or spec.get("markers"))
+
+def _marker_mask(spec, chunk):
+    mask = pd.Series(False, index=chunk.index)
+    for marker in spec["markers"].values():
+        if marker["column"] in chunk.columns:
+            mask |= chunk[marker["column"]].str.extract(marker["pattern"], expand=False).notna()
+    return mask
+
+def _hold_marker_tail(spec, chunks):
+    """
+    Yield chunks that end at a marker row, carrying the rows after the last marker
+    into the next chunk so every row is dated by the marker below it.
+    """
+    pending = None
+    for chunk in chunks:
+        with stage("transform"):
+            if pending is not None:
+                chunk = concat_chunks([pending, chunk])
+                pending = None
+            hits = _marker_mask(spec, chunk).to_numpy().nonzero()[0]
+            if len(hits):
+                pending = chunk.iloc[hits[-1] + 1:]
+                chunk = chunk.iloc[:hits[-1] + 1]
+            else:
+                pending, chunk = chunk, None
+        if chunk is not None:
+            yield chunk
+    if pending is not None:
+        yield pending
+
+def convert_column(values, column, context):
+    """Bring one parsed column to its final type and apply its fill/sign options."""
+    kind = column["type"]
+    if kind == "date":
+        cache = context["date_cache"].setdefault(column["name"], {})
+        return parse_dates(values, column["format"], cache, context["unparseable"])
+    if kind in ("numeric", "integer"):
+        if column.get("strip_asterisks"):
+            values = strip_asterisks(values)
+        if values.dtype == object:
+            values = pd.to_numeric(values, errors="coerce")
+        if "fill" in column:
+            values = values.fillna(column["fill"])
+        if column.get("flip_sign"):
+            values = values * -1
+    return values
+
+def _constant(value, rows, low_memory):
+    if low_memory and isinstance(value, str):
+        return pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), [value])
+    return value
+
+def clean_chunk(spec, chunk, context, low_memory=False):
+    """Turn one parsed chunk (columns named by report header) into the table's rows."""
+    if spec.get("collapse_whitespace"):
+        # Dates are stripped by parse_dates, once per distinct value; numbers need no cleaning
+        text_columns = [source for source, column in spec["columns"].items() if column["type"] == "text"]
+        chunk = collapse_whitespace(chunk, text_columns)
+
+    out = {}
+    for source, column in spec["columns"].items():
+        if source in chunk.columns:
+            values = chunk[source]
+        else:
+            values = pd.Series(None, index=chunk.index, dtype=object, name=source)
+        out[column["name"]] = convert_column(values, column, context)
+
+    for name, marker in spec.get("markers", {}).items():
+        dates = chunk[marker["column"]].str.extract(marker["pattern"], expand=False).rename(name)
+        cache = context["date_cache"].setdefault(name, {})
+        out[name] = parse_dates(dates, marker["format"], cache, context["unparseable"]).bfill()
+
+    df = pd.DataFrame(out, index=chunk.index)
+
+    for name in spec.get("required", []):
+        values = df[name]
+        keep = values.notna()
+        if values.dtype == object:
+            keep &= values.astype(str).str.strip() != ""
+        df = df[keep]
+
+    for name, addends in spec.get("derived", {}).items():
+        df[name] = sum((df[col] for col in addends[1:]), df[addends[0]])
+
+    for name, key in spec.get("constants", {}).items():
+        df[name] = _constant(context[key], len(df), low_memory)
+
+    return df
+
+def _iter_cleaned(spec, file_path, chunksize, skip_rows, lenient, low_memory, state):
+    with stage("header"):
+        layout = locate(spec, file_path)
+    if layout is None:
+        print(f"❌ Could not find the {spec['name']} header in {file_path}. Aborting.")
+        return
+
+    positions, missing, duplicated = resolve_columns(spec, layout["fields"])
+    if duplicated:
+        print(f"❌ Duplicate column names detected: {duplicated}. Aborting.")
+        return
+    if missing and spec.get("missing", "fill") == "abort":
+        print(f"❌ Missing expected columns: {missing}. Aborting.")
+        print("🔍 Available columns:", layout["fields"])
+        return
+
+    context = {
+        "filename": os.path.basename(file_path),
+        "today": pd.to_datetime("today").date(),
+        **layout["preamble"],
+        **state,
+    }
+    limit = None if layout["data_end"] is None else layout["data_end"] - layout["data_start"]
+    filters_rows = _drops_rows(spec)
+
+    with open(file_path, "rb") as f:
+        f.seek(layout["data_start"])
+        add_bytes(layout["data_start"])  # consumed by the header scan
+        reader = pd.read_csv(
+            timed_reader(f, limit),
+            sep=spec.get("sep", "\t"),
+            header=None,
+            names=range(len(layout["fields"])),
+            skiprows=layout["skip_lines"] or None,
+            usecols=list(positions),
+            dtype=read_dtypes(spec, positions, lenient, low_memory),
+            encoding=spec.get("encoding", "utf-8"),
+            chunksize=chunksize,
+        )
+        chunks = timed_iter(reader, "parse")
+        if spec.get("markers"):
+            chunks = _hold_marker_tail(spec, (chunk.rename(columns=positions) for chunk in chunks))
+        else:
+            chunks = (chunk.rename(columns=positions) for chunk in chunks)
+
+        for i, chunk in enumerate(chunks):
+            # Without row filters, output rows map 1:1 to data rows: skip before cleaning
+            if not filters_rows:
+                if skip_rows >= len(chunk):
+                    skip_rows -= len(chunk)
+                    continue
+                chunk, skip_rows = chunk.iloc[skip_rows:].copy(), 0
+
+            with stage("transform"):
+                chunk = clean_chunk(spec, chunk, context, low_memory)
+
+            if filters_rows and skip_rows:
+                if skip_rows >= len(chunk):
+                    skip_rows -= len(chunk)
+                    continue
+                chunk, skip_rows = chunk.iloc[skip_rows:], 0
+
+            print(f"🧪 Parsed chunk {i + 1}: {len(chunk)} rows")
+            yield chunk
+
+def iter_pipeline(spec, file_path, chunksize=CHUNK_ROWS, skip_rows=0, low_memory=LOW_MEMORY):
+    """
+    Yield cleaned DataFrames of at most about `chunksize` rows for one report file.
+
+    `skip_rows` output rows (e.g. already loaded by a resumed load) are not yielded.
+    Yields nothing if the header is missing or lacks columns the spec requires.
+    After the last chunk, dates that did not parse are counted per column, and in
+    low-memory mode a per-column memory report is printed.
+    """
+    yielded = 0
+    savings = {}
+    # Per file: each distinct date string is parsed once, across chunks and re-reads
+    state = {"date_cache": {}, "unparseable": {}}
+    try:
+        for chunk in _iter_cleaned(spec, file_path, chunksize, skip_rows, False, low_memory, state):
+            yielded += len(chunk)
+            add_savings(savings, chunk)
+            yield chunk
+    except ValueError as e:
+        print(f"⚠️ {os.path.basename(file_path)} has values that do not parse as typed ({e}); "
+              f"re-reading numeric columns as text")
+        for chunk in _iter_cleaned(spec, file_path, chunksize, skip_rows + yielded, True, low_memory, state):
+            add_savings(savings, chunk)
+            yield chunk
+
+    for col, count in state["unparseable"].items():
+        print(f"⚠️ {count} value(s) in {col} do not match {_declared_format(spec, col)} and were left blank")
+    if savings:
+        print_memory_report(savings)
+
+def _declared_format(spec, col):
+    """The format a spec declares for a date column (report header or marker name)."""
+    if col in spec.get("markers", {}):
+        return spec["markers"][col]["format"]
+    return spec["columns"].get(col, {}).get("format")
+
+def concat_chunks(chunks):
+    """pd.concat that keeps categorical columns categorical when chunks have different categories."""
+    categorical = [col for col in chunks[0].columns if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    if not categorical or len(chunks) == 1:
+        return pd.concat(chunks, ignore_index=True)
+
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for col in categorical:
+        df[col] = union_categoricals([chunk[col] for chunk in chunks])
+    return df[chunks[0].columns]
+
+def run_pipeline(spec, file_path, low_memory=LOW_MEMORY):
+    """Parse a whole report into one DataFrame (empty if there is nothing to load)."""
+    chunks = list(iter_pipeline(spec, file_path, low_memory=low_memory))
+    if not chunks:
+        return pd.DataFrame()
+
+    df = concat_chunks(chunks)
+    print("🧪 Final row count:", len(df))
+    print("✅ Final columns ready for upload:", list(df.columns))
+    print(df.head())
+    return df
+
+# === Memory report ===
+def add_savings(savings, df):
+    """
+    Add one chunk's categorical columns to `savings`: {column: [rows, distinct values,
+    bytes as Python strings, bytes as categorical]}. The string size is what
+    memory_usage(deep=True) reports for the same column held as objects.
+    """
+    for col in df.columns:
+        series = df[col]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        categories = series.cat.categories
+        # Code -1 (missing) takes the last entry: the NaN float an object column would hold
+        sizes = np.array([sys.getsizeof(value) for value in categories] + [sys.getsizeof(np.nan)])
+        as_objects = len(series) * 8 + int(sizes.take(series.cat.codes.to_numpy()).sum())
+        entry = savings.setdefault(col, [0, 0, 0, 0])
+        entry[0] += len(series)
+        entry[1] = max(entry[1], len(categories))
+        entry[2] += as_objects
+        entry[3] += int(series.memory_usage(index=False, deep=True))
+
+def print_memory_report(savings):
+    print("🧮 Low-memory columns (string vs categorical):")
+    print(f"   {'column':<28}{'distinct':>9}{'strings MB':>12}{'category MB':>13}{'saved':>8}")
+    total_objects = total_categories = 0
+    for col, (rows, distinct, as_objects, as_category) in savings.items():
+        total_objects += as_objects
+        total_categories += as_category
+        saved = 1 - as_category / as_objects if as_objects else 0
+        print(f"   {col:<28}{distinct:>9}{as_objects / 1e6:>12.2f}{as_category / 1e6:>13.2f}{saved:>8.0%}")
+    print(f"   {'total':<28}{'':>9}{total_objects / 1e6:>12.2f}{total_categories / 1e6:>13.2f}"
+          f"{1 - total_categories / total_objects if total_objects else 0:>8.0%}")
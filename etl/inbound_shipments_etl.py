@@ -1,71 +1,49 @@
 import pandas as pd
-from io import StringIO
-import re
 
-def clean_columns(df):
-    """Clean column names by removing non-printable characters and normalizing whitespace."""
-    df.columns = df.columns.map(lambda x: re.sub(r'\s+', ' ', re.sub(r'[^\x20-\x7E]', '', str(x))).strip())
-    return df
+from etl.engine import CHUNK_ROWS, date, integer, iter_pipeline, numeric, run_pipeline, text
+
+# Match DB schema (sql/create_inbound_shipments_table.sql)
+SPEC = {
+    "name": "inbound_shipments",
+    "header": ["Vendor No"],
+    "columns": {
+        "Vendor No": text("Vendor No", category=True),
+        "Stock No": text("Stock No"),
+        "Product Name": text("Product Name"),
+        "Division": text("Division", category=True),
+        "Dept": text("Dept", category=True),
+        "ETA Week": text("ETA Week", category=True),
+        "ETA Date": date("ETA Date", "%m/%d/%y"),
+        "Rqst Ship Date": date("Rqst Ship Date", "%m/%d/%y"),
+        "Confirm Date": date("Confirm Date", "%m/%d/%y"),
+        "Qty": integer("Qty"),
+        "Po No": text("Po No"),
+        "Container No": text("Container No"),
+        "Confirmation No": text("Confirmation No", category=True),
+        "Last Cost": numeric("Last Cost"),
+        "Item Create Date": date("Item Create Date", "%m/%d/%y"),
+        "Avail Qty": integer("Avail Qty"),
+        "Report Date": date("Report Date", "%m/%d/%y"),
+        "PO Create Date": date("PO Create Date", "%m/%d/%y"),
+    },
+    "missing": "abort",
+    "collapse_whitespace": True,
+}
+
+def iter_etl(file_path, chunksize=CHUNK_ROWS, skip_rows=0):
+    """
+    Streaming mode: yield cleaned DataFrames of at most `chunksize` rows, so only one
+    chunk is held in memory at a time. Yields nothing if the header is missing or
+    does not match the DB schema.
+
+    Cleaning never drops rows, so a resumed load can pass `skip_rows` (rows already
+    loaded): those are still tokenized but not cleaned or yielded again.
+    """
+    return iter_pipeline(SPEC, file_path, chunksize, skip_rows)
 
 def run_etl(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        # Detect header line
-        header_index = next(i for i, line in enumerate(lines) if line.strip().startswith("Vendor No"))
-        content = ''.join(lines[header_index:])
-        df = pd.read_csv(StringIO(content), sep='\t', engine='python')
-
-        # Clean columns and drop empty ones
-        df = clean_columns(df)
-        df = df.loc[:, ~df.columns.str.contains("^Unnamed", na=False)]
-
-        if df.columns.duplicated().any():
-            print("❌ Duplicate column names detected. Aborting upload.")
-            return pd.DataFrame()
-
-        # Clean string values
-        df = df.map(lambda x: re.sub(r'\s+', ' ', str(x)).strip() if isinstance(x, str) else x)
-
-        # Parse date columns (infer common formats like m/d/yyyy)
-        date_fields = [
-            "ETA Date", "Rqst Ship Date", "Confirm Date",
-            "Item Create Date", "Report Date", "PO Create Date"
-        ]
-        for col in date_fields:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
-
-        # Parse numeric fields
-        numeric_fields = ["Qty", "Last Cost", "Avail Qty"]
-        for col in numeric_fields:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        # Match DB schema
-        expected_columns = [
-            "Vendor No", "Stock No", "Product Name", "Division", "Dept", "ETA Week",
-            "ETA Date", "Rqst Ship Date", "Confirm Date", "Qty", "Po No", "Container No",
-            "Confirmation No", "Last Cost", "Item Create Date", "Avail Qty", "Report Date", "PO Create Date"
-        ]
-
-        missing = [col for col in expected_columns if col not in df.columns]
-        if missing:
-            print(f"❌ Missing expected columns: {missing}. Aborting.")
-            print("🔍 Available columns:", df.columns.tolist())
-            return pd.DataFrame()
-
-        df = df[expected_columns]  # enforce order
-        print("🧪 Final row count:", len(df))
-        print("✅ Final columns ready for upload:", list(df.columns))
-        print(df.head())
-
-        print(f"🧪 Row count after all processing: {len(df)}")
-        print("🧪 Final DataFrame preview:")
-        print(df.head(3))
-
-        return df
+        return run_pipeline(SPEC, file_path)
 
     except Exception as e:
         print(f"❌ Failed to process file {file_path}: {e}")
@@ -0,0 +1,104 @@
+import csv
+import os
+import re
+
+from etl.engine import resolve_columns
+from etl.daily_detail_sales_etl import SPEC as DAILY_DETAIL_SALES
+from etl.daily_sales_tax_etl import SPEC as DAILY_SALES_TAX
+from etl.inbound_shipments_etl import SPEC as INBOUND_SHIPMENTS
+
+# Pre-flight: tell what a file is from its first few KB, before a full parse.
+#
+# Files are routed by the incoming/ folder they land in, and a misfiled or broken
+# report otherwise only shows up once the engine has parsed it (or, worse, loads
+# as mostly-blank rows: a sales tax file shares enough headers with the daily
+# detail report to pass as one). The head of the file is searched for every
+# spec's header markers; the report is the spec whose columns best match its
+# header line, preamble (e.g. "For Store No:") found breaking ties. A file is then
+# loaded, re-routed to the pipeline it belongs to, or rejected for what the
+# engine would abort on: no header, duplicated columns, or missing columns in a
+# spec with missing="abort".
+
+SPECS = {spec["name"]: spec for spec in (DAILY_DETAIL_SALES, INBOUND_SHIPMENTS, DAILY_SALES_TAX)}
+
+PREFLIGHT = os.getenv("ETL_PREFLIGHT", "1").lower() in ("1", "true", "yes")
+
+# Bytes read from the head of each file; the preamble and header fit well within this
+SNIFF_BYTES = int(os.getenv("ETL_SNIFF_KB", "16")) * 1024
+
+def head_lines(file_path, sniff_bytes=SNIFF_BYTES):
+    """The complete lines in the first `sniff_bytes` of a file, as bytes."""
+    with open(file_path, "rb") as f:
+        head = f.read(sniff_bytes)
+        at_end = not f.read(1)
+    lines = head.splitlines(keepends=True)
+    if lines and not at_end and not lines[-1].endswith(b"\n"):
+        lines.pop()  # cut off mid-line
+    return lines
+
+def match_spec(spec, lines):
+    """
+    How well the head of a file matches one spec. Returns None if the header is not
+    there, else a dict with the header fields, matched/missing/duplicated columns
+    and whether the preamble was found above the header.
+    """
+    encoding = spec.get("encoding", "utf-8")
+    markers = [marker.encode(encoding) for marker in spec["header"]]
+    for number, line in enumerate(lines):
+        if all(marker in line for marker in markers):
+            break
+    else:
+        return None
+
+    header = line.decode(encoding, errors="replace").rstrip("\r\n")
+    fields = next(csv.reader([header], delimiter=spec.get("sep", "\t")))
+    positions, missing, duplicated = resolve_columns(spec, fields)
+    preamble = b"".join(lines[:number]).decode(encoding, errors="replace")
+    patterns = [rule["pattern"] for rule in spec.get("preamble", {}).values()]
+    return {
+        "fields": fields,
+        "matched": len(positions) / len(spec["columns"]),
+        "missing": missing,
+        "duplicated": duplicated,
+        "preamble": bool(patterns) and all(re.search(pattern, preamble) for pattern in patterns),
+    }
+
+def sniff(file_path, sniff_bytes=SNIFF_BYTES):
+    """The pipeline whose report this file looks like, and its match_spec() result (None, None if none)."""
+    lines = head_lines(file_path, sniff_bytes)
+    best, best_match = None, None
+    for name, spec in SPECS.items():
+        match = match_spec(spec, lines)
+        if match and (best_match is None
+                      or (match["matched"], match["preamble"]) > (best_match["matched"], best_match["preamble"])):
+            best, best_match = name, match
+    return best, best_match
+
+def problem(spec, match):
+    """Why the engine would abort on this header, or None."""
+    if match["duplicated"]:
+        return f"duplicate columns {match['duplicated']}"
+    if match["missing"] and spec.get("missing", "fill") == "abort":
+        return f"missing columns {match['missing']}"
+    return None
+
+def preflight(pipeline_key, file_path, sniff_bytes=SNIFF_BYTES):
+    """
+    Check a file before it is parsed for `pipeline_key`. Returns (action, detail):
+    ("load", None), ("reroute", other pipeline) or ("reject", reason).
+    """
+    if not PREFLIGHT:
+        return "load", None
+    if os.path.getsize(file_path) == 0:
+        return "reject", "empty file"
+
+    pipeline, match = sniff(file_path, sniff_bytes)
+    if pipeline is None:
+        return "reject", f"no known report header in the first {sniff_bytes // 1024} KB"
+
+    reason = problem(SPECS[pipeline], match)
+    if reason:
+        return "reject", f"{pipeline} report with {reason}"
+    if pipeline != pipeline_key:
+        return "reroute", pipeline
+    return "load", None
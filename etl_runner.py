@@ -1,16 +1,42 @@
 import os
+import time
+import argparse
+import multiprocessing
 import psycopg2
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
 
 from etl.daily_detail_sales_etl import run_etl as run_sales_etl
-from etl.inbound_shipments_etl import run_etl as run_shipments_etl
+from etl.inbound_shipments_etl import run_etl as run_shipments_etl, iter_etl as stream_shipments_etl
 from etl.daily_sales_tax_etl import run_etl as run_sales_tax_etl
-from utils.postgres_uploader import upload_to_postgres
+from etl.preflight import preflight
+from utils.postgres_uploader import pooled_connection, quote_ident, upload_chunks_to_postgres
+from utils.etl_log import INSERT_LOG_SQL, is_content_already_loaded, is_file_already_loaded, warm_loaded_index
+from utils.fingerprint import file_fingerprint
+from utils.metrics import LOG_COLUMNS, STAGES, finish_run, log_values, snapshot, stage, start_run, use_run
+from utils.archive import PARTITION_COLUMNS, archive_after_commit, archived_chunks
+from utils.staged_load import frame_chunks, needs_staging, publish_staged, stage_chunks, staging_table_name
+from utils.delta_load import DELTA_TABLES, is_delta, merge_snapshot, print_delta, publish_delta
+from utils.rollups import ROLLUPS, has_rollup, rebuild_rollup, upsert_rollup
+from utils.micro_batch import batchable, coalesce, load_batch
+from utils.partitions import ensure_partitions, partition_column, partitioned_chunks, prepare_partitions, upload_to_partitions
+from utils.table_swap import build_shadow_indexes, create_shadow, drop_shadow, partition_table, swap_in, table_exists
 
 load_dotenv()
 
+BASE_FOLDER = "data_files"
+
+DB_CONFIG = {
+    "dbname": os.getenv("PG_DATABASE"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+    "host": os.getenv("PG_HOST", "localhost"),
+    "port": os.getenv("PG_PORT", "5432"),
+}
+
 # === Pipeline Configuration ===
 pipeline_map = {
     "daily_detail_sales": run_sales_etl,
@@ -18,99 +44,592 @@ pipeline_map = {
     "daily_sales_tax": run_sales_tax_etl,
 }
 
-# === ETL Log Helpers ===
-def file_already_loaded(table_name, filename, conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT 1 FROM etl_log WHERE table_name = %s AND filename = %s
-        """, (table_name, filename))
-        return cur.fetchone() is not None
+# Pipelines whose ETL can yield cleaned chunks straight to the uploader
+stream_map = {
+    "inbound_shipments": stream_shipments_etl,
+}
 
-def log_etl_file(table_name, filename, report_date, row_count, status, conn):
+# === ETL Log Helpers ===
+def log_etl_file(table_name, filename, report_date, row_count, status, conn, content_hash=None):
+    # etl_log has no unique key on (table_name, filename): every attempt is its own row
     with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO etl_log (table_name, filename, report_date, row_count, status, load_time)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (table_name, filename) DO UPDATE
-            SET status = EXCLUDED.status,
-                report_date = EXCLUDED.report_date,
-                row_count = EXCLUDED.row_count,
-                load_time = EXCLUDED.load_time
+        cur.execute(f"""
+            INSERT INTO etl_log (table_name, filename, report_date, row_count, status, load_time, content_hash,
+                                 {", ".join(LOG_COLUMNS)})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, {", ".join(["%s"] * len(LOG_COLUMNS))})
         """, (
             table_name,
             filename,
             report_date,
             row_count,
             status,
-            datetime.now(timezone.utc)
+            datetime.now(timezone.utc),
+            content_hash,
+            *log_values(row_count)
         ))
     conn.commit()
 
 # === File Move Helpers ===
-def move_file(file_path, target_folder):
+def move_file(file_path, target_folder, file_name=None):
     os.makedirs(target_folder, exist_ok=True)
-    target_path = os.path.join(target_folder, os.path.basename(file_path))
+    target_path = os.path.join(target_folder, file_name or os.path.basename(file_path))
     os.rename(file_path, target_path)
+    return target_path
 
-# === Main Runner ===
-def main():
-    base_folder = "data_files"
-
-    conn = psycopg2.connect(
-        dbname=os.getenv("PG_DATABASE"),
-        user=os.getenv("PG_USER"),
-        password=os.getenv("PG_PASSWORD"),
-        host=os.getenv("PG_HOST", "localhost"),
-        port=os.getenv("PG_PORT", "5432")
-    )
-
-    for pipeline_key, etl_function in pipeline_map.items():
-        incoming_path = os.path.join(base_folder, pipeline_key, "incoming")
-
-        if not os.path.isdir(incoming_path):
-            print(f"⚠️ Skipping missing folder: {incoming_path}")
+def unused_name(target_folder, file_name):
+    """`file_name`, or with a timestamp added if target_folder already has a file by that name."""
+    if not os.path.exists(os.path.join(target_folder, file_name)):
+        return file_name
+    name, ext = os.path.splitext(file_name)
+    return f"{name}_{datetime.now().strftime('%Y%m%d%H%M%S')}{ext}"
+
+def pipeline_folder(pipeline_key, subfolder):
+    return os.path.join(BASE_FOLDER, pipeline_key, subfolder)
+
+def pending_files(pipeline_key):
+    """Yield paths of files waiting in a pipeline's incoming/ folder."""
+    incoming_path = pipeline_folder(pipeline_key, "incoming")
+
+    if not os.path.isdir(incoming_path):
+        print(f"⚠️ Skipping missing folder: {incoming_path}")
+        return
+
+    for file_name in sorted(os.listdir(incoming_path)):
+        file_path = os.path.join(incoming_path, file_name)
+        if os.path.isfile(file_path):
+            yield file_path
+
+# === File Processing ===
+def parse_file(pipeline_key, file_path):
+    """
+    Run a pipeline's ETL on one file, starting its metrics run. Module-level so a
+    process pool can pickle it. Returns (df, run); pass run to use_run() to carry
+    on timing in another process.
+    """
+    start_run(pipeline_key, os.path.basename(file_path))
+    df = pipeline_map[pipeline_key](file_path)
+    return df, snapshot()
+
+def record_result(pipeline_key, file_path, content_hash, row_count, report_date, conn):
+    """Log the outcome of a load and move the file to processed/ or rejected/."""
+    file_name = os.path.basename(file_path)
+
+    if row_count:
+        with stage("log"):
+            log_etl_file(pipeline_key, file_name, report_date, row_count, "success", conn, content_hash)
+            move_file(file_path, pipeline_folder(pipeline_key, "processed"))
+        archive_after_commit(pipeline_key, file_name, content_hash)
+        print(f"✅ {file_name} processed successfully.\n")
+        return "success"
+
+    with stage("log"):
+        log_etl_file(pipeline_key, file_name, None, 0, "empty", conn, content_hash)
+        move_file(file_path, pipeline_folder(pipeline_key, "rejected"))
+    print(f"⚠️ No data to upload for {file_name} — moved to rejected.\n")
+    return "empty"
+
+def record_failure(pipeline_key, file_path, content_hash, error, conn):
+    file_name = os.path.basename(file_path)
+    conn.rollback()  # discard any rows the failed load wrote on this connection
+    with stage("log"):
+        log_etl_file(pipeline_key, file_name, None, 0, f"failed: {str(error)[:200]}", conn, content_hash)
+        move_file(file_path, pipeline_folder(pipeline_key, "rejected"))
+    print(f"❌ Error processing {file_name}: {error}\n")
+    return "failed"
+
+def upload_file(pipeline_key, file_path, content_hash, chunks_from, conn):
+    """
+    Upload a file's rows on `conn` without committing: record_result() commits them
+    together with the etl_log row, so a failed file leaves nothing in the table.
+
+    `chunks_from(start_row)` yields the file's cleaned rows from start_row on. Large
+    files are copied through a checkpointed staging table first (utils/staged_load.py),
+    so a retry resumes after the last committed chunk. Snapshot tables in delta mode
+    are always staged, then merged (utils/delta_load.py). Rows go straight into their
+    day's partition, created before the chunk if need be (utils/partitions.py). Every chunk is also written
+    to the Parquet archive, published by record_result() once the rows have committed.
+    Returns the row count.
+    """
+    file_name = os.path.basename(file_path)
+
+    def archiving(start_row):
+        return archived_chunks(chunks_from(start_row), pipeline_key, file_name, content_hash, start_row)
+
+    def staging(start_row):
+        # Publishing routes the staged rows to partitions that must exist by then
+        return partitioned_chunks(archiving(start_row), pipeline_key)
+
+    with stage("upload"):
+        if is_delta(pipeline_key):
+            if not stage_chunks(staging, pipeline_key, file_name, content_hash):
+                return 0
+            return publish_delta(conn, pipeline_key, content_hash)
+        if needs_staging(file_path, pipeline_key, content_hash):
+            if not stage_chunks(staging, pipeline_key, file_name, content_hash):
+                return 0
+            return publish_staged(conn, pipeline_key, content_hash)
+        return upload_to_partitions(archiving(0), pipeline_key, conn)
+
+def load_parsed_file(pipeline_key, file_path, content_hash, df, conn):
+    """
+    Upload an already-parsed DataFrame and add it to its store-day rollup, then log
+    and move the file. Returns (status, rows).
+    """
+    try:
+        if df is None or df.empty:
+            return record_result(pipeline_key, file_path, content_hash, 0, None, conn), 0
+
+        # Every day's partition exists before the load transaction takes any lock
+        prepare_partitions(df, pipeline_key)
+        rows = upload_file(pipeline_key, file_path, content_hash, lambda start: frame_chunks(df, start), conn)
+        if rows and has_rollup(pipeline_key):
+            with stage("upload"):
+                upsert_rollup(conn, pipeline_key, df)
+        report_date = df["report_date"].iloc[0] if "report_date" in df.columns else None
+        return record_result(pipeline_key, file_path, content_hash, rows, report_date, conn), rows
+    except Exception as e:
+        return record_failure(pipeline_key, file_path, content_hash, e, conn), 0
+
+def timing_result(run):
+    """Flatten a finished metrics run into a row of the timing report."""
+    stages = run["stages"]
+    return {
+        "pipeline": run["pipeline"], "file": run["file"], "status": run["status"], "rows": run["rows"],
+        "parse_s": stages["read"] + stages["header"] + stages["parse"] + stages["transform"],
+        "load_s": stages["upload"] + stages["log"],
+        "stages": stages, "bytes_read": run["bytes_read"], "peak_rss_mb": run["peak_rss_mb"],
+    }
+
+def process_file(pipeline_key, file_path, content_hash, conn):
+    """Parse and load one file in this process. Returns a timing result."""
+    file_name = os.path.basename(file_path)
+    print(f"🟡 Running pipeline: {pipeline_key} for file: {file_name}")
+    status, rows = "failed", 0
+
+    if pipeline_key in stream_map:
+        # Parsing and uploading are interleaved chunk by chunk; stage() keeps their times apart
+        start_run(pipeline_key, file_name)
+        try:
+            rows = upload_file(pipeline_key, file_path, content_hash,
+                               lambda start: stream_map[pipeline_key](file_path, skip_rows=start), conn)
+            status = record_result(pipeline_key, file_path, content_hash, rows, None, conn)
+        except Exception as e:
+            status, rows = record_failure(pipeline_key, file_path, content_hash, e, conn), 0
+    else:
+        try:
+            df, _ = parse_file(pipeline_key, file_path)
+        except Exception as e:
+            status = record_failure(pipeline_key, file_path, content_hash, e, conn)
+        else:
+            status, rows = load_parsed_file(pipeline_key, file_path, content_hash, df, conn)
+
+    return timing_result(finish_run(status, rows))
+
+def collect_work(conn):
+    """
+    List (pipeline_key, file_path, content_hash) for files that still need loading.
+
+    Each file is pre-flighted from its first few KB (etl/preflight.py): one in the
+    wrong incoming/ folder is moved to the right one and loaded there, a malformed
+    one is logged and rejected. Files are fingerprinted before any parsing: content
+    already loaded under another name (or queued twice in this run) is logged as a
+    duplicate and rejected.
+    """
+    warm_loaded_index()
+    work = []
+    queued_hashes = set()
+    pending = [(pipeline_key, file_path) for pipeline_key in pipeline_map for file_path in pending_files(pipeline_key)]
+    for pipeline_key, file_path in pending:
+        file_name = os.path.basename(file_path)
+        action, detail = preflight(pipeline_key, file_path)
+        if action == "reroute":
+            # Never overwrite a file waiting in the other pipeline's incoming/ folder
+            incoming = pipeline_folder(detail, "incoming")
+            new_name = unused_name(incoming, file_name)
+            print(f"↪️ {file_name} is a {detail} report, not {pipeline_key}: moving it to {detail}"
+                  + (f" as {new_name}" if new_name != file_name else ""))
+            pending.append((detail, move_file(file_path, incoming, new_name)))
+            continue
+        if action == "reject":
+            log_etl_file(pipeline_key, file_name, None, 0, f"malformed: {detail[:200]}", conn)
+            move_file(file_path, pipeline_folder(pipeline_key, "rejected"))
+            print(f"❌ Rejected {file_name} before parsing: {detail}")
+            continue
+
+        if is_file_already_loaded(pipeline_key, file_name):
+            print(f"⏩ Already processed: {file_name}")
+            continue
+
+        content_hash = file_fingerprint(file_path)
+        if is_content_already_loaded(pipeline_key, content_hash) or (pipeline_key, content_hash) in queued_hashes:
+            log_etl_file(pipeline_key, file_name, None, 0, "duplicate", conn, content_hash)
+            move_file(file_path, pipeline_folder(pipeline_key, "rejected"))
+            print(f"⏩ Duplicate content, moved to rejected: {file_name}")
+            continue
+
+        queued_hashes.add((pipeline_key, content_hash))
+        work.append((pipeline_key, file_path, content_hash))
+    return work
+
+# === Runners ===
+def run_serial(work, conn):
+    return [process_file(pipeline_key, file_path, content_hash, conn)
+            for pipeline_key, file_path, content_hash in work]
+
+def run_parallel(work, workers, loaders):
+    """
+    Parse files in a pool of `workers` processes and hand each parsed DataFrame to
+    one of `loaders` threads, each holding its own connection from a bounded pool.
+
+    Every file is owned by exactly one loader, so its etl_log row and its move to
+    processed/ or rejected/ happen once, on that loader's connection.
+    """
+    conn_pool = ThreadedConnectionPool(1, loaders, **DB_CONFIG)
+
+    def load(pipeline_key, file_path, content_hash, df, run):
+        use_run(run)  # continue the timings the parser process started
+        conn = conn_pool.getconn()
+        try:
+            status, rows = load_parsed_file(pipeline_key, file_path, content_hash, df, conn)
+        finally:
+            conn_pool.putconn(conn)
+        return timing_result(finish_run(status, rows))
+
+    def fail(pipeline_key, file_path, content_hash, error):
+        # The parser's run died with it; only the logging is timed here
+        start_run(pipeline_key, os.path.basename(file_path))
+        conn = conn_pool.getconn()
+        try:
+            status = record_failure(pipeline_key, file_path, content_hash, error, conn)
+        finally:
+            conn_pool.putconn(conn)
+        return timing_result(finish_run(status, 0))
+
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as parsers, \
+                ThreadPoolExecutor(max_workers=loaders) as loader_threads:
+            parse_futures = {
+                parsers.submit(parse_file, pipeline_key, file_path): (pipeline_key, file_path, content_hash)
+                for pipeline_key, file_path, content_hash in work
+            }
+            load_futures = []
+            for future in as_completed(parse_futures):
+                pipeline_key, file_path, content_hash = parse_futures[future]
+                print(f"🟡 Parsed {os.path.basename(file_path)} for pipeline: {pipeline_key}")
+                try:
+                    df, run = future.result()
+                    load_futures.append(loader_threads.submit(load, pipeline_key, file_path, content_hash, df, run))
+                except Exception as e:
+                    load_futures.append(loader_threads.submit(fail, pipeline_key, file_path, content_hash, e))
+
+            results = [future.result() for future in load_futures]
+    finally:
+        conn_pool.closeall()
+    return results
+
+def parsed_files(work, parsers, results, conn):
+    """
+    Parse `work` on `parsers`, yielding (pipeline_key, file) dicts for load_batch()
+    as files finish. Files that fail to parse are logged, rejected and added to `results`.
+    """
+    futures = {parsers.submit(parse_file, pipeline_key, file_path): (pipeline_key, file_path, content_hash)
+               for pipeline_key, file_path, content_hash in work}
+    for future in as_completed(futures):
+        pipeline_key, file_path, content_hash = futures[future]
+        try:
+            df, run = future.result()
+        except Exception as e:
+            start_run(pipeline_key, os.path.basename(file_path))
+            status = record_failure(pipeline_key, file_path, content_hash, e, conn)
+            results.append(timing_result(finish_run(status, 0)))
             continue
+        yield pipeline_key, {"path": file_path, "file_name": os.path.basename(file_path),
+                             "content_hash": content_hash, "df": df, "run": run}
+
+def load_batch_files(pipeline_key, files, conn):
+    """Load and commit one micro-batch; if it fails, load its files one at a time. Returns timing results."""
+    rows = sum(len(file["df"]) for file in files if file["df"] is not None)
+    print(f"📦 Loading {len(files)} {pipeline_key} file(s) as one batch ({rows} rows)")
+    try:
+        load_batch(conn, pipeline_key, files)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Batch failed ({str(e).strip().splitlines()[0]}); loading its {len(files)} file(s) one at a time")
+        results = []
+        for file in files:
+            use_run(file["run"])
+            status, rows = load_parsed_file(pipeline_key, file["path"], file["content_hash"], file["df"], conn)
+            results.append(timing_result(finish_run(status, rows)))
+        return results
+
+    results = []
+    for file in files:
+        use_run(file["run"])
+        with stage("log"):
+            move_file(file["path"], pipeline_folder(pipeline_key, "processed" if file["rows"] else "rejected"))
+        if file["rows"]:
+            archive_after_commit(pipeline_key, file["file_name"], file["content_hash"])
+            print(f"✅ {file['file_name']} processed successfully.")
+        else:
+            print(f"⚠️ No data to upload for {file['file_name']} — moved to rejected.")
+        results.append(timing_result(finish_run(file["status"], file["rows"])))
+    print()
+    return results
+
+def run_batched(work, workers, conn):
+    """
+    Micro-batching (--batch, see utils/micro_batch.py): parse small files in a pool of
+    `workers` processes and load each pipeline's files in batches, each in one
+    transaction with one etl_log round-trip. Large and delta-mode files are loaded
+    one at a time first, as usual.
+    """
+    small = [item for item in work if batchable(*item)]
+    results = run_serial([item for item in work if item not in small], conn)
+    if not small:
+        return results
+
+    parsers = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+    with parsers:
+        for pipeline_key, files in coalesce(parsed_files(small, parsers, results, conn)):
+            results += load_batch_files(pipeline_key, files, conn)
+    return results
+
+def print_timing_report(results, wall_s, workers):
+    if not results:
+        print("📭 No new files to process.")
+        return
+
+    print(f"\n⏱️ Timing report ({workers} worker{'s' if workers != 1 else ''})")
+    print(f"{'pipeline':<20} {'file':<45} {'status':<8} {'rows':>8} {'parse s':>8} {'load s':>8} "
+          + " ".join(f"{name:>9}" for name in STAGES) + f" {'MB read':>8} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['pipeline']:<20} {r['file'][:45]:<45} {r['status']:<8} "
+              f"{r['rows']:>8} {r['parse_s']:>8.2f} {r['load_s']:>8.2f} "
+              + " ".join(f"{r['stages'][name]:>9.3f}" for name in STAGES)
+              + f" {r['bytes_read'] / 1e6:>8.1f} {r['peak_rss_mb']:>8.0f}")
+
+    total_rows = sum(r["rows"] for r in results)
+    print(f"🏁 {len(results)} files, {total_rows} rows in {wall_s:.2f}s wall "
+          f"({len(results) / wall_s:.2f} files/s, {total_rows / wall_s:,.0f} rows/s)\n")
+
+# === Backfill ===
+def backfill_file(pipeline_key, file_path, shadow):
+    """
+    Process-pool worker: parse one processed/ file and COPY it into the shadow table
+    on this process's own connection. Returns (file name, content hash, rows).
+
+    In delta mode the file goes to its own staging table instead, for backfill() to
+    merge into the shadow in snapshot order.
+    """
+    content_hash = file_fingerprint(file_path)
+    if pipeline_key in stream_map:
+        chunks = stream_map[pipeline_key](file_path)
+    else:
+        df = pipeline_map[pipeline_key](file_path)
+        chunks = frame_chunks(df) if df is not None else []
 
-        for file_name in os.listdir(incoming_path):
-            file_path = os.path.join(incoming_path, file_name)
+    with pooled_connection() as conn:
+        if is_delta(pipeline_key):
+            staging = staging_table_name(shadow, content_hash)
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {quote_ident(staging)}")
+                cur.execute(f"CREATE TABLE {quote_ident(staging)} "
+                            f"(LIKE {quote_ident(shadow)} INCLUDING DEFAULTS INCLUDING GENERATED)")
+            conn.commit()  # the uploader checks for the table on its own connection
+            rows = upload_chunks_to_postgres(chunks, staging, conn=conn)
+        else:
+            rows = upload_to_partitions(chunks, shadow, conn)
+        conn.commit()
+    return os.path.basename(file_path), content_hash, rows
 
-            if not os.path.isfile(file_path):
-                continue
+def merge_backfill_snapshots(conn, pipeline_key, shadow, loaded):
+    """Merge each file's staging table into the shadow, oldest snapshot first, dropping them as it goes."""
+    date_column = quote_ident(DELTA_TABLES[pipeline_key]["snapshot_date"])
+    snapshots = []
+    with conn.cursor() as cur:
+        for file_name, content_hash, rows in loaded:
+            staging = staging_table_name(shadow, content_hash)
+            cur.execute(f"SELECT MAX({date_column}) FROM {quote_ident(staging)}")
+            snapshots.append((cur.fetchone()[0], file_name, staging))
+
+    for snapshot_date, file_name, staging in sorted(snapshots, key=lambda s: (s[0] is None, s[0], s[1])):
+        print(f"🔁 Merging {file_name} (snapshot {snapshot_date})")
+        with conn.cursor() as cur:
+            if partition_column(cur, shadow):
+                ensure_partitions(shadow, [snapshot_date], cur=cur)
+        print_delta(pipeline_key, merge_snapshot(conn, pipeline_key, staging, target=shadow))
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE {quote_ident(staging)}")
+        conn.commit()
+
+def drop_backfill_staging(conn, shadow, files):
+    with conn.cursor() as cur:
+        for file_path in files:
+            cur.execute(f"DROP TABLE IF EXISTS {quote_ident(staging_table_name(shadow, file_fingerprint(file_path)))}")
+
+def backfill(pipeline_key, workers=1):
+    """
+    Rebuild a pipeline's table from every file in its processed/ folder.
 
-            if file_already_loaded(pipeline_key, file_name, conn):
-                print(f"⏩ Already processed: {file_name}")
-                continue
+    Files are parsed and copied in parallel into an index-free shadow table; the
+    live table's indexes are then built once on the shadow, which is swapped in
+    atomically together with a 'backfilled' etl_log row per file. Readers see the
+    old table until the swap commits. Any failure drops the shadow and leaves the
+    live table untouched. Snapshot tables in delta mode merge the files into the
+    shadow one at a time, in snapshot date order, before the indexes are built.
+    Store-day rollups are rebuilt from the new table in the swap's transaction.
+    """
+    start = time.perf_counter()
+    processed = pipeline_folder(pipeline_key, "processed")
+    files = sorted(os.path.join(processed, name) for name in os.listdir(processed)
+                   if os.path.isfile(os.path.join(processed, name))) if os.path.isdir(processed) else []
+    if not files:
+        print(f"📭 No files in {processed} to backfill.")
+        return False
 
-            try:
-                print(f"🟡 Running pipeline: {pipeline_key} for file: {file_name}")
-                df = etl_function(file_path)
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        if not table_exists(conn, pipeline_key):
+            print(f"❌ Table {pipeline_key} does not exist; create it from sql/ first.")
+            return False
 
-                if df is not None and not df.empty:
+        shadow = create_shadow(conn, pipeline_key)
+        conn.commit()
+        print(f"🏗️ Backfilling {pipeline_key} from {len(files)} files into {shadow} with {workers} worker(s)")
+
+        loaded = []
+        try:
+            # spawn: workers open their own pooled connections instead of inheriting ours
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {pool.submit(backfill_file, pipeline_key, file_path, shadow): file_path
+                           for file_path in files}
+                for future in as_completed(futures):
                     try:
-                        upload_to_postgres(df, table_name=pipeline_key)
-                        report_date = df["report_date"].iloc[0] if "report_date" in df.columns else None
-                        log_etl_file(pipeline_key, file_name, report_date, len(df), "success", conn)
-                        move_file(file_path, incoming_path.replace("incoming", "processed"))
-                        print(f"✅ {file_name} processed successfully.\n")
-                    except Exception as upload_err:
-                        log_etl_file(pipeline_key, file_name, None, 0, f"failed: {str(upload_err)[:200]}", conn)
-                        move_file(file_path, incoming_path.replace("incoming", "rejected"))
-                        print(f"❌ Upload failed for {file_name}: {upload_err}\n")
-
-                    move_file(file_path, incoming_path.replace("incoming", "processed"))
-                    print(f"✅ {file_name} processed successfully.\n")
-
-                else:
-                    log_etl_file(pipeline_key, file_name, None, 0, "empty", conn)
-                    move_file(file_path, incoming_path.replace("incoming", "rejected"))
-                    print(f"⚠️ No data to upload for {file_name} — moved to rejected.\n")
-
-            except Exception as e:
-                log_etl_file(pipeline_key, file_name, None, 0, f"failed: {str(e)[:200]}", conn)
-                move_file(file_path, incoming_path.replace("incoming", "rejected"))
-                print(f"❌ Error processing {file_name}: {e}\n")
-
-    conn.close()
+                        file_name, content_hash, rows = future.result()
+                    except Exception:
+                        pool.shutdown(cancel_futures=True)
+                        raise
+                    loaded.append((file_name, content_hash, rows))
+                    print(f"📦 {file_name}: {rows} rows ({len(loaded)}/{len(files)})")
+
+            if is_delta(pipeline_key):
+                merge_backfill_snapshots(conn, pipeline_key, shadow, loaded)
+
+            index_start = time.perf_counter()
+            renames = build_shadow_indexes(conn, pipeline_key)
+            conn.commit()
+            print(f"🗂️ Built {len(renames)} index(es) in {time.perf_counter() - index_start:.1f}s")
+
+            swap_in(conn, pipeline_key, renames)
+            if has_rollup(pipeline_key):
+                with conn.cursor() as cur:
+                    rebuild_rollup(cur, pipeline_key)
+            with conn.cursor() as cur:
+                cur.executemany(INSERT_LOG_SQL, [
+                    (pipeline_key, file_name, None, rows, "backfilled", content_hash, *log_values())
+                    for file_name, content_hash, rows in loaded
+                ])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if is_delta(pipeline_key):
+                drop_backfill_staging(conn, shadow, files)
+            drop_shadow(conn, pipeline_key)
+            conn.commit()
+            print(f"❌ Backfill of {pipeline_key} failed, live table left unchanged: {e}")
+            return False
+    finally:
+        conn.close()
+
+    total_rows = sum(rows for _, _, rows in loaded)
+    wall_s = time.perf_counter() - start
+    print(f"🏁 Swapped in {pipeline_key}: {total_rows} rows from {len(loaded)} files in {wall_s:.1f}s "
+          f"({total_rows / wall_s:,.0f} rows/s)\n")
+    return True
+
+# === Partitioning ===
+def partition_pipeline(pipeline_key):
+    """Convert a pipeline's plain table to daily range partitions on its business date, via a shadow swap."""
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            column = partition_column(cur, pipeline_key)
+        if column:
+            print(f"⏩ {pipeline_key} is already partitioned on {column}")
+            return True
+        if not table_exists(conn, pipeline_key):
+            print(f"❌ Table {pipeline_key} does not exist; create it from sql/ first.")
+            return False
+
+        start = time.perf_counter()
+        try:
+            partitions = partition_table(conn, pipeline_key, PARTITION_COLUMNS[pipeline_key])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            drop_shadow(conn, pipeline_key)
+            conn.commit()
+            print(f"❌ Partitioning {pipeline_key} failed, table left unchanged: {e}")
+            return False
+    finally:
+        conn.close()
+
+    print(f"🧱 Partitioned {pipeline_key} on {PARTITION_COLUMNS[pipeline_key]} into {partitions} daily "
+          f"partition(s) in {time.perf_counter() - start:.1f}s\n")
+    return True
+
+# === Rollups ===
+def rebuild_rollups():
+    """Recompute every store-day rollup from its detail table, e.g. after creating the rollup tables."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            for pipeline_key, rollup in ROLLUPS.items():
+                store_days = rebuild_rollup(cur, pipeline_key)
+                print(f"🧮 Rebuilt {rollup['table']}: {store_days} store-day(s) from {pipeline_key}")
+        conn.commit()
+
+# === Main Runner ===
+def main(workers=1, loaders=2, batch=False):
+    start = time.perf_counter()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        work = collect_work(conn)
+        if batch and work:
+            results = run_batched(work, workers, conn)
+        elif workers > 1 and work:
+            results = run_parallel(work, workers, max(1, loaders))
+        else:
+            results = run_serial(work, conn)
+    finally:
+        conn.close()
+
+    print_timing_report(results, time.perf_counter() - start, workers)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load every file waiting in data_files/*/incoming.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse files in a pool of N processes (default: 1, serial)")
+    parser.add_argument("--loaders", type=int, default=2,
+                        help="max concurrent loader connections in --workers mode (default: 2)")
+    parser.add_argument("--batch", action="store_true",
+                        help="load small files for the same table together, one transaction per batch "
+                             "(ETL_BATCH_ROWS / ETL_BATCH_FILES); parses with --workers")
+    parser.add_argument("--backfill", choices=list(pipeline_map), metavar="PIPELINE",
+                        help="rebuild PIPELINE's table from its processed/ files via a shadow table "
+                             "and atomic swap (uses --workers)")
+    parser.add_argument("--partition", choices=list(pipeline_map), metavar="PIPELINE",
+                        help="convert PIPELINE's plain table to daily range partitions on its business date")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="recompute the store-day rollup tables from the detail tables")
+    args = parser.parse_args()
+    if args.partition:
+        partition_pipeline(args.partition)
+    elif args.rebuild_rollups:
+        rebuild_rollups()
+    elif args.backfill:
+        backfill(args.backfill, workers=max(1, args.workers))
+    else:
+        main(workers=args.workers, loaders=args.loaders, batch=args.batch)
@@ -0,0 +1,89 @@
+"""
+Hand files to the running watcher (watch_incoming.py / etl-watcher.service) and
+print how each one loaded. Only the standard library is imported, so a cron job or
+a shell loop pays ~0.1s per call instead of a cold etl_runner.py start; the
+parsing and loading happen in the watcher, which already has everything warm.
+
+    python etl_submit.py data_files/daily_sales_tax/incoming/salestaxnightly_0528.txt
+    python etl_submit.py --pipeline daily_sales_tax /srv/drop/salestaxnightly_0528.txt
+    python etl_submit.py --scan
+
+Exits 1 if any file did not load, 2 if the watcher is not running.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def dotenv_value(name, path=os.path.join(REPO_DIR, ".env")):
+    """`name` from the .env the watcher loads (plain KEY=value lines), or None."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("export "):
+            line = line[len("export "):]
+        key, sep, value = line.partition("=")
+        if not sep or key.strip() != name:
+            continue
+        value = value.strip()
+        if value[:1] in ("'", '"') and value.endswith(value[0]) and len(value) > 1:
+            return value[1:-1]
+        return value.split(" #", 1)[0].strip()
+    return None
+
+# Resolved like the watcher's: the environment, then .env, relative to this folder
+SOCKET_PATH = os.path.join(REPO_DIR, os.getenv("ETL_SOCKET") or dotenv_value("ETL_SOCKET")
+                           or os.path.join("data_files", "etl.sock"))
+
+STATUS_ICONS = {"success": "✅", "duplicate": "⏩", "empty": "⚠️", "missing": "⚠️"}
+
+# Outcomes that do not fail the command: the file is (already) in the database, or had nothing in it
+OK_STATUSES = {"success", "duplicate", "empty"}
+
+def submit(files, pipeline=None, scan=False, socket_path=SOCKET_PATH):
+    """Send one request and yield the watcher's reply lines as dicts, the last one with done=True."""
+    request = {"files": [os.path.abspath(path) for path in files], "pipeline": pipeline, "scan": scan}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode())
+        with sock.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                yield json.loads(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load files through the running ETL watcher")
+    parser.add_argument("files", nargs="*", help="Files to load; their incoming/ folder picks the pipeline")
+    parser.add_argument("--pipeline", help="Pipeline for files outside an incoming/ folder")
+    parser.add_argument("--scan", action="store_true", help="Also load every file already in the incoming/ folders")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Watcher socket (default: ETL_SOCKET or data_files/etl.sock)")
+    args = parser.parse_args()
+    if not args.files and not args.scan:
+        parser.error("give files to load, or --scan")
+
+    failed = 0
+    try:
+        for reply in submit(args.files, args.pipeline, args.scan, args.socket):
+            if reply.get("done"):
+                if reply.get("error"):
+                    print(f"❌ {reply['error']}")
+                    return 1
+                print(f"🏁 {reply['files']} file(s) in {reply['seconds']}s")
+                break
+            name = os.path.basename(reply["file"])
+            icon = STATUS_ICONS.get(reply["status"], "❌")
+            print(f"{icon} {name} → {reply['pipeline']}: {reply['status']} ({reply['rows']} rows)")
+            failed += reply["status"] not in OK_STATUSES
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ No watcher listening on {args.socket} (is etl-watcher.service running?)")
+        return 2
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
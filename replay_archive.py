@@ -0,0 +1,176 @@
+"""
+Bulk-load archived Parquet partitions (see utils/archive.py) back into Postgres,
+skipping the text parsers entirely. Use it to rebuild a table after recreating it
+from sql/create_*.sql, or to reload a range of days.
+
+    python replay_archive.py --truncate
+    python replay_archive.py --pipeline daily_detail_sales --since 2025-01-01 --until 2025-01-31 --replace
+
+Each pipeline is replayed in one transaction, together with one etl_log row
+(status 'replayed') per source file, so a failed replay leaves the table as it was.
+Snapshot tables in delta mode (ETL_DELTA_LOAD) are rebuilt with --truncate only:
+each archived snapshot is merged in date order instead of appended. Store-day
+rollups (utils/rollups.py) are recomputed for the replayed dates.
+
+Rows archived without a date (date=unknown) are replayed when no date range is
+given; --replace then deletes the table's undated rows first. On a partitioned
+table (utils/partitions.py) each day is copied straight into its partition, and
+--replace swaps in a freshly loaded partition per day instead of deleting the
+day's rows. Undated rows go to the table's undated table there.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from utils.archive import ARCHIVE_FOLDER, PARTITION_COLUMNS, UNKNOWN_DATE, archived_partitions, read_part
+from utils.etl_log import INSERT_LOG_SQL
+from utils.metrics import log_values
+from utils.postgres_uploader import copy_dataframe, ensure_table, get_engine, pooled_connection, quote_ident
+from utils.delta_load import is_delta, merge_snapshot, print_delta
+from utils.rollups import ROLLUPS, has_rollup, rebuild_rollup
+from utils.partitions import ensure_partitions, partition_column, partition_name, replace_partition, undated_table_name
+
+REPLAY_STAGING = "replay_snapshot"
+
+def clear_target(cur, pipeline, date_keys, truncate):
+    table = quote_ident(pipeline)
+    if truncate:
+        cur.execute(f"TRUNCATE {table}")
+        cur.execute(f"DROP TABLE IF EXISTS {quote_ident(undated_table_name(pipeline))}")
+        print(f"🧹 Truncated {pipeline}")
+        return
+
+    column = quote_ident(PARTITION_COLUMNS[pipeline])
+    dates = [date_key for date_key in date_keys if date_key != UNKNOWN_DATE]
+    if dates:
+        cur.execute(f"DELETE FROM {table} WHERE {column}::date = ANY(%s::date[])", (dates,))
+        print(f"🧹 Deleted {cur.rowcount} existing rows of {pipeline} for {len(dates)} day(s)")
+    if UNKNOWN_DATE in date_keys:
+        cur.execute(f"DELETE FROM {table} WHERE {column} IS NULL")
+        print(f"🧹 Deleted {cur.rowcount} existing rows of {pipeline} with no {PARTITION_COLUMNS[pipeline]}")
+
+def copy_parts(cur, pipeline, paths, sources, table, ensure=False):
+    """COPY archived parts into `table`, counting rows per source file. Returns the row count."""
+    rows = 0
+    for path in paths:
+        df, source_file, content_hash = read_part(path)
+        if df.empty:
+            continue
+        if ensure and rows == 0:
+            ensure_table(df, pipeline, "append", get_engine())
+        copy_dataframe(df, table, cur)
+        rows += len(df)
+        source = sources.setdefault(content_hash or path, [source_file or path, 0])
+        source[1] += len(df)
+    return rows
+
+def replay_partition(cur, pipeline, date_key, paths, sources, replace):
+    """Load one day into its partition of a partitioned table, replacing it if asked. Returns the row count."""
+    if replace:
+        return replace_partition(cur, pipeline, date_key,
+                                 lambda table: copy_parts(cur, pipeline, paths, sources, table))
+    ensure_partitions(pipeline, [date_key], cur=cur)
+    return copy_parts(cur, pipeline, paths, sources, partition_name(pipeline, pd.Timestamp(date_key)))
+
+def replay_undated(cur, pipeline, paths, sources, replace):
+    """Load a partitioned table's undated rows into its undated table, emptying it first if asked."""
+    undated = undated_table_name(pipeline)
+    if replace:
+        cur.execute(f"DROP TABLE IF EXISTS {quote_ident(undated)}")
+        print(f"🧹 Dropped the undated rows of {pipeline}")
+    ensure_partitions(pipeline, [None], cur=cur)
+    return copy_parts(cur, pipeline, paths, sources, undated)
+
+def merge_parts(conn, pipeline, paths, sources):
+    """Merge each source file's archived parts into a delta table as one snapshot. Returns the row count."""
+    snapshots = {}
+    for path in paths:
+        # Parts are named <content hash>-<first row>.parquet
+        snapshots.setdefault(os.path.basename(path).split("-", 1)[0], []).append(path)
+
+    rows = 0
+    for snapshot_paths in snapshots.values():
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE TEMP TABLE {REPLAY_STAGING} "
+                        f"(LIKE {quote_ident(pipeline)} INCLUDING DEFAULTS INCLUDING GENERATED)")
+            rows += copy_parts(cur, pipeline, snapshot_paths, sources, REPLAY_STAGING)
+        print_delta(pipeline, merge_snapshot(conn, pipeline, REPLAY_STAGING))
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE {REPLAY_STAGING}")
+    return rows
+
+def replay_pipeline(pipeline, since=None, until=None, truncate=False, replace=False):
+    """Load every archived part of one pipeline in a single transaction. Returns the row count."""
+    partitions = archived_partitions(pipeline, since, until)
+    if not partitions:
+        print(f"📭 Nothing archived for {pipeline}")
+        return 0
+
+    start = time.perf_counter()
+    total_rows = 0
+    sources = {}  # content hash -> [source file, rows]
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            partitioned = partition_column(cur, pipeline) is not None
+            # Partitioned days are replaced whole by replay_partition()
+            if truncate or (replace and not partitioned):
+                clear_target(cur, pipeline, [date_key for date_key, _ in partitions], truncate)
+
+            for date_key, paths in partitions:
+                if is_delta(pipeline):
+                    # merge_snapshot() sets undated rows aside itself
+                    if partitioned and date_key != UNKNOWN_DATE:
+                        ensure_partitions(pipeline, [date_key], cur=cur)
+                    partition_rows = merge_parts(conn, pipeline, paths, sources)
+                elif partitioned and date_key == UNKNOWN_DATE:
+                    partition_rows = replay_undated(cur, pipeline, paths, sources, replace)
+                elif partitioned:
+                    partition_rows = replay_partition(cur, pipeline, date_key, paths, sources, replace)
+                else:
+                    partition_rows = copy_parts(cur, pipeline, paths, sources, pipeline, ensure=total_rows == 0)
+                total_rows += partition_rows
+                print(f"📦 {pipeline} date={date_key}: {partition_rows} rows from {len(paths)} part(s)")
+
+            if has_rollup(pipeline):
+                dates = None if truncate else [date_key for date_key, _ in partitions if date_key != UNKNOWN_DATE]
+                store_days = rebuild_rollup(cur, pipeline, dates)
+                print(f"🧮 Rebuilt {store_days} store-day(s) of {ROLLUPS[pipeline]['table']}")
+
+            cur.executemany(INSERT_LOG_SQL, [
+                (pipeline, source_file, None, rows, "replayed", content_hash, *log_values())
+                for content_hash, (source_file, rows) in sources.items()
+            ])
+        conn.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Replayed {total_rows} rows of {pipeline} from {len(sources)} file(s) "
+          f"in {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:,.0f} rows/s)\n")
+    return total_rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipeline", choices=[*PARTITION_COLUMNS, "all"], default="all")
+    parser.add_argument("--since", help="first partition date to replay (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last partition date to replay (YYYY-MM-DD)")
+    clear = parser.add_mutually_exclusive_group()
+    clear.add_argument("--truncate", action="store_true", help="empty the target table first")
+    clear.add_argument("--replace", action="store_true",
+                       help="delete the target's rows for the replayed dates first")
+    args = parser.parse_args()
+
+    if args.truncate and (args.since or args.until):
+        parser.error("--truncate empties the whole table; use --replace with --since/--until")
+    if not ARCHIVE_FOLDER:
+        parser.error("ETL_ARCHIVE_DIR is empty, so there is no archive to replay")
+
+    pipelines = list(PARTITION_COLUMNS) if args.pipeline == "all" else [args.pipeline]
+    for pipeline in pipelines:
+        if is_delta(pipeline) and not args.truncate:
+            print(f"⚠️ Skipping {pipeline}: delta tables can only be rebuilt from scratch, with --truncate")
+            continue
+        replay_pipeline(pipeline, args.since, args.until, args.truncate, args.replace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+-- Drops the DEFAULT partitions the partitioned create_* scripts used to include. With one,
+-- every ATTACH of a new day locks the default partition and scans it, blocking behind
+-- loads and readers. Rows in it without a date are kept: the detached partition becomes
+-- <table>_undated, where the loaders now put such rows (utils/partitions.py). Stops if it
+-- still holds dated rows, which belong in a daily partition: move or delete them first.
+DO $$
+DECLARE
+    parent TEXT;
+    key_column TEXT;
+    has_dated BOOLEAN;
+    has_rows BOOLEAN;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['daily_detail_sales', 'daily_sales_tax', 'inbound_shipments'] LOOP
+        CONTINUE WHEN to_regclass(parent || '_default') IS NULL;
+        SELECT a.attname INTO key_column
+        FROM pg_partitioned_table p
+        JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+        WHERE p.partrelid = to_regclass(parent);
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I IS NOT NULL)', parent || '_default', key_column)
+            INTO has_dated;
+        IF has_dated THEN
+            RAISE EXCEPTION '%_default has rows with a %, which belong in a daily partition', parent, key_column;
+        END IF;
+
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, parent || '_default');
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I)', parent || '_default') INTO has_rows;
+        IF has_rows AND to_regclass(parent || '_undated') IS NULL THEN
+            EXECUTE format('ALTER TABLE %I RENAME TO %I', parent || '_default', parent || '_undated');
+        ELSIF has_rows THEN
+            RAISE EXCEPTION '% already has an undated table; move the rows of %_default into it first',
+                parent, parent;
+        ELSE
+            EXECUTE format('DROP TABLE %I', parent || '_default');
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,5 @@
+-- Adds content fingerprints to an existing etl_log (create_etl_log_table.sql already includes them)
+ALTER TABLE etl_log ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Speeds up the content duplicate check
+CREATE INDEX IF NOT EXISTS idx_etl_log_table_hash ON etl_log(table_name, content_hash);
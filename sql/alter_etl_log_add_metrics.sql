@@ -0,0 +1,11 @@
+-- Adds per-file timing columns to an existing etl_log (create_etl_log_table.sql already includes them)
+ALTER TABLE etl_log
+    ADD COLUMN IF NOT EXISTS read_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS header_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS parse_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS transform_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS upload_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS duration_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS bytes_read BIGINT,
+    ADD COLUMN IF NOT EXISTS rows_per_s DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS peak_rss_mb DOUBLE PRECISION;
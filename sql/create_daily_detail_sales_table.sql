@@ -1,5 +1,5 @@
 -- Drop existing table
-DROP TABLE IF EXISTS daily_detail_sales;
+DROP TABLE IF EXISTS daily_detail_sales, daily_detail_sales_undated;
 
 -- Recreate with new column structure and types
 CREATE TABLE daily_detail_sales (
@@ -30,5 +30,9 @@ CREATE TABLE daily_detail_sales (
     exception NUMERIC(12,2),
     invoice_date DATE,
     ship_qty NUMERIC(12,0)
-);
+) PARTITION BY RANGE (transaction_date);
+
+-- One partition per day, created by the loaders as days arrive (utils/partitions.py).
+-- No DEFAULT partition: it would be locked and scanned on every ATTACH. Rows without a date go
+-- to a plain daily_detail_sales_undated table instead, created the first time a load has one
 
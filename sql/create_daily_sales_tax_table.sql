@@ -1,5 +1,5 @@
 -- Drop the table if it already exists (optional safety for dev environments)
-DROP TABLE IF EXISTS daily_sales_tax;
+DROP TABLE IF EXISTS daily_sales_tax, daily_sales_tax_undated;
 
 -- Create the new daily_sales_tax table
 CREATE TABLE daily_sales_tax (
@@ -25,4 +25,8 @@ CREATE TABLE daily_sales_tax (
     filename TEXT,
     report_date DATE,
     date_loaded TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+) PARTITION BY RANGE (transaction_date);
+
+-- One partition per day, created by the loaders as days arrive (utils/partitions.py).
+-- No DEFAULT partition: it would be locked and scanned on every ATTACH. Rows without a date go
+-- to a plain daily_sales_tax_undated table instead, created the first time a load has one
@@ -0,0 +1,45 @@
+-- Per-store, per-day rollups of daily_detail_sales and daily_sales_tax, kept current by the
+-- loaders (utils/rollups.py; keep the columns in sync with ROLLUPS there).
+-- On a database that already has sales loaded, fill them with: python etl_runner.py --rebuild-rollups
+
+DROP TABLE IF EXISTS daily_store_sales;
+
+CREATE TABLE daily_store_sales (
+    store_no TEXT NOT NULL,
+    transaction_date DATE NOT NULL,
+    line_count INTEGER NOT NULL DEFAULT 0,
+    taxable_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    non_taxable_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    taxable_nonmerch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    non_tax_non_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    restock_charge NUMERIC(14,2) NOT NULL DEFAULT 0,
+    total_written_sales NUMERIC(14,2) NOT NULL DEFAULT 0,
+    sales_tax NUMERIC(14,2) NOT NULL DEFAULT 0,
+    grand_total_written_sales NUMERIC(14,2) NOT NULL DEFAULT 0,
+    -- Payment splits
+    cash_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    check_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    bank_card_amt NUMERIC(14,2) NOT NULL DEFAULT 0,
+    ar_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    financed NUMERIC(14,2) NOT NULL DEFAULT 0,
+    exchange NUMERIC(14,2) NOT NULL DEFAULT 0,
+    refund_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (store_no, transaction_date)
+);
+
+DROP TABLE IF EXISTS daily_store_sales_tax;
+
+CREATE TABLE daily_store_sales_tax (
+    store_no TEXT NOT NULL,
+    transaction_date DATE NOT NULL,
+    line_count INTEGER NOT NULL DEFAULT 0,
+    taxable_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    non_taxable_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    taxable_nonmerch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    non_tax_non_merch NUMERIC(14,2) NOT NULL DEFAULT 0,
+    restock_charge NUMERIC(14,2) NOT NULL DEFAULT 0,
+    sales_tax NUMERIC(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (store_no, transaction_date)
+);
@@ -10,8 +10,22 @@ CREATE TABLE etl_log (
     transaction_date DATE,
     row_count INTEGER DEFAULT 0,
     status TEXT,
-    load_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    load_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    content_hash TEXT,
+    -- Per-file stage timings in seconds, throughput and memory (see utils/metrics.py)
+    read_s DOUBLE PRECISION,
+    header_s DOUBLE PRECISION,
+    parse_s DOUBLE PRECISION,
+    transform_s DOUBLE PRECISION,
+    upload_s DOUBLE PRECISION,
+    duration_s DOUBLE PRECISION,
+    bytes_read BIGINT,
+    rows_per_s DOUBLE PRECISION,
+    peak_rss_mb DOUBLE PRECISION
 );
 
 -- Optional: Add an index to speed up duplicate checks
 CREATE INDEX idx_etl_log_table_file ON etl_log(table_name, filename);
+
+-- Speeds up the content duplicate check
+CREATE INDEX idx_etl_log_table_hash ON etl_log(table_name, content_hash);
@@ -1,5 +1,5 @@
 -- Drop the table if it already exists
-DROP TABLE IF EXISTS inbound_shipments;
+DROP TABLE IF EXISTS inbound_shipments, inbound_shipments_undated;
 
 -- Create the inbound_inventory table
 CREATE TABLE inbound_shipments (
@@ -20,5 +20,33 @@ CREATE TABLE inbound_shipments (
     "Item Create Date" DATE,
     "Avail Qty" INTEGER,
     "Report Date" DATE,
-    "PO Create Date" DATE
-);
+    "PO Create Date" DATE,
+    -- Delta mode (ETL_DELTA_LOAD, see utils/delta_load.py): hash of the key (Po No, Stock No,
+    -- Container No) to join snapshots on, hash of the other values, and the snapshot date a
+    -- line stopped appearing; open lines have no closed_date. Both hashes are computed from
+    -- the stored values, so they do not depend on how the loader typed them. Dates go in as
+    -- day numbers (date::text depends on DateStyle, so is not allowed here)
+    key_hash BIGINT GENERATED ALWAYS AS (hashtextextended(
+        COALESCE("Po No", '') || chr(9) || COALESCE("Stock No", '') || chr(9) || COALESCE("Container No", ''), 0
+    )) STORED,
+    row_hash BIGINT GENERATED ALWAYS AS (hashtextextended(
+        COALESCE("Vendor No", '') || chr(9) || COALESCE("Product Name", '') || chr(9) || COALESCE("Division", '')
+        || chr(9) || COALESCE("Dept", '') || chr(9) || COALESCE("ETA Week", '')
+        || chr(9) || COALESCE(("ETA Date" - DATE '2000-01-01')::text, '')
+        || chr(9) || COALESCE(("Rqst Ship Date" - DATE '2000-01-01')::text, '')
+        || chr(9) || COALESCE(("Confirm Date" - DATE '2000-01-01')::text, '')
+        || chr(9) || COALESCE("Qty"::text, '') || chr(9) || COALESCE("Confirmation No", '')
+        || chr(9) || COALESCE("Last Cost"::text, '')
+        || chr(9) || COALESCE(("Item Create Date" - DATE '2000-01-01')::text, '')
+        || chr(9) || COALESCE("Avail Qty"::text, '')
+        || chr(9) || COALESCE(("PO Create Date" - DATE '2000-01-01')::text, ''), 0
+    )) STORED,
+    closed_date DATE
+) PARTITION BY RANGE ("Report Date");
+
+-- One partition per report date, created by the loaders as snapshots arrive (utils/partitions.py).
+-- No DEFAULT partition: it would be locked and scanned on every ATTACH. Rows without a date go
+-- to a plain inbound_shipments_undated table instead, created the first time a load has one
+
+-- Open lines by key
+CREATE INDEX idx_inbound_shipments_open_key ON inbound_shipments (key_hash) WHERE closed_date IS NULL;
@@ -0,0 +1,7 @@
+import os
+
+# The sample reports the tests parse
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_files")
+
+def sample(name):
+    return os.path.join(DATA_DIR, name)
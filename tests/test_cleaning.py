@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import collapse_whitespace, parse_dates, strip_asterisks
+
+def test_parse_dates_uses_the_declared_format():
+    dates = parse_dates(pd.Series(["01/02/25", " 01/02/25 ", "", None], name="d"), "%m/%d/%y")
+    assert dates.tolist()[:2] == [pd.Timestamp("2025-01-02")] * 2
+    assert dates.iloc[2:].isna().all()
+
+def test_parse_dates_parses_each_string_once():
+    cache = {}
+    parse_dates(pd.Series(["01/02/25", "01/03/25", "01/02/25"], name="d"), "%m/%d/%y", cache)
+    assert set(cache) == {"01/02/25", "01/03/25"}
+
+    # A later chunk takes cached strings from the cache instead of parsing them again
+    cache["01/02/25"] = np.datetime64("1999-12-31")
+    dates = parse_dates(pd.Series(["01/02/25", "01/04/25"], name="d"), "%m/%d/%y", cache)
+    assert dates.tolist() == [pd.Timestamp("1999-12-31"), pd.Timestamp("2025-01-04")]
+    assert "01/04/25" in cache
+
+def test_parse_dates_counts_unparseable_rows():
+    unparseable = {}
+    series = pd.Series(["01/02/25", "2025-01-02", "2025-01-02", "", None], name="d")
+    dates = parse_dates(series, "%m/%d/%y", {}, unparseable)
+    assert unparseable == {"d": 2}
+    assert dates.isna().tolist() == [False, True, True, True, True]
+
+def test_parse_dates_categorical():
+    series = pd.Series(pd.Categorical(["01/02/25", None, "01/02/25"]), name="d")
+    dates = parse_dates(series, "%m/%d/%y")
+    assert dates.isna().tolist() == [False, True, False]
+
+def test_collapse_whitespace():
+    df = pd.DataFrame({
+        "a": ["  x   y ", None, "z"],
+        "b": pd.Categorical([" p  q", "p q", None]),
+        "n": [1.0, 2.0, 3.0],
+    })
+    out = collapse_whitespace(df)
+    assert out["a"].tolist()[::2] == ["x y", "z"] and pd.isna(out["a"].iloc[1])
+    assert isinstance(out["b"].dtype, pd.CategoricalDtype)
+    assert list(out["b"].cat.categories) == ["p q"]
+    assert out["n"].tolist() == [1.0, 2.0, 3.0]
+
+def test_strip_asterisks():
+    assert strip_asterisks(pd.Series(["0.00 *", "12.50", " 3 * "])).tolist() == ["0.00", "12.50", "3"]
@@ -0,0 +1,48 @@
+import os
+import re
+
+from etl.inbound_shipments_etl import SPEC
+from utils.delta_load import DELTA_TABLES, KEY_HASH_COLUMN, _key_match
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+def generated(script, column):
+    """The expression `column` is generated from in a sql/ script, whitespace collapsed."""
+    with open(os.path.join(SQL_DIR, script), encoding="utf-8") as f:
+        sql = f.read()
+    match = re.search(rf"{column} BIGINT GENERATED ALWAYS AS \((.*?)\) STORED", sql, re.DOTALL)
+    assert match, f"no generated {column} in {script}"
+    return re.sub(r"\s+", " ", match.group(1))
+
+def hashed_columns(expression):
+    return re.findall(r'"([^"]+)"', expression)
+
+def test_key_hash_covers_the_keys():
+    config = DELTA_TABLES["inbound_shipments"]
+    assert hashed_columns(generated("create_inbound_shipments_table.sql", "key_hash")) == config["keys"]
+
+def test_row_hash_covers_every_other_column():
+    # Every value but the key and the snapshot date: a change to any of them updates the row
+    config = DELTA_TABLES["inbound_shipments"]
+    values = [column["name"] for column in SPEC["columns"].values()
+              if column["name"] not in config["keys"] + [config["snapshot_date"]]]
+    assert sorted(hashed_columns(generated("create_inbound_shipments_table.sql", "row_hash"))) == sorted(values)
+
+def test_row_hash_hashes_dates_as_day_numbers():
+    # date::text depends on DateStyle; day numbers do not
+    expression = generated("create_inbound_shipments_table.sql", "row_hash")
+    dates = [column["name"] for column in SPEC["columns"].values() if column["type"] == "date"]
+    for name in dates:
+        if f'"{name}"' in expression:
+            assert f'("{name}" - DATE \'2000-01-01\')::text' in expression
+
+def test_migration_generates_the_same_hashes():
+    for column in ("key_hash", "row_hash"):
+        assert (generated("alter_inbound_shipments_add_delta.sql", column)
+                == generated("create_inbound_shipments_table.sql", column))
+
+def test_key_match_joins_on_key_hash_and_guards_each_key():
+    condition = _key_match("inbound_shipments", "t", "s")
+    assert condition.startswith(f"t.{KEY_HASH_COLUMN} = s.{KEY_HASH_COLUMN}")
+    for key in DELTA_TABLES["inbound_shipments"]["keys"]:
+        assert f'COALESCE(t."{key}", \'\') = COALESCE(s."{key}", \'\')' in condition
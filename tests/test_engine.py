@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from etl.engine import _hold_marker_tail, iter_pipeline, numeric, read_dtypes, run_pipeline, text
+
+# A small report: rows end each day with a "01/01/25 Totals:" marker row
+MARKED = {
+    "name": "marked",
+    "header": ["Name", "No"],
+    "columns": {"Name": text("name"), "No": numeric("no")},
+    "markers": {"day": {"column": "Name", "pattern": r"^(\d{2}/\d{2}/\d{2}) Totals:", "format": "%m/%d/%y"}},
+    "required": ["no"],
+}
+
+PLAIN = {
+    "name": "plain",
+    "header": ["Name", "No"],
+    "columns": {"Name": text("name"), "No": numeric("no")},
+}
+
+def write_report(tmp_path, rows, name="report.txt"):
+    path = tmp_path / name
+    path.write_text("Some Report\nName\tNo\n" + "".join(f"{a}\t{b}\n" for a, b in rows))
+    return str(path)
+
+def test_hold_marker_tail_ends_chunks_at_markers():
+    rows = ["a", "b", "01/01/25 Totals:", "c", "d", "e", "01/02/25 Totals:", "f"]
+    frame = pd.DataFrame({"Name": rows})
+    chunks = [frame.iloc[i:i + 3].reset_index(drop=True) for i in range(0, len(rows), 3)]
+
+    held = list(_hold_marker_tail(MARKED, iter(chunks)))
+    assert [list(chunk["Name"]) for chunk in held] == [
+        ["a", "b", "01/01/25 Totals:"],
+        ["c", "d", "e", "01/02/25 Totals:"],
+        ["f"],
+    ]
+
+def test_marker_dates_do_not_depend_on_chunk_boundaries(tmp_path):
+    path = write_report(tmp_path, [
+        ("a", 1), ("b", 2), ("01/01/25 Totals:", ""),
+        ("c", 3), ("d", 4), ("e", 5), ("01/02/25 Totals:", ""),
+        ("f", 6),
+    ])
+    whole = pd.concat(iter_pipeline(MARKED, path), ignore_index=True)
+    for chunksize in (1, 2, 3, 4):
+        chunked = pd.concat(iter_pipeline(MARKED, path, chunksize=chunksize), ignore_index=True)
+        pd.testing.assert_frame_equal(chunked, whole)
+
+    assert list(whole["name"]) == ["a", "b", "c", "d", "e", "f"]
+    assert list(whole["day"].dt.strftime("%Y-%m-%d").fillna("")) == [
+        "2025-01-01", "2025-01-01", "2025-01-02", "2025-01-02", "2025-01-02", "",
+    ]
+
+def test_marker_rows_skipped_on_resume(tmp_path):
+    path = write_report(tmp_path, [("a", 1), ("b", 2), ("01/01/25 Totals:", ""), ("c", 3), ("01/02/25 Totals:", "")])
+    rest = pd.concat(iter_pipeline(MARKED, path, chunksize=2, skip_rows=2), ignore_index=True)
+    assert list(rest["name"]) == ["c"]
+    assert rest["day"].iloc[0] == pd.Timestamp("2025-01-02")
+
+def test_lenient_reread_resumes_after_yielded_rows(tmp_path):
+    rows = [("a", 1), ("b", 2), ("c", 3), ("d", 4), ("e", "1,5"), ("f", 6), ("g", 7)]
+    path = write_report(tmp_path, rows)
+
+    df = pd.concat(iter_pipeline(PLAIN, path, chunksize=2), ignore_index=True)
+    assert list(df["name"]) == ["a", "b", "c", "d", "e", "f", "g"]
+    assert df["no"].dtype == np.float64
+    assert df["no"].isna().tolist() == [False, False, False, False, True, False, False]
+    assert df["no"].sum() == 23
+
+def test_lenient_reread_whole_file(tmp_path):
+    path = write_report(tmp_path, [("a", "1"), ("b", "x"), ("c", "3")])
+    df = run_pipeline(PLAIN, path)
+    assert list(df["name"]) == ["a", "b", "c"]
+    assert df["no"].isna().tolist() == [False, True, False]
+
+def test_read_dtypes_reads_numbers_as_text_when_lenient():
+    positions = {0: "Name", 1: "No"}
+    assert read_dtypes(PLAIN, positions) == {0: str, 1: "float64"}
+    assert read_dtypes(PLAIN, positions, lenient=True) == {0: str, 1: str}
+
+def test_missing_header_yields_nothing(tmp_path):
+    path = tmp_path / "other.txt"
+    path.write_text("Not\tThis\n1\t2\n")
+    assert list(iter_pipeline(PLAIN, str(path))) == []
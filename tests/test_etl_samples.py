@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from etl.daily_detail_sales_etl import run_etl as run_sales_etl
+from etl.daily_sales_tax_etl import run_etl as run_sales_tax_etl
+from etl.inbound_shipments_etl import iter_etl as stream_shipments_etl, run_etl as run_shipments_etl
+from tests import sample
+
+# The sample reports in data_files/ and the shape each ETL gives them
+SAMPLES = [
+    (run_sales_etl, "daily_detail_sales/20 - Phoenix Daily Detail 1.2.25.txt", (15, 27)),
+    (run_sales_etl, "daily_detail_sales/234707234 DAILYSALES.txt", (13, 27)),
+    (run_sales_etl, "daily_detail_sales/99 - Test Daily Detail 1.28.25.txt", (10, 27)),
+    (run_shipments_etl, "inbound_shipments/IncomingInvReportNew.tsv", (7235, 18)),
+    (run_sales_tax_etl, "daily_sales_tax/salestaxnightly_4_20250529.txt", (12, 21)),
+]
+
+@pytest.mark.parametrize("run_etl, name, shape", SAMPLES, ids=[name for _, name, _ in SAMPLES])
+def test_sample_shape(run_etl, name, shape):
+    assert run_etl(sample(name)).shape == shape
+
+@pytest.mark.parametrize("name", [name for _, name, _ in SAMPLES[:3]])
+def test_detail_rows_are_dated_and_totalled(name):
+    df = run_sales_etl(sample(name))
+    assert df["transaction_date"].notna().all()
+    assert df["store_no"].notna().all()
+    assert df["trns_no"].notna().all()
+    merch = df[["taxable_merch", "non_taxable_merch", "taxable_nonmerch", "non_tax_non_merch", "restock_charge"]]
+    pd.testing.assert_series_equal(df["total_written_sales"], merch.sum(axis=1), check_names=False)
+
+def test_tax_constants():
+    df = run_sales_tax_etl(sample("daily_sales_tax/salestaxnightly_4_20250529.txt"))
+    assert (df["filename"] == "salestaxnightly_4_20250529.txt").all()
+    assert df["transaction_date"].notna().all()
+
+def test_shipments_stream_matches_whole_file():
+    path = sample("inbound_shipments/IncomingInvReportNew.tsv")
+    whole = run_shipments_etl(path)
+    chunks = list(stream_shipments_etl(path, chunksize=1000))
+    assert len(chunks) == 8
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+
+def test_shipments_stream_resumes_after_skipped_rows():
+    path = sample("inbound_shipments/IncomingInvReportNew.tsv")
+    whole = run_shipments_etl(path)
+    rest = pd.concat(stream_shipments_etl(path, chunksize=1000, skip_rows=2500), ignore_index=True)
+    pd.testing.assert_frame_equal(rest, whole.iloc[2500:].reset_index(drop=True))
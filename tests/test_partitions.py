@@ -0,0 +1,45 @@
+import pandas as pd
+
+from utils.partitions import day_keys, day_table_name, ensure_partitions, partition_name, undated_table_name
+from utils.postgres_uploader import copy_grouped
+
+class RecordingCursor:
+    """Collects what copy_grouped() would COPY: {table: [csv lines]}."""
+    def __init__(self):
+        self.copied = {}
+
+    def copy_expert(self, sql, buffer):
+        table = sql.split()[1].strip('"')
+        self.copied.setdefault(table, []).extend(buffer.read().splitlines())
+
+def test_day_keys():
+    days = day_keys(pd.Series([pd.Timestamp("2025-01-28 13:45"), pd.Timestamp("2025-01-29"), pd.NaT]))
+    assert days.tolist()[:2] == [pd.Timestamp("2025-01-28"), pd.Timestamp("2025-01-29")]
+    assert pd.isna(days.iloc[2])
+
+def test_day_keys_of_strings():
+    days = day_keys(pd.Series(["2025-05-16", None, "not a date"]))
+    assert days.iloc[0] == pd.Timestamp("2025-05-16")
+    assert days.iloc[1:].isna().all()
+
+def test_table_names():
+    assert partition_name("daily_sales_tax", pd.Timestamp("2025-05-28")) == "daily_sales_tax_p20250528"
+    assert undated_table_name("daily_sales_tax") == "daily_sales_tax_undated"
+    assert day_table_name("daily_sales_tax", pd.Timestamp("2025-05-28")) == "daily_sales_tax_p20250528"
+    assert day_table_name("daily_sales_tax", pd.NaT) == "daily_sales_tax_undated"
+
+def test_rows_are_copied_to_their_day_or_the_undated_table():
+    df = pd.DataFrame({
+        "transaction_date": ["2025-01-28", None, "2025-01-29", "2025-01-28", "garbled"],
+        "trns_no": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    cur = RecordingCursor()
+    copy_grouped(df, day_keys(df["transaction_date"]), lambda day: day_table_name("daily_detail_sales", day), cur)
+    assert {table: [line.split(",")[1] for line in lines] for table, lines in cur.copied.items()} == {
+        "daily_detail_sales_p20250128": ["1", "4"],
+        "daily_detail_sales_undated": ["2", "5"],
+        "daily_detail_sales_p20250129": ["3"],
+    }
+
+def test_ensure_partitions_without_days_needs_no_connection():
+    assert ensure_partitions("daily_detail_sales", []) == []
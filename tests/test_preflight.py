@@ -0,0 +1,61 @@
+import pytest
+
+from etl.preflight import preflight, sniff
+from tests import sample
+
+DETAIL = "daily_detail_sales/99 - Test Daily Detail 1.28.25.txt"
+SHIPMENTS = "inbound_shipments/IncomingInvReportNew.tsv"
+TAX = "daily_sales_tax/salestaxnightly_4_20250529.txt"
+
+@pytest.mark.parametrize("pipeline, name", [
+    ("daily_detail_sales", DETAIL),
+    ("daily_detail_sales", "daily_detail_sales/20 - Phoenix Daily Detail 1.2.25.txt"),
+    ("daily_detail_sales", "daily_detail_sales/234707234 DAILYSALES.txt"),
+    ("inbound_shipments", SHIPMENTS),
+    ("daily_sales_tax", TAX),
+])
+def test_samples_load(pipeline, name):
+    assert preflight(pipeline, sample(name)) == ("load", None)
+
+@pytest.mark.parametrize("pipeline, name, belongs_to", [
+    ("inbound_shipments", DETAIL, "daily_detail_sales"),
+    ("daily_sales_tax", DETAIL, "daily_detail_sales"),
+    # Shares enough headers with the daily detail report to parse as one
+    ("daily_detail_sales", TAX, "daily_sales_tax"),
+    ("daily_detail_sales", SHIPMENTS, "inbound_shipments"),
+])
+def test_misfiled_samples_reroute(pipeline, name, belongs_to):
+    assert preflight(pipeline, sample(name)) == ("reroute", belongs_to)
+
+def test_sniff_finds_the_preamble():
+    pipeline, match = sniff(sample(DETAIL))
+    assert pipeline == "daily_detail_sales"
+    assert match["preamble"] and not match["duplicated"]
+
+def test_empty_file_rejected(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert preflight("daily_detail_sales", str(path)) == ("reject", "empty file")
+
+def test_file_without_a_header_rejected(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("nothing to see here\n")
+    action, reason = preflight("daily_detail_sales", str(path))
+    assert action == "reject" and reason.startswith("no known report header")
+
+def test_shipments_missing_a_column_rejected(tmp_path):
+    # inbound_shipments aborts on missing columns rather than filling them
+    lines = open(sample(SHIPMENTS), encoding="utf-8").read().splitlines(keepends=True)
+    fields = lines[0].rstrip("\r\n").split("\t")
+    keep = [i for i, field in enumerate(fields) if field.strip() != "Qty"]
+    path = tmp_path / "shipments.tsv"
+    path.write_text("".join("\t".join(line.rstrip("\r\n").split("\t")[i] for i in keep) + "\n"
+                            for line in lines[:50]))
+    assert preflight("inbound_shipments", str(path)) == ("reject", "inbound_shipments report with missing columns ['Qty']")
+
+def test_duplicated_column_rejected(tmp_path):
+    lines = open(sample(SHIPMENTS), encoding="utf-8").read().splitlines()
+    path = tmp_path / "shipments.tsv"
+    path.write_text("\n".join([lines[0] + "\tPo No"] + [line + "\t" for line in lines[1:50]]) + "\n")
+    action, reason = preflight("inbound_shipments", str(path))
+    assert action == "reject" and "duplicate columns ['Po No']" in reason
@@ -0,0 +1,138 @@
+import glob
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.metrics import stage
+
+# Columnar archive of everything loaded, for replaying without re-parsing.
+#
+# Every chunk a load uploads is also written as Parquet under
+#   <ARCHIVE_FOLDER>/_pending/<pipeline>/<hash>/<date>/<first row>.parquet
+# and, once the load has committed, moved into its partition:
+#   <ARCHIVE_FOLDER>/<pipeline>/date=YYYY-MM-DD/<hash>-<first row>.parquet
+# Pending parts survive a failed staged load, so a resumed load only writes the
+# chunks it still has to upload. replay_archive.py loads partitions back with COPY.
+
+# Empty disables archiving
+ARCHIVE_FOLDER = os.getenv("ETL_ARCHIVE_DIR", os.path.join("data_files", "archive"))
+
+# Partition key per pipeline: the business date each row belongs to
+PARTITION_COLUMNS = {
+    "daily_detail_sales": "transaction_date",
+    "inbound_shipments": "Report Date",
+    "daily_sales_tax": "transaction_date",
+}
+
+UNKNOWN_DATE = "unknown"
+
+def archive_enabled():
+    return bool(ARCHIVE_FOLDER)
+
+def _pending_folder(pipeline, content_hash):
+    return os.path.join(ARCHIVE_FOLDER, "_pending", pipeline, content_hash[:16])
+
+def partition_folder(pipeline, date_key):
+    return os.path.join(ARCHIVE_FOLDER, pipeline, f"date={date_key}")
+
+def _date_keys(df, pipeline):
+    column = PARTITION_COLUMNS.get(pipeline)
+    if column not in df.columns:
+        return pd.Series(UNKNOWN_DATE, index=df.index)
+    dates = pd.to_datetime(df[column], errors="coerce")
+    return dates.dt.strftime("%Y-%m-%d").fillna(UNKNOWN_DATE)
+
+def _to_arrow(df, metadata):
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python types in an object column: COPY sends text anyway
+        text_columns = {col: "string" for col in df.columns if df[col].dtype == object}
+        table = pa.Table.from_pandas(df.astype(text_columns), preserve_index=False)
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+def write_pending(df, pipeline, file_name, content_hash, first_row):
+    """Write one chunk to the file's pending archive, split by partition date."""
+    metadata = {b"etl_source_file": file_name.encode("utf-8"), b"etl_content_hash": content_hash.encode("ascii")}
+    for date_key, part in df.groupby(_date_keys(df, pipeline), sort=False):
+        folder = os.path.join(_pending_folder(pipeline, content_hash), date_key)
+        os.makedirs(folder, exist_ok=True)
+        pq.write_table(_to_arrow(part, metadata), os.path.join(folder, f"{first_row:012d}.parquet"))
+
+def discard_pending(pipeline, content_hash):
+    shutil.rmtree(_pending_folder(pipeline, content_hash), ignore_errors=True)
+
+def archived_chunks(chunks, pipeline, file_name, content_hash, start_row=0):
+    """
+    Yield `chunks` unchanged, archiving each one first. A load starting from row 0
+    discards parts left by an earlier attempt; a resumed load keeps them.
+    """
+    if not archive_enabled() or not content_hash:
+        yield from chunks
+        return
+
+    if start_row == 0:
+        discard_pending(pipeline, content_hash)
+
+    row = start_row
+    for chunk in chunks:
+        if not chunk.empty:
+            with stage("archive"):
+                write_pending(chunk, pipeline, file_name, content_hash, row)
+            row += len(chunk)
+        yield chunk
+
+def publish_archive(pipeline, content_hash):
+    """Move a committed load's pending parts into their date partitions. Returns the partitions touched."""
+    if not archive_enabled() or not content_hash:
+        return []
+
+    pending = _pending_folder(pipeline, content_hash)
+    dates = []
+    with stage("archive"):
+        for part in sorted(glob.glob(os.path.join(pending, "*", "*.parquet"))):
+            date_key = os.path.basename(os.path.dirname(part))
+            folder = partition_folder(pipeline, date_key)
+            os.makedirs(folder, exist_ok=True)
+            os.replace(part, os.path.join(folder, f"{content_hash[:16]}-{os.path.basename(part)}"))
+            if date_key not in dates:
+                dates.append(date_key)
+        shutil.rmtree(pending, ignore_errors=True)
+    return dates
+
+def archive_after_commit(pipeline, file_name, content_hash):
+    """Publish a load's archive parts; a failure here must not fail the committed load."""
+    try:
+        dates = publish_archive(pipeline, content_hash)
+        if dates:
+            print(f"🗄️ Archived {file_name} to {len(dates)} partition(s)")
+    except OSError as e:
+        print(f"⚠️ Could not archive {file_name} (rows are loaded; parts kept in _pending): {e}")
+
+def archived_partitions(pipeline, since=None, until=None):
+    """List (date_key, [parquet paths]) for a pipeline, oldest first, optionally within dates."""
+    partitions = []
+    for folder in sorted(glob.glob(os.path.join(ARCHIVE_FOLDER, pipeline, "date=*"))):
+        date_key = os.path.basename(folder).split("=", 1)[1]
+        if since or until:
+            if date_key == UNKNOWN_DATE:
+                continue
+            if (since and date_key < since) or (until and date_key > until):
+                continue
+        files = sorted(glob.glob(os.path.join(folder, "*.parquet")))
+        if files:
+            partitions.append((date_key, files))
+    return partitions
+
+def read_part(path):
+    """Return (DataFrame, source file name, content hash) for one archived part."""
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    return (
+        table.to_pandas(),
+        metadata.get(b"etl_source_file", b"").decode("utf-8") or None,
+        metadata.get(b"etl_content_hash", b"").decode("ascii") or None,
+    )
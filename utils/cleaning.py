@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Column-wise cleaning operations shared by the ETLs.
+#
+# String transforms run on each column's distinct values (pd.factorize) and are
+# broadcast back with a take, so the Python-level work is proportional to the
+# number of distinct strings per column, not rows x columns. Report columns repeat
+# a handful of values (store, vendor, division, trans desc...), so this is cheap.
+# Categorical columns are transformed through their categories and stay categorical.
+
+def _text_columns(df, columns=None):
+    if columns is None:
+        return [col for col in df.columns
+                if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return [col for col in columns if col in df.columns]
+
+def _via_uniques(series, transform, fill=np.nan):
+    """Apply a vectorized Series -> Series transform to the distinct values only."""
+    codes, uniques = pd.factorize(series)
+    values = np.asarray(transform(pd.Series(uniques, dtype=object)), dtype=object)
+    # Missing values get code -1, which take() maps to the appended fill value
+    values = np.append(values, [fill]).astype(object)
+    return pd.Series(values.take(codes), index=series.index, name=series.name)
+
+def _via_categories(series, transform):
+    """Apply the transform to a categorical's categories, merging any that become equal."""
+    values = transform(pd.Series(series.cat.categories, dtype=object))
+    codes, uniques = pd.factorize(values)
+    # Old code -> new code; missing (-1) takes the appended -1
+    recode = np.append(codes, [-1])
+    return pd.Series(
+        pd.Categorical.from_codes(recode.take(series.cat.codes.to_numpy()), uniques),
+        index=series.index, name=series.name,
+    )
+
+def collapse_whitespace(df, columns=None):
+    """Collapse runs of whitespace to one space and strip ends in string columns."""
+    def transform(values):
+        cleaned = values.str.replace(r"\s+", " ", regex=True).str.strip()
+        return cleaned.where(cleaned.notna(), values)  # leave non-string values as they are
+
+    for col in _text_columns(df, columns):
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _via_categories(df[col], transform)
+        else:
+            df[col] = _via_uniques(df[col], transform)
+    return df
+
+def parse_dates(series, date_format, cache=None, unparseable=None):
+    """
+    Parse date strings with an explicit format, once per distinct value.
+
+    Args:
+        series: Strings (object or categorical); surrounding whitespace is ignored and
+            blanks become NaT.
+        date_format: strptime format, e.g. "%m/%d/%y". Never inferred, so a file
+            cannot flip between m/d and d/m.
+        cache: Optional dict of string -> datetime64 (or NaT) shared across calls,
+            e.g. across the chunks of one file.
+        unparseable: Optional dict; the number of non-blank values that did not
+            parse is added under series.name.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, uniques = pd.factorize(series)
+    cache = {} if cache is None else cache
+
+    new = [value for value in uniques if value not in cache]
+    if new:
+        strings = pd.Series(new, dtype=object).str.strip()
+        parsed = pd.to_datetime(strings, format=date_format, errors="coerce")
+        cache.update(zip(new, parsed.to_numpy()))
+    dates = np.array([cache[value] for value in uniques] + [np.datetime64("NaT")], dtype="datetime64[ns]")
+
+    if unparseable is not None:
+        bad = np.isnat(dates[:-1]) & np.array([str(value).strip() != "" for value in uniques], dtype=bool)
+        if bad.any():
+            rows = np.bincount(codes[codes >= 0], minlength=len(uniques))[bad].sum()
+            unparseable[series.name] = unparseable.get(series.name, 0) + int(rows)
+
+    # Missing values (code -1) take the appended NaT
+    return pd.Series(dates.take(codes), index=series.index, name=series.name)
+
+def strip_asterisks(series):
+    """Remove '*' flags (e.g. A/R subtotals "0.00 *") and surrounding whitespace."""
+    return _via_uniques(
+        series.astype(str),
+        lambda values: values.str.replace("*", "", regex=False).str.strip(),
+    )
@@ -0,0 +1,140 @@
+import os
+
+from utils.etl_log import clear_checkpoints
+from utils.partitions import set_aside_undated
+from utils.postgres_uploader import quote_ident
+from utils.staged_load import insertable_columns, staging_table_name
+
+# Delta loading for snapshot reports.
+#
+# A snapshot report (inbound_shipments) restates every open line each day, so
+# appending it grows the table by a full snapshot per file. In delta mode the
+# table holds one open row per key instead: the file is staged as usual, and
+# merge_snapshot() then only updates rows whose row_hash changed, inserts new keys
+# and closes out (sets closed_date on) keys missing from the snapshot. Unchanged
+# rows are not written. Snapshots are joined on key_hash. Both hashes are BIGINTs
+# the table generates (sql/create_inbound_shipments_table.sql): key_hash from the
+# key columns, so the joins hash one integer instead of sorting text, and row_hash
+# from the stored values of the others, so it does not depend on the dtypes pandas
+# happened to give a file's columns.
+
+# Opt in once the table has been migrated (sql/alter_inbound_shipments_add_delta.sql)
+DELTA_LOAD = os.getenv("ETL_DELTA_LOAD", "").lower() in ("1", "true", "yes")
+
+# Snapshot tables: the columns identifying a row, and the column holding the snapshot's date
+DELTA_TABLES = {
+    "inbound_shipments": {
+        "keys": ["Po No", "Stock No", "Container No"],
+        "snapshot_date": "Report Date",
+    },
+}
+
+KEY_HASH_COLUMN = "key_hash"
+HASH_COLUMN = "row_hash"
+CLOSED_COLUMN = "closed_date"
+
+def is_delta(table_name):
+    return DELTA_LOAD and table_name in DELTA_TABLES
+
+def _key_match(table_name, left, right):
+    # key_hash does the joining; the key columns guard against hash collisions.
+    # Container No is blank for lines not yet on a container: treat NULLs as equal.
+    return " AND ".join([f"{left}.{KEY_HASH_COLUMN} = {right}.{KEY_HASH_COLUMN}"] + [
+        f"COALESCE({left}.{quote_ident(col)}, '') = COALESCE({right}.{quote_ident(col)}, '')"
+        for col in DELTA_TABLES[table_name]["keys"]
+    ])
+
+def latest_snapshot_date(conn, table_name):
+    """The newest date a merge has written to the table, or None if it is empty."""
+    date_column = quote_ident(DELTA_TABLES[table_name]["snapshot_date"])
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT GREATEST(MAX({date_column}), MAX({CLOSED_COLUMN})) FROM {quote_ident(table_name)}")
+        return cur.fetchone()[0]
+
+def merge_snapshot(conn, table_name, source, target=None):
+    """
+    Apply the snapshot held in table `source` to `target` (default: `table_name`),
+    on the caller's transaction. Keys repeated within the snapshot keep their first row;
+    rows with no snapshot date go to the undated table of a partitioned target.
+
+    Returns a dict of counts: rows, duplicates, inserted, updated, closed, unchanged.
+    """
+    target_name = target or table_name
+    target = quote_ident(target_name)
+    source_ident = quote_ident(source)
+    config = DELTA_TABLES[table_name]
+    key_columns = ", ".join([KEY_HASH_COLUMN] + [f"COALESCE({quote_ident(col)}, '')" for col in config["keys"]])
+
+    with conn.cursor() as cur:
+        columns = [col for col in insertable_columns(cur, table_name) if col != CLOSED_COLUMN]
+        cur.execute(f"SELECT COUNT(*), MAX({quote_ident(config['snapshot_date'])}) FROM {source_ident}")
+        rows, snapshot_date = cur.fetchone()
+        undated = set_aside_undated(cur, target_name, source, columns) if rows else 0
+        if rows == undated:
+            # An empty snapshot would close out every open row
+            return {"rows": rows, "duplicates": 0, "inserted": 0, "updated": 0, "closed": 0, "unchanged": 0}
+
+        cur.execute(f"""
+            DELETE FROM {source_ident} s
+            USING (SELECT ctid, ROW_NUMBER() OVER (PARTITION BY {key_columns} ORDER BY ctid) AS n
+                   FROM {source_ident}) d
+            WHERE s.ctid = d.ctid AND d.n > 1
+        """)
+        duplicates = cur.rowcount
+        cur.execute(f"ANALYZE {source_ident}")
+
+        assignments = ", ".join(f"{quote_ident(col)} = s.{quote_ident(col)}" for col in columns)
+        cur.execute(f"""
+            UPDATE {target} t SET {assignments}
+            FROM {source_ident} s
+            WHERE t.{CLOSED_COLUMN} IS NULL AND {_key_match(table_name, "t", "s")}
+              AND t.{HASH_COLUMN} IS DISTINCT FROM s.{HASH_COLUMN}
+        """)
+        updated = cur.rowcount
+
+        cur.execute(f"""
+            UPDATE {target} t SET {CLOSED_COLUMN} = %s
+            WHERE t.{CLOSED_COLUMN} IS NULL
+              AND NOT EXISTS (SELECT 1 FROM {source_ident} s WHERE {_key_match(table_name, "t", "s")})
+        """, (snapshot_date,))
+        closed = cur.rowcount
+
+        column_list = ", ".join(quote_ident(col) for col in columns)
+        cur.execute(f"""
+            INSERT INTO {target} ({column_list})
+            SELECT {", ".join(f"s.{quote_ident(col)}" for col in columns)} FROM {source_ident} s
+            WHERE NOT EXISTS (SELECT 1 FROM {target} t
+                              WHERE t.{CLOSED_COLUMN} IS NULL AND {_key_match(table_name, "t", "s")})
+        """)
+        inserted = cur.rowcount
+
+    if duplicates:
+        print(f"⚠️ {duplicates} row(s) repeated a {' / '.join(config['keys'])} key in the snapshot; kept one each")
+    return {"rows": rows, "duplicates": duplicates, "inserted": inserted, "updated": updated,
+            "closed": closed, "unchanged": rows - undated - duplicates - inserted - updated}
+
+def print_delta(table_name, counts):
+    print(f"🔁 {table_name} delta: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['closed']} closed, {counts['unchanged']} unchanged of {counts['rows']} rows")
+
+def publish_delta(conn, table_name, content_hash):
+    """
+    Merge a file's staged snapshot into the table and drop the staging table, on the
+    caller's connection; the delta-mode counterpart of publish_staged(). Refuses a
+    snapshot older than the newest change already merged. Returns the snapshot's rows.
+    """
+    staging = staging_table_name(table_name, content_hash)
+    date_column = quote_ident(DELTA_TABLES[table_name]["snapshot_date"])
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MAX({date_column}) FROM {quote_ident(staging)}")
+        snapshot_date = cur.fetchone()[0]
+    latest = latest_snapshot_date(conn, table_name)
+    if snapshot_date and latest and snapshot_date < latest:
+        raise ValueError(f"snapshot of {snapshot_date} is older than the {latest} one already merged")
+
+    counts = merge_snapshot(conn, table_name, staging)
+    print_delta(table_name, counts)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE {quote_ident(staging)}")
+    clear_checkpoints(conn, table_name, content_hash)
+    return counts["rows"]
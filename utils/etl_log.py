@@ -0,0 +1,194 @@
+import threading
+from psycopg2.extras import execute_batch
+from utils.metrics import LOG_COLUMNS, log_values
+from utils.postgres_uploader import pooled_connection
+
+# In-memory view of etl_log for the long-running watcher.
+#
+# Duplicate checks hit sets of loaded (table_name, filename) and
+# (table_name, content_hash) pairs, warmed from etl_log at startup and updated as
+# loads commit, so they cost no round-trip. Log rows for
+# files that did not load (duplicate/empty/error) are buffered and written in one
+# batch, either inside the next load transaction or by flush_etl_log().
+# Each row carries the stage timings of the run active when it was logged.
+# Inside a load, buffered rows go in under a savepoint: if they fail, the load
+# still commits and they are put back for flush_etl_log(), which drops (and
+# prints) any row that fails on its own.
+
+_loaded = set()
+_loaded_hashes = set()
+_pending = []
+_lock = threading.Lock()
+
+INSERT_LOG_SQL = f"""
+    INSERT INTO etl_log (table_name, filename, report_date, row_count, status, content_hash,
+                         {", ".join(LOG_COLUMNS)}, load_time)
+    VALUES (%s, %s, %s, %s, %s, %s, {", ".join(["%s"] * len(LOG_COLUMNS))}, NOW())
+"""
+
+def warm_loaded_index():
+    """Load every loaded (or replayed/backfilled) file name and content hash. Returns the file count."""
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT table_name, filename, content_hash
+                FROM etl_log WHERE status IN ('success', 'replayed', 'backfilled')
+            """)
+            rows = cur.fetchall()
+        conn.commit()
+
+    with _lock:
+        _loaded.clear()
+        _loaded.update((table, filename) for table, filename, _ in rows)
+        _loaded_hashes.clear()
+        _loaded_hashes.update((table, content_hash) for table, _, content_hash in rows if content_hash)
+    return len(_loaded)
+
+def is_file_already_loaded(table, filename):
+    with _lock:
+        return (table, filename) in _loaded
+
+def is_content_already_loaded(table, content_hash):
+    with _lock:
+        return (table, content_hash) in _loaded_hashes
+
+def mark_loaded(table, filename, content_hash=None):
+    """Record a load whose transaction has committed."""
+    with _lock:
+        _loaded.add((table, filename))
+        if content_hash:
+            _loaded_hashes.add((table, content_hash))
+
+def queue_etl_log(table, filename, report_date=None, row_count=None, status="success", content_hash=None):
+    """Buffer a log row; it is written with the next load or flush."""
+    row = (table, filename, report_date, row_count, status, content_hash, *log_values(row_count))
+    with _lock:
+        _pending.append(row)
+
+def _take_pending():
+    with _lock:
+        rows = list(_pending)
+        _pending.clear()
+    return rows
+
+def _requeue(rows):
+    with _lock:
+        _pending[:0] = rows
+
+def _write_pending(cur):
+    """
+    Write buffered rows on the caller's transaction, under a savepoint so a bad
+    row cannot fail the caller's load. Returns the rows written; if they fail,
+    they are put back and [] is returned.
+    """
+    taken = _take_pending()
+    if not taken:
+        return []
+    try:
+        cur.execute("SAVEPOINT etl_log_pending")
+        execute_batch(cur, INSERT_LOG_SQL, taken)
+        cur.execute("RELEASE SAVEPOINT etl_log_pending")
+    except Exception as e:
+        _requeue(taken)
+        cur.execute("ROLLBACK TO SAVEPOINT etl_log_pending")
+        print(f"⚠️ Buffered etl_log rows left for the next flush: {str(e).strip().splitlines()[0]}")
+        return []
+    return taken
+
+def write_etl_log(conn, table, filename, report_date=None, row_count=None, status="success", content_hash=None):
+    """
+    Write a log row plus any buffered rows on the caller's connection, so they
+    commit (or roll back) with the load itself. If the transaction rolls back,
+    pass the return value to after_rollback().
+    """
+    row = (table, filename, report_date, row_count, status, content_hash, *log_values(row_count))
+    return write_etl_log_rows(conn, [row])
+
+def write_etl_log_rows(conn, rows):
+    """
+    Like write_etl_log(), for several rows built by the caller (columns as in
+    INSERT_LOG_SQL). If writing the caller's rows fails, the buffered rows taken
+    are put back before the error is raised.
+    """
+    with conn.cursor() as cur:
+        taken = _write_pending(cur)
+        try:
+            execute_batch(cur, INSERT_LOG_SQL, rows)
+        except Exception:
+            _requeue(taken)
+            raise
+    return taken
+
+def after_rollback(rows):
+    """Put buffered rows taken by write_etl_log back after a rolled-back load."""
+    _requeue(rows)
+
+def flush_etl_log():
+    """
+    Write buffered log rows in one transaction. Returns the number written. If the
+    batch fails, rows are retried one at a time and any that still fail are dropped
+    (and printed) rather than kept, so one bad row cannot block the rest forever.
+    """
+    rows = _take_pending()
+    if not rows:
+        return 0
+    written = len(rows)
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SAVEPOINT etl_log_flush")
+                try:
+                    execute_batch(cur, INSERT_LOG_SQL, rows)
+                except Exception:
+                    cur.execute("ROLLBACK TO SAVEPOINT etl_log_flush")
+                    written = _write_each(cur, rows)
+            conn.commit()
+    except Exception:
+        _requeue(rows)
+        raise
+    return written
+
+def _write_each(cur, rows):
+    """Insert rows one by one, each under a savepoint; drop the ones that fail. Returns the number written."""
+    written = 0
+    for row in rows:
+        cur.execute("SAVEPOINT etl_log_row")
+        try:
+            cur.execute(INSERT_LOG_SQL, row)
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT etl_log_row")
+            print(f"❌ Dropped etl_log row for {row[1]} ({row[4]}): {str(e).strip().splitlines()[0]}")
+            continue
+        cur.execute("RELEASE SAVEPOINT etl_log_row")
+        written += 1
+    return written
+
+# === Checkpoints ===
+# A staged load (utils/staged_load.py) commits one 'checkpoint' row per chunk, in
+# the same transaction as the chunk itself; row_count is the running total of rows
+# staged, so the latest checkpoint says where a retry should resume.
+
+def write_checkpoint(conn, table, filename, content_hash, rows_staged):
+    """Record a staged chunk on the caller's connection; the caller commits."""
+    with conn.cursor() as cur:
+        cur.execute(INSERT_LOG_SQL, (table, filename, None, rows_staged, "checkpoint", content_hash,
+                                     *log_values()))
+
+def last_checkpoint(conn, table, content_hash):
+    """Rows staged by the latest checkpoint for this content, or 0."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT row_count FROM etl_log
+            WHERE table_name = %s AND content_hash = %s AND status = 'checkpoint'
+            ORDER BY id DESC LIMIT 1
+        """, (table, content_hash))
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+def clear_checkpoints(conn, table, content_hash):
+    """Drop the checkpoints of a staged load once it is published (or restarted)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM etl_log
+            WHERE table_name = %s AND content_hash = %s AND status = 'checkpoint'
+        """, (table, content_hash))
@@ -0,0 +1,17 @@
+import hashlib
+
+# Read size per hash update; keeps memory flat for any file size
+BLOCK_SIZE = 1 << 20
+
+def file_fingerprint(file_path, block_size=BLOCK_SIZE):
+    """
+    Return a hex content fingerprint of a file, read in fixed-size blocks.
+
+    BLAKE2b is in the standard library and hashes faster than SHA-256 on 64-bit
+    CPUs; a 128-bit digest is plenty to tell report exports apart.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,340 @@
+import contextvars
+import io
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-file stage timings, written to etl_log and to a Prometheus textfile.
+#
+# A run is a plain dict held in a context variable, so ETL code can time its
+# stages with `with stage("parse"):` without passing anything around. Stages nest
+# exclusively: time spent in an inner stage (e.g. the uploader pulling parsed
+# chunks out of a streaming ETL) is not counted again in the outer one.
+# Outside a run, stage() and friends do nothing.
+#
+# Peak memory is per process, not per run. While a run is the only one active in
+# its process, its peak is exact: the kernel's high-water mark (VmHWM) is restarted
+# when it begins. Once runs overlap (the watcher's workers, --workers loader
+# threads), VmHWM is left alone and each run instead gets the highest resident
+# size sampled every ETL_RSS_SAMPLE_MS while it was active. That is the whole
+# process's memory, so it includes whatever the other runs held at the time, and
+# a spike shorter than the sampling interval can be missed.
+
+STAGES = ["read", "header", "parse", "transform", "upload", "archive", "log"]
+
+# etl_log columns filled from the active run ("log" can't time the row it is in)
+LOG_COLUMNS = [
+    "read_s", "header_s", "parse_s", "transform_s", "upload_s",
+    "duration_s", "bytes_read", "rows_per_s", "peak_rss_mb",
+]
+
+# node_exporter's --collector.textfile.directory; unset disables the textfile
+METRICS_DIR = os.getenv("ETL_METRICS_DIR")
+
+# How often overlapping runs sample the process's resident size
+RSS_SAMPLE_S = int(os.getenv("ETL_RSS_SAMPLE_MS", "50")) / 1000
+
+_current = contextvars.ContextVar("etl_run", default=None)
+_totals = {}
+_totals_lock = threading.Lock()
+
+# Active runs in this process, by thread; one per thread
+_active = {}
+_active_lock = threading.Lock()
+_sampler_pid = None
+
+# === Memory ===
+def _status_mb(field):
+    """A VmXXX field of /proc/self/status in MB, or None off Linux."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB."""
+    # ru_maxrss survives fork+exec, so a spawned child would report the parent's
+    # peak; VmHWM belongs to the new address space and can be reset.
+    peak = _status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def rss_mb():
+    """Current resident memory of this process in MB (the peak, where that is unknown)."""
+    rss = _status_mb("VmRSS")
+    return rss if rss is not None else peak_rss_mb()
+
+def reset_peak_rss():
+    """Restart VmHWM from current usage (Linux only; a no-op elsewhere)."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _sample_rss():
+    while True:
+        time.sleep(RSS_SAMPLE_S)
+        with _active_lock:
+            if not _active:
+                continue
+            rss = rss_mb()
+            for run in _active.values():
+                run["peak_rss_mb"] = max(run["peak_rss_mb"], rss)
+
+def _run_peak_mb(run):
+    """The process's peak so far, if only `run` has been active since it began; else its current size."""
+    return peak_rss_mb() if run.get("_solo") else rss_mb()
+
+def _activate(run):
+    """
+    Make `run` this thread's active run, replacing any it had. Restarts VmHWM if no
+    other thread has one, otherwise switches every active run over to sampling.
+    """
+    global _sampler_pid
+    thread = threading.get_ident()
+    alive = {t.ident for t in threading.enumerate()}
+    with _active_lock:
+        for key, other in list(_active.items()):
+            if key == thread or key not in alive or other is run:
+                del _active[key]
+        if _active:
+            run["_solo"] = False
+            for other in _active.values():
+                if other["_solo"]:
+                    other["peak_rss_mb"] = max(other["peak_rss_mb"], peak_rss_mb())
+                    other["_solo"] = False
+        else:
+            reset_peak_rss()
+            run["_solo"] = True
+        _active[thread] = run
+
+        # Threads do not survive fork, so a forked worker starts its own sampler
+        if _sampler_pid != os.getpid():
+            _sampler_pid = os.getpid()
+            threading.Thread(target=_sample_rss, name="rss-sampler", daemon=True).start()
+
+def _deactivate(run):
+    with _active_lock:
+        for key, other in list(_active.items()):
+            if other is run:
+                del _active[key]
+
+# === Runs ===
+def start_run(pipeline, file_name):
+    """Begin timing one file in this thread/task. Returns the run dict."""
+    run = {
+        "pipeline": pipeline,
+        "file": file_name,
+        "started": time.perf_counter(),
+        "stages": dict.fromkeys(STAGES, 0.0),
+        "bytes_read": 0,
+        "peak_rss_mb": 0.0,
+        "_open": [],
+    }
+    _activate(run)
+    _current.set(run)
+    return run
+
+def use_run(run):
+    """
+    Continue a run started elsewhere, e.g. in the parser process that returned it.
+    Time spent between the two (pickling, queueing) counts towards the duration.
+    """
+    run["started"] = time.perf_counter() - run.get("duration_s", 0.0)
+    run["_open"] = []
+    _activate(run)
+    _current.set(run)
+    return run
+
+@contextmanager
+def stage(name):
+    """Add the time spent in this block, minus nested stages, to the current run."""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+
+    frame = [time.perf_counter(), 0.0]  # start, time taken by nested stages
+    run["_open"].append(frame)
+    try:
+        yield
+    finally:
+        run["_open"].pop()
+        elapsed = time.perf_counter() - frame[0]
+        run["stages"][name] += elapsed - frame[1]
+        if run["_open"]:
+            run["_open"][-1][1] += elapsed
+
+def add_bytes(count):
+    run = _current.get()
+    if run is not None:
+        run["bytes_read"] += count
+
+class _TimedRaw(io.RawIOBase):
+    """Raw reader that books its reads as the "read" stage of the current run."""
+    def __init__(self, f, limit=None):
+        self._f = f
+        self._remaining = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining is not None:
+            if self._remaining <= 0:
+                return 0
+            buffer = memoryview(buffer)[:self._remaining]
+        with stage("read"):
+            count = self._f.readinto(buffer)
+        add_bytes(count or 0)
+        if self._remaining is not None:
+            self._remaining -= count or 0
+        return count
+
+def timed_reader(f, limit=None):
+    """
+    Wrap a binary file so disk reads are timed apart from the parser consuming them.
+    With `limit`, reading stops after that many bytes (e.g. where a footer starts).
+    """
+    return io.BufferedReader(_TimedRaw(f, limit))
+
+def timed_iter(iterable, name):
+    """Yield from `iterable`, timing each step (e.g. a chunked read_csv) as stage `name`."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def snapshot(row_count=None):
+    """Duration, throughput and peak memory of the current run so far."""
+    run = _current.get()
+    if run is None:
+        return None
+
+    run["duration_s"] = time.perf_counter() - run["started"]
+    with _active_lock:
+        run["peak_rss_mb"] = max(run["peak_rss_mb"], _run_peak_mb(run))
+    if row_count is not None:
+        run["rows"] = row_count
+        run["rows_per_s"] = row_count / run["duration_s"] if run["duration_s"] else None
+    return run
+
+def log_values(row_count=None):
+    """Values for LOG_COLUMNS from the current run, or all None outside a run."""
+    run = snapshot(row_count)
+    if run is None:
+        return (None,) * len(LOG_COLUMNS)
+
+    stages = run["stages"]
+    return (
+        stages["read"], stages["header"], stages["parse"], stages["transform"], stages["upload"],
+        run["duration_s"], run["bytes_read"], run.get("rows_per_s"), run["peak_rss_mb"],
+    )
+
+def finish_run(status, row_count=0):
+    """End the current run, publish it to the textfile and return it (None outside a run)."""
+    run = snapshot(row_count)
+    if run is None:
+        return None
+
+    _current.set(None)
+    _deactivate(run)
+    run["status"] = status
+    run.pop("_open", None)
+    run.pop("_solo", None)
+    try:
+        write_textfile(run)
+    except OSError as e:
+        print(f"⚠️ Could not write metrics textfile: {e}")
+    return run
+
+# === Prometheus textfile ===
+def _record_totals(run):
+    with _totals_lock:
+        totals = _totals.setdefault(run["pipeline"], {
+            "files": {}, "rows": 0, "bytes_read": 0, "stages": dict.fromkeys(STAGES, 0.0),
+        })
+        totals["files"][run["status"]] = totals["files"].get(run["status"], 0) + 1
+        totals["rows"] += run.get("rows") or 0
+        totals["bytes_read"] += run["bytes_read"]
+        for name, seconds in run["stages"].items():
+            totals["stages"][name] += seconds
+        return {**totals, "files": dict(totals["files"]), "stages": dict(totals["stages"])}
+
+def render_textfile(run, totals):
+    """Prometheus text exposition for one pipeline: last file gauges plus running totals."""
+    label = f'pipeline="{run["pipeline"]}"'
+    lines = [
+        "# HELP etl_last_run_timestamp_seconds Unix time the last file finished.",
+        "# TYPE etl_last_run_timestamp_seconds gauge",
+        f"etl_last_run_timestamp_seconds{{{label}}} {time.time():.3f}",
+        "# HELP etl_last_run_success Whether the last file loaded (1) or not (0).",
+        "# TYPE etl_last_run_success gauge",
+        f"etl_last_run_success{{{label}}} {int(run['status'] == 'success')}",
+        "# HELP etl_last_run_rows Rows loaded from the last file.",
+        "# TYPE etl_last_run_rows gauge",
+        f"etl_last_run_rows{{{label}}} {run.get('rows') or 0}",
+        "# HELP etl_last_run_bytes_read Bytes read from the last file.",
+        "# TYPE etl_last_run_bytes_read gauge",
+        f"etl_last_run_bytes_read{{{label}}} {run['bytes_read']}",
+        "# HELP etl_last_run_rows_per_second Rows per second for the last file, end to end.",
+        "# TYPE etl_last_run_rows_per_second gauge",
+        f"etl_last_run_rows_per_second{{{label}}} {run.get('rows_per_s') or 0:.1f}",
+        "# HELP etl_last_run_duration_seconds Wall time for the last file.",
+        "# TYPE etl_last_run_duration_seconds gauge",
+        f"etl_last_run_duration_seconds{{{label}}} {run['duration_s']:.6f}",
+        "# HELP etl_last_run_peak_rss_bytes Peak resident memory while loading the last file.",
+        "# TYPE etl_last_run_peak_rss_bytes gauge",
+        f"etl_last_run_peak_rss_bytes{{{label}}} {int(run['peak_rss_mb'] * 1024 * 1024)}",
+        "# HELP etl_last_run_stage_seconds Time spent in each stage for the last file.",
+        "# TYPE etl_last_run_stage_seconds gauge",
+    ]
+    lines += [f'etl_last_run_stage_seconds{{{label},stage="{name}"}} {seconds:.6f}'
+              for name, seconds in run["stages"].items()]
+
+    lines += [
+        "# HELP etl_files_total Files handled since the process started, by status.",
+        "# TYPE etl_files_total counter",
+    ]
+    lines += [f'etl_files_total{{{label},status="{status}"}} {count}'
+              for status, count in sorted(totals["files"].items())]
+    lines += [
+        "# HELP etl_rows_total Rows loaded since the process started.",
+        "# TYPE etl_rows_total counter",
+        f"etl_rows_total{{{label}}} {totals['rows']}",
+        "# HELP etl_bytes_read_total Bytes read since the process started.",
+        "# TYPE etl_bytes_read_total counter",
+        f"etl_bytes_read_total{{{label}}} {totals['bytes_read']}",
+        "# HELP etl_stage_seconds_total Time spent in each stage since the process started.",
+        "# TYPE etl_stage_seconds_total counter",
+    ]
+    lines += [f'etl_stage_seconds_total{{{label},stage="{name}"}} {seconds:.6f}'
+              for name, seconds in totals["stages"].items()]
+    return "\n".join(lines) + "\n"
+
+def write_textfile(run, metrics_dir=METRICS_DIR):
+    """Atomically replace <metrics_dir>/etl_<pipeline>.prom (node_exporter skips partial files)."""
+    totals = _record_totals(run)
+    if not metrics_dir:
+        return None
+
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f"etl_{run['pipeline']}.prom")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_textfile(run, totals))
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,125 @@
+import os
+import queue
+import time
+
+import pandas as pd
+
+from utils.archive import archived_chunks
+from utils.delta_load import is_delta
+from utils.etl_log import write_etl_log_rows
+from utils.metrics import log_values, use_run
+from utils.partitions import prepare_partitions, upload_to_partitions
+from utils.rollups import has_rollup, upsert_rollup
+from utils.staged_load import frame_chunks, needs_staging
+
+# Micro-batching: load many small files for one table in one transaction.
+#
+# At month-end or after an outage dozens of small files land at once, and the
+# per-file fixed costs (a transaction, etl_log round-trips, a COPY per file)
+# outweigh the rows themselves. Files for the same table are parsed concurrently
+# and grouped until a row or file budget is reached. Each batch is COPYed and
+# rolled up in one transaction, which also writes every file's etl_log row in one
+# round-trip. Each file still gets its own log row, archive parts and status. If a
+# batch fails, the caller loads its files one by one, so a bad file is rejected
+# on its own.
+
+# Close a batch once it holds this many rows or files
+BATCH_ROWS = int(os.getenv("ETL_BATCH_ROWS", "250000"))
+BATCH_FILES = int(os.getenv("ETL_BATCH_FILES", "50"))
+
+# How long the watcher keeps collecting files after the first one; 0 loads files one at a time
+BATCH_WINDOW_S = float(os.getenv("ETL_BATCH_WINDOW_S", "0"))
+
+def batchable(table_name, file_path, content_hash):
+    """Small files only: large ones are staged and snapshots in delta mode are merged one at a time."""
+    return not is_delta(table_name) and not needs_staging(file_path, table_name, content_hash)
+
+def drain_window(work_queue, window_s=BATCH_WINDOW_S, max_files=BATCH_FILES):
+    """
+    Take further items from `work_queue` for up to `window_s` seconds, or until
+    `max_files` - 1 have been taken (the caller already holds one). Each item taken
+    must be marked task_done() by the caller.
+    """
+    taken = []
+    deadline = time.monotonic() + window_s
+    while len(taken) < max_files - 1:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            taken.append(work_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return taken
+
+def coalesce(parsed, max_rows=BATCH_ROWS, max_files=BATCH_FILES):
+    """
+    Group parsed files by table as they arrive. `parsed` yields (table_name, file);
+    yields (table_name, files) whenever a table's batch reaches the row or file
+    budget, then the partial batches once `parsed` is exhausted.
+    """
+    open_batches = {}
+    for table_name, file in parsed:
+        batch = open_batches.setdefault(table_name, [])
+        batch.append(file)
+        if len(batch) >= max_files or sum(_rows(f) for f in batch) >= max_rows:
+            yield table_name, open_batches.pop(table_name)
+    yield from open_batches.items()
+
+def _rows(file):
+    return len(file["df"]) if file["df"] is not None else 0
+
+def _share(files, name, seconds):
+    """Book a batch-wide stage on each file's run, in proportion to its rows."""
+    weights = [_rows(file) for file in files]
+    if not any(weights):
+        weights = [1] * len(files)
+    for file, weight in zip(files, weights):
+        if file["run"] is not None:
+            file["run"]["stages"][name] += seconds * weight / sum(weights)
+
+def load_batch(conn, table_name, files):
+    """
+    Load a batch of parsed files for one table on `conn` without committing.
+
+    `files` are dicts with file_name, content_hash, df and run (the file's metrics
+    run from parsing, or None). The rows go up in one COPY stream and one rollup
+    upsert; each file is archived under its own name and gets its own etl_log row
+    ('success', or 'empty' when it parsed to no rows), all sent in one round-trip.
+    Sets each file's status and rows. Returns what write_etl_log_rows() returns,
+    for after_rollback() if the transaction fails.
+    """
+    start = time.perf_counter()
+    frames = []
+    for file in files:
+        file["rows"] = _rows(file)
+        file["status"] = "success" if file["rows"] else "empty"
+        if not file["rows"]:
+            continue
+        if file["run"] is not None:
+            use_run(file["run"])
+        # Archiving is per file (replay logs each source file); the COPY is not
+        for chunk in archived_chunks(frame_chunks(file["df"]), table_name, file["file_name"], file["content_hash"]):
+            frames.append(chunk)
+
+    if frames:
+        batch_df = pd.concat(frames, ignore_index=True)
+        prepare_partitions(batch_df, table_name)
+        upload_to_partitions(frame_chunks(batch_df), table_name, conn)
+        if has_rollup(table_name):
+            upsert_rollup(conn, table_name, batch_df)
+    _share(files, "upload", time.perf_counter() - start)
+
+    rows = []
+    for file in files:
+        if file["run"] is not None:
+            use_run(file["run"])
+        df = file["df"]
+        report_date = df["report_date"].iloc[0] if file["rows"] and "report_date" in df.columns else None
+        rows.append((table_name, file["file_name"], report_date, file["rows"], file["status"],
+                     file["content_hash"], *log_values(file["rows"])))
+
+    start = time.perf_counter()
+    taken = write_etl_log_rows(conn, rows)
+    _share(files, "log", time.perf_counter() - start)
+    return taken
@@ -0,0 +1,206 @@
+import os
+
+import pandas as pd
+
+from utils.postgres_uploader import copy_grouped, pooled_connection, quote_ident, upload_chunks_to_postgres
+
+# Daily range partitions for the target tables.
+#
+# The sql/create_* scripts partition each table by its business date (the same
+# column the archive partitions on), one partition per day. Partitions are created
+# on demand, on a short transaction of their own: for a parsed file, every day it
+# needs before its first COPY (prepare_partitions); for a streamed one, each
+# chunk's days before that chunk. Each chunk is COPYed straight into its day's
+# partition instead of being routed through the parent. A day is reloaded by
+# building its replacement off to the side and swapping it in (replace_partition)
+# rather than deleting rows.
+#
+# There is deliberately no DEFAULT partition: with one, every ATTACH would take an
+# ACCESS EXCLUSIVE lock on it and scan it, waiting behind any load that had copied
+# into it (including the attaching load's own transaction) and any reader of the
+# parent. Rows without a date go to <table>_undated instead: a plain table with the
+# same columns, created (like a partition) the first time a load needs it but never
+# attached, so it costs ATTACH nothing. Such rows load with the rest of their file,
+# though queries on the parent do not see them; staged and delta loads set them
+# aside when publishing (set_aside_undated).
+
+# How long creating a partition waits for other loads' locks before failing
+PARTITION_LOCK_TIMEOUT = os.getenv("ETL_PARTITION_LOCK_TIMEOUT", "60s")
+
+def partition_name(table_name, day):
+    return f"{table_name}_p{day:%Y%m%d}"
+
+def undated_table_name(table_name):
+    return f"{table_name}_undated"
+
+def day_table_name(table_name, day):
+    """Where a row dated `day` goes: its day's partition, or the undated table if `day` is missing."""
+    return undated_table_name(table_name) if pd.isna(day) else partition_name(table_name, day)
+
+def partition_column(cur, table_name):
+    """The column `table_name` is range-partitioned on, or None for a plain (or missing) table."""
+    cur.execute("""
+        SELECT a.attname
+        FROM pg_partitioned_table p
+        JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+        WHERE p.partrelid = to_regclass(%s)
+    """, (quote_ident(table_name),))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def day_keys(values):
+    """Dates (or timestamps) as midnight Timestamps; NaT where missing."""
+    return pd.to_datetime(values, errors="coerce").dt.normalize()
+
+def _attach_partitions(cur, table_name, days, undated):
+    # Serialises loaders creating partitions of the same table
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (table_name,))
+    created = []
+    if undated:
+        name = undated_table_name(table_name)
+        cur.execute("SELECT to_regclass(%s)", (quote_ident(name),))
+        if cur.fetchone()[0] is None:
+            cur.execute(f"CREATE TABLE {quote_ident(name)} (LIKE {quote_ident(table_name)} "
+                        f"INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)")
+    for day in days:
+        name = partition_name(table_name, day)
+        cur.execute("SELECT to_regclass(%s)", (quote_ident(name),))
+        if cur.fetchone()[0] is not None:
+            continue
+        # With no DEFAULT partition, ATTACH takes a SHARE UPDATE EXCLUSIVE lock on the
+        # parent (and locks only the new, empty table), so loads and queries carry on
+        cur.execute(f"CREATE TABLE {quote_ident(name)} (LIKE {quote_ident(table_name)} "
+                    f"INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)")
+        cur.execute(f"ALTER TABLE {quote_ident(table_name)} ATTACH PARTITION {quote_ident(name)} "
+                    f"FOR VALUES FROM (%s) TO (%s)", (day.date(), (day + pd.Timedelta(days=1)).date()))
+        created.append(name)
+    return created
+
+def ensure_partitions(table_name, days, cur=None):
+    """
+    Create the daily partitions of `table_name` that `days` need and do not exist yet,
+    and its undated table if any of `days` is missing (None/NaT).
+
+    Runs on `cur` when given: callers already holding locks on the table (replay,
+    backfill) must create partitions in their own transaction. Otherwise it commits
+    on a connection of its own straight away, so a long load never holds the lock
+    taken to attach a partition. Returns the names of the partitions created.
+    """
+    days = list(days)
+    undated = any(pd.isna(day) for day in days)
+    days = sorted({pd.Timestamp(day) for day in days if not pd.isna(day)})
+    if not days and not undated:
+        return []
+    if cur is not None:
+        return _attach_partitions(cur, table_name, days, undated)
+
+    with pooled_connection() as conn:
+        with conn.cursor() as own_cur:
+            own_cur.execute("SELECT set_config('lock_timeout', %s, true)", (PARTITION_LOCK_TIMEOUT,))
+            created = _attach_partitions(own_cur, table_name, days, undated)
+        conn.commit()
+    if created:
+        span = created[0] if len(created) == 1 else f"{created[0]} .. {created[-1]}"
+        print(f"🧱 Created {len(created)} partition(s) of {table_name}: {span}")
+    return created
+
+def _partition_column(table_name):
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            column = partition_column(cur, table_name)
+        conn.commit()
+    return column
+
+def prepare_partitions(df, table_name):
+    """
+    Before a parsed file's first COPY: create every partition the file needs (and
+    the undated table, if it has rows without a date), committed on a connection of
+    its own. No-op for plain tables.
+    """
+    column = _partition_column(table_name)
+    if column is None or column not in df.columns or df.empty:
+        return
+    ensure_partitions(table_name, day_keys(df[column]).unique())
+
+def partitioned_chunks(chunks, table_name):
+    """Yield `chunks` unchanged, first creating any partitions their rows need (for staged loads)."""
+    column = None
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            column = _partition_column(table_name)
+        if column is not None and column in chunk.columns and not chunk.empty:
+            ensure_partitions(table_name, day_keys(chunk[column]).unique())
+        yield chunk
+
+def upload_to_partitions(chunks, table_name, conn):
+    """
+    Like upload_chunks_to_postgres(): copy every chunk on `conn` without committing,
+    but rows are COPYed straight into their day's partition (rows with no date into
+    the undated table), creating any partitions prepare_partitions() has not. Plain
+    tables are uploaded as before. Returns the number of rows.
+    """
+    with conn.cursor() as cur:
+        column = partition_column(cur, table_name)
+    if column is None:
+        return upload_chunks_to_postgres(chunks, table_name, conn=conn)
+
+    total_rows = undated = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        days = day_keys(chunk[column])
+        ensure_partitions(table_name, days.unique())
+        with conn.cursor() as cur:
+            copy_grouped(chunk, days, lambda day: day_table_name(table_name, day), cur)
+        total_rows += len(chunk)
+        undated += int(days.isna().sum())
+    if undated:
+        print(f"⚠️ {undated} row(s) with no {column} went to {undated_table_name(table_name)}")
+    return total_rows
+
+def set_aside_undated(cur, table_name, source, columns):
+    """
+    Move the rows of `source` (a staging table) that have no partition date into
+    `table_name`'s undated table, before the rest are inserted into `table_name`.
+    `columns` are the insertable ones. No-op for plain tables. Returns the rows moved.
+    """
+    column = partition_column(cur, table_name)
+    if column is None:
+        return 0
+    cur.execute(f"SELECT EXISTS (SELECT 1 FROM {quote_ident(source)} WHERE {quote_ident(column)} IS NULL)")
+    if not cur.fetchone()[0]:
+        return 0
+    # Staging normally created it already; otherwise it is created on this transaction
+    ensure_partitions(table_name, [None], cur=cur)
+    column_list = ", ".join(quote_ident(col) for col in columns)
+    cur.execute(f"""
+        WITH moved AS (DELETE FROM {quote_ident(source)} WHERE {quote_ident(column)} IS NULL RETURNING *)
+        INSERT INTO {quote_ident(undated_table_name(table_name))} ({column_list})
+        SELECT {column_list} FROM moved
+    """)
+    print(f"⚠️ {cur.rowcount} row(s) with no {column} went to {undated_table_name(table_name)}")
+    return cur.rowcount
+
+def replace_partition(cur, table_name, day, fill):
+    """
+    Reload one day: `fill(name)` loads the day's rows into a new, detached table,
+    which then replaces the day's partition (detach and drop the old one, attach the
+    new). Runs on the caller's cursor; readers see the old day until commit.
+    Returns whatever `fill` returns.
+    """
+    day = pd.Timestamp(day)
+    name = partition_name(table_name, day)
+    replacement = f"{name}__new"
+    cur.execute(f"DROP TABLE IF EXISTS {quote_ident(replacement)}")
+    cur.execute(f"CREATE TABLE {quote_ident(replacement)} (LIKE {quote_ident(table_name)} "
+                f"INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS)")
+    result = fill(replacement)
+
+    cur.execute("SELECT to_regclass(%s)", (quote_ident(name),))
+    if cur.fetchone()[0] is not None:
+        cur.execute(f"ALTER TABLE {quote_ident(table_name)} DETACH PARTITION {quote_ident(name)}")
+        cur.execute(f"DROP TABLE {quote_ident(name)}")
+    cur.execute(f"ALTER TABLE {quote_ident(replacement)} RENAME TO {quote_ident(name)}")
+    cur.execute(f"ALTER TABLE {quote_ident(table_name)} ATTACH PARTITION {quote_ident(name)} "
+                f"FOR VALUES FROM (%s) TO (%s)", (day.date(), (day + pd.Timedelta(days=1)).date()))
+    return result
@@ -1,6 +1,9 @@
 import pandas as pd
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from functools import lru_cache
+from io import StringIO
+from sqlalchemy import create_engine, inspect
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,22 +16,160 @@ DB_NAME = os.getenv("PG_DATABASE")
 DB_USER = os.getenv("PG_USER")
 DB_PASS = os.getenv("PG_PASSWORD")
 
+# Rows serialized into the in-memory CSV buffer per COPY round
+COPY_CHUNK_ROWS = int(os.getenv("PG_COPY_CHUNK_ROWS", "50000"))
+
+@lru_cache(maxsize=None)
 def get_engine():
+    """Return the process-wide engine so every upload reuses the same connection pool."""
     connection_string = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    return create_engine(connection_string)
+    return create_engine(connection_string, pool_pre_ping=True)
+
+def quote_ident(name: str) -> str:
+    """Quote a table or column name for Postgres (handles names like "Vendor No")."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _copy_ready(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    COPY parses its input as text, so a float column holding only whole numbers
+    (e.g. Qty read as float because of a blank cell) would be sent as "135.0" and
+    rejected by INTEGER columns. Those columns are cast to nullable integers.
+    """
+    out = df
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind != "f":
+            continue
+        values = series.dropna()
+        if not values.empty and (values % 1 == 0).all():
+            if out is df:
+                out = df.copy()
+            out[col] = series.astype("Int64")
+    return out
+
+# Tables already known to exist, so appends skip the catalog lookup
+_known_tables = set()
+
+def ensure_table(df: pd.DataFrame, table_name: str, if_exists: str, engine):
+    """Apply to_sql's if_exists semantics (create/replace/fail) without inserting rows."""
+    if if_exists == "append":
+        if table_name in _known_tables:
+            return
+        if inspect(engine).has_table(table_name):
+            _known_tables.add(table_name)
+            return
+    df.head(0).to_sql(table_name, con=engine, index=False, if_exists=if_exists)
+    _known_tables.add(table_name)
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a raw psycopg2 connection from the shared engine pool.
 
-def upload_to_postgres(df: pd.DataFrame, table_name: str, if_exists: str = "append"):
+    The caller commits; anything left uncommitted is rolled back when the
+    connection goes back to the pool.
+    """
+    conn = get_engine().raw_connection()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def copy_dataframe(df: pd.DataFrame, table_name: str, cursor, chunk_rows: int = COPY_CHUNK_ROWS):
+    """
+    Stream a DataFrame into an existing table with COPY ... FROM STDIN.
+
+    Rows are written to an in-memory CSV buffer `chunk_rows` at a time, so only one
+    chunk is ever serialized at once. Runs on the caller's cursor; does not commit.
+    """
+    df = _copy_ready(df)
+    columns = ", ".join(quote_ident(col) for col in df.columns)
+    copy_sql = f"COPY {quote_ident(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    for start in range(0, len(df), chunk_rows):
+        buffer = StringIO()
+        df.iloc[start:start + chunk_rows].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+
+def copy_grouped(df: pd.DataFrame, keys: pd.Series, table_for, cursor, chunk_rows: int = COPY_CHUNK_ROWS):
+    """
+    Like copy_dataframe(), but the rows are split on `keys` and each group is COPYed
+    into its own table, `table_for(key)` (NaN keys included). The rows are prepared
+    for COPY once, not once per group.
     """
-    Uploads a DataFrame to the specified Postgres table.
-    
+    df = _copy_ready(df)
+    for key, rows in df.groupby(keys, dropna=False, sort=False):
+        columns = ", ".join(quote_ident(col) for col in rows.columns)
+        copy_sql = f"COPY {quote_ident(table_for(key))} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        for start in range(0, len(rows), chunk_rows):
+            buffer = StringIO()
+            rows.iloc[start:start + chunk_rows].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+
+def upload_to_postgres(df: pd.DataFrame, table_name: str, if_exists: str = "append", conn=None):
+    """
+    Uploads a DataFrame to the specified Postgres table using COPY.
+
     Args:
         df: Pandas DataFrame to upload.
         table_name: Name of the target table in Postgres.
         if_exists: 'append', 'replace', or 'fail' (default = 'append')
+        conn: Optional raw connection whose transaction the rows join. The caller
+            commits.
+
+    Raises on failure, after rolling back, so callers never log a partial load as success.
     """
-    try:
-        engine = get_engine()
-        df.to_sql(table_name, con=engine, index=False, if_exists=if_exists, method='multi')
-        print(f"✅ Upload to Postgres complete: {table_name} ({len(df)} rows)")
-    except Exception as e:
-        print(f"❌ Failed to upload to Postgres: {e}")
+    if conn is not None:
+        ensure_table(df, table_name, if_exists, get_engine())
+        with conn.cursor() as cur:
+            copy_dataframe(df, table_name, cur)
+        return
+
+    with pooled_connection() as conn:
+        upload_to_postgres(df, table_name, if_exists, conn=conn)
+        conn.commit()
+    print(f"✅ Upload to Postgres complete: {table_name} ({len(df)} rows)")
+
+def upload_chunks_to_postgres(chunks, table_name: str, if_exists: str = "append", conn=None) -> int:
+    """
+    Uploads an iterable of DataFrames (e.g. a streaming ETL) to Postgres using COPY.
+
+    Each chunk is copied as soon as it is produced, so only one chunk is held in
+    memory. All chunks share one transaction: a failure part-way rolls back the file.
+
+    Args:
+        chunks: Iterable of DataFrames with identical columns.
+        table_name: Name of the target table in Postgres.
+        if_exists: 'append', 'replace', or 'fail' (default = 'append'), applied to the first chunk.
+        conn: Optional raw connection whose transaction the rows join. The caller
+            commits.
+
+    Returns:
+        Number of rows uploaded (0 if the chunks were all empty).
+
+    Raises on failure, after rolling back, so callers never log a partial load as success.
+    """
+    if conn is not None:
+        total_rows = 0
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if total_rows == 0:
+                ensure_table(chunk, table_name, if_exists, get_engine())
+            with conn.cursor() as cur:
+                copy_dataframe(chunk, table_name, cur)
+            total_rows += len(chunk)
+        return total_rows
+
+    with pooled_connection() as conn:
+        total_rows = upload_chunks_to_postgres(chunks, table_name, if_exists, conn=conn)
+        conn.commit()
+
+    if total_rows:
+        print(f"✅ Upload to Postgres complete: {table_name} ({total_rows} rows)")
+    return total_rows
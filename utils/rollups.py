@@ -0,0 +1,92 @@
+from psycopg2.extras import execute_values
+
+from utils.postgres_uploader import quote_ident
+
+# Per-store, per-day rollups of the sales tables, kept current at load time.
+#
+# Dashboards read these instead of aggregating the detail tables. Each load adds
+# its own file's totals (aggregated from the DataFrame it already has in memory)
+# with an upsert on the load's transaction, so a rollup commits together with the
+# rows it summarises. Loads that replace rows wholesale (replay, backfill) rebuild
+# the affected days from the detail table instead.
+#
+# Tables: sql/create_daily_store_rollups.sql. Rows with no store or date are left out.
+
+ROLLUP_KEYS = ["store_no", "transaction_date"]
+
+ROLLUPS = {
+    "daily_detail_sales": {
+        "table": "daily_store_sales",
+        "sums": [
+            "taxable_merch", "non_taxable_merch", "taxable_nonmerch", "non_tax_non_merch", "restock_charge",
+            "total_written_sales", "sales_tax", "grand_total_written_sales",
+            # Payment splits
+            "cash_amount", "check_amount", "bank_card_amt", "ar_amount", "financed", "exchange", "refund_amount",
+        ],
+    },
+    "daily_sales_tax": {
+        "table": "daily_store_sales_tax",
+        "sums": [
+            "taxable_merch", "non_taxable_merch", "taxable_nonmerch", "non_tax_non_merch", "restock_charge",
+            "sales_tax",
+        ],
+    },
+}
+
+COUNT_COLUMN = "line_count"
+
+def has_rollup(table_name):
+    return table_name in ROLLUPS
+
+def rollup_frame(df, table_name):
+    """Aggregate a loaded DataFrame to one row per store and day."""
+    sums = ROLLUPS[table_name]["sums"]
+    grouped = df.dropna(subset=ROLLUP_KEYS).groupby(ROLLUP_KEYS, observed=True, sort=False)
+    rollup = grouped[sums].sum().round(2)
+    rollup.insert(0, COUNT_COLUMN, grouped.size())
+    return rollup.reset_index()
+
+def upsert_rollup(conn, table_name, df):
+    """
+    Add a loaded DataFrame's totals to its rollup table on the caller's transaction.
+    Returns the number of store-days touched.
+    """
+    rollup = rollup_frame(df, table_name)
+    if rollup.empty:
+        return 0
+
+    columns = [*ROLLUP_KEYS, COUNT_COLUMN, *ROLLUPS[table_name]["sums"]]
+    target = quote_ident(ROLLUPS[table_name]["table"])
+    additions = ", ".join(f"{quote_ident(col)} = {target}.{quote_ident(col)} + EXCLUDED.{quote_ident(col)}"
+                          for col in columns[len(ROLLUP_KEYS):])
+    rows = [
+        (str(store_no), day.date(), int(count), *(float(value) for value in values))
+        for store_no, day, count, *values in rollup[columns].itertuples(index=False)
+    ]
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO {target} ({", ".join(quote_ident(col) for col in columns)}) VALUES %s
+            ON CONFLICT ({", ".join(ROLLUP_KEYS)}) DO UPDATE SET {additions}, updated_at = now()
+        """, rows)
+    return len(rows)
+
+def rebuild_rollup(cur, table_name, dates=None):
+    """
+    Recompute a rollup from its detail table, for every day or only `dates`
+    (YYYY-MM-DD strings). Runs on the caller's cursor; does not commit.
+    """
+    target = quote_ident(ROLLUPS[table_name]["table"])
+    sums = ROLLUPS[table_name]["sums"]
+    where, params = "", ()
+    if dates is not None:
+        where, params = "AND transaction_date = ANY(%s::date[])", (list(dates),)
+
+    cur.execute(f"DELETE FROM {target} WHERE TRUE {where}", params)
+    cur.execute(f"""
+        INSERT INTO {target} ({", ".join(ROLLUP_KEYS)}, {COUNT_COLUMN}, {", ".join(sums)})
+        SELECT {", ".join(ROLLUP_KEYS)}, COUNT(*), {", ".join(f"COALESCE(SUM({col}), 0)" for col in sums)}
+        FROM {quote_ident(table_name)}
+        WHERE store_no IS NOT NULL AND transaction_date IS NOT NULL {where}
+        GROUP BY {", ".join(ROLLUP_KEYS)}
+    """, params)
+    return cur.rowcount
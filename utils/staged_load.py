@@ -0,0 +1,124 @@
+import os
+
+from utils.etl_log import clear_checkpoints, last_checkpoint, write_checkpoint
+from utils.partitions import set_aside_undated
+from utils.postgres_uploader import copy_dataframe, ensure_table, get_engine, pooled_connection, quote_ident
+
+# Checkpointed, resumable loads for large files.
+#
+# Rows are copied into a per-file staging table one chunk per transaction, each
+# with a 'checkpoint' row in etl_log. The target table only sees the file when
+# publish_staged() moves every staged row across in a single statement, on the
+# caller's transaction, so a failure part-way never leaves a partial append.
+# Staging tables are keyed by content hash: when the same file is queued again
+# after a failure, loading resumes after the last committed chunk.
+
+# Files at least this big are loaded through a staging table
+STAGED_LOAD_BYTES = int(float(os.getenv("ETL_STAGED_LOAD_MB", "16")) * 1024 * 1024)
+
+# Rows per checkpoint when the rows come from an in-memory DataFrame
+CHECKPOINT_ROWS = int(os.getenv("ETL_CHECKPOINT_ROWS", "50000"))
+
+def staging_table_name(table_name, content_hash):
+    return f"{table_name}__staging_{content_hash[:16]}"
+
+def insertable_columns(cur, table_name):
+    """The table's columns in order, leaving out generated ones."""
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (table_name,))
+    return [row[0] for row in cur.fetchall()]
+
+def staging_exists(table_name, content_hash):
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (quote_ident(staging_table_name(table_name, content_hash)),))
+            exists = cur.fetchone()[0] is not None
+        conn.commit()
+    return exists
+
+def needs_staging(file_path, table_name, content_hash):
+    """Large files, and any file an earlier failed attempt already began staging."""
+    if not content_hash:
+        return False
+    return os.path.getsize(file_path) >= STAGED_LOAD_BYTES or staging_exists(table_name, content_hash)
+
+def frame_chunks(df, start_row=0, chunk_rows=CHECKPOINT_ROWS):
+    """Slice an already-parsed DataFrame into checkpoint-sized chunks, starting at start_row."""
+    for start in range(start_row, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _create_staging(conn, chunk, table_name, staging, content_hash):
+    ensure_table(chunk, table_name, "append", get_engine())
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TABLE {quote_ident(staging)} "
+                    f"(LIKE {quote_ident(table_name)} INCLUDING DEFAULTS INCLUDING GENERATED)")
+    # Checkpoints left by a staging table that no longer exists are stale
+    clear_checkpoints(conn, table_name, content_hash)
+
+def stage_chunks(chunks_from, table_name, file_name, content_hash):
+    """
+    Copy a file's rows into its staging table, committing a checkpoint per chunk.
+
+    Args:
+        chunks_from: Callable taking the number of rows already staged and returning
+            an iterable of DataFrames for the rest of the file, e.g.
+            `lambda start: iter_etl(path, skip_rows=start)`.
+        table_name: Target table; the staging table copies its columns.
+        file_name: Logged with each checkpoint.
+        content_hash: Identifies the file across attempts.
+
+    Returns:
+        Total rows staged, including those from earlier attempts.
+    """
+    staging = staging_table_name(table_name, content_hash)
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (quote_ident(staging),))
+            exists = cur.fetchone()[0] is not None
+        rows_staged = last_checkpoint(conn, table_name, content_hash) if exists else 0
+        conn.commit()
+
+    if rows_staged:
+        print(f"⏯️ Resuming {file_name} after {rows_staged} staged rows")
+
+    try:
+        for chunk in chunks_from(rows_staged):
+            if chunk.empty:
+                continue
+            with pooled_connection() as conn:
+                if not exists:
+                    _create_staging(conn, chunk, table_name, staging, content_hash)
+                with conn.cursor() as cur:
+                    copy_dataframe(chunk, staging, cur)
+                write_checkpoint(conn, table_name, file_name, content_hash, rows_staged + len(chunk))
+                conn.commit()
+            exists = True
+            rows_staged += len(chunk)
+    except Exception:
+        if rows_staged:
+            print(f"⏸️ {rows_staged} rows of {file_name} stay staged in {staging}; "
+                  f"queue the file again to resume")
+        raise
+
+    return rows_staged
+
+def publish_staged(conn, table_name, content_hash):
+    """
+    Move every staged row into the target table (rows with no partition date into its
+    undated table) and drop the staging table, on the caller's connection. The caller
+    commits, typically with its etl_log row. Returns the number of rows published.
+    """
+    staging = staging_table_name(table_name, content_hash)
+    with conn.cursor() as cur:
+        columns = insertable_columns(cur, table_name)
+        undated = set_aside_undated(cur, table_name, staging, columns)
+        columns = ", ".join(quote_ident(col) for col in columns)
+        staging = quote_ident(staging)
+        cur.execute(f"INSERT INTO {quote_ident(table_name)} ({columns}) SELECT {columns} FROM {staging}")
+        rows = cur.rowcount + undated
+        cur.execute(f"DROP TABLE {staging}")
+    clear_checkpoints(conn, table_name, content_hash)
+    return rows
@@ -0,0 +1,177 @@
+import re
+
+from utils.partitions import ensure_partitions, partition_column, undated_table_name
+from utils.postgres_uploader import quote_ident
+from utils.staged_load import insertable_columns
+
+# Build a table's replacement off to the side, then swap it in atomically.
+#
+# The shadow copies the live table's columns, defaults and CHECK/NOT NULL
+# constraints but no indexes, so a bulk load into it does no index maintenance.
+# build_shadow_indexes() then recreates the live table's indexes once, under
+# temporary names, and swap_in() drops the live table and renames the shadow (and
+# its indexes) into place in one transaction: readers see the old rows until
+# commit, then the new ones.
+#
+# A partitioned table gets a partitioned shadow (partitions are created as rows
+# arrive); its partitions and undated table are renamed along with it.
+# partition_table() uses the same swap to turn a plain table into a partitioned one.
+
+def shadow_table_name(table_name):
+    return f"{table_name}__shadow"
+
+def table_exists(conn, table_name):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (quote_ident(table_name),))
+        return cur.fetchone()[0] is not None
+
+def create_shadow(conn, table_name, partition_by=None):
+    """
+    (Re)create an empty, index-free copy of `table_name`. The caller commits.
+    The shadow is range-partitioned like the live table, or on `partition_by`.
+    """
+    shadow = shadow_table_name(table_name)
+    with conn.cursor() as cur:
+        partition_by = partition_by or partition_column(cur, table_name)
+        cur.execute(f"DROP TABLE IF EXISTS {quote_ident(shadow)}, {quote_ident(undated_table_name(shadow))}")
+        cur.execute(f"CREATE TABLE {quote_ident(shadow)} "
+                    f"(LIKE {quote_ident(table_name)} INCLUDING ALL EXCLUDING INDEXES)"
+                    + (f" PARTITION BY RANGE ({quote_ident(partition_by)})" if partition_by else ""))
+    return shadow
+
+def drop_shadow(conn, table_name):
+    shadow = shadow_table_name(table_name)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {quote_ident(shadow)}, {quote_ident(undated_table_name(shadow))}")
+
+def _index_constraints(cur, table_name):
+    """Primary key, unique and exclusion constraints: (name, definition)."""
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x')
+        ORDER BY conname
+    """, (quote_ident(table_name),))
+    return cur.fetchall()
+
+def _plain_indexes(cur, table_name):
+    """Indexes that do not back a constraint: (name, CREATE INDEX statement)."""
+    cur.execute("""
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+        ORDER BY i.relname
+    """, (quote_ident(table_name),))
+    return cur.fetchall()
+
+def build_shadow_indexes(conn, table_name):
+    """
+    Recreate the live table's indexes and index-backed constraints on the shadow
+    under temporary names. Returns [(kind, temporary name, final name)] for swap_in().
+    """
+    shadow = shadow_table_name(table_name)
+    renames = []
+    with conn.cursor() as cur:
+        for i, (name, definition) in enumerate(_index_constraints(cur, table_name)):
+            temp_name = f"{shadow}_con{i}"
+            cur.execute(f"ALTER TABLE {quote_ident(shadow)} ADD CONSTRAINT {quote_ident(temp_name)} {definition}")
+            renames.append(("constraint", temp_name, name))
+
+        for i, (name, definition) in enumerate(_plain_indexes(cur, table_name)):
+            temp_name = f"{shadow}_idx{i}"
+            # "CREATE [UNIQUE] INDEX name ON [ONLY] schema.table USING ..." -> the shadow. ONLY
+            # (partitioned tables) is dropped so the index is built on every partition too
+            definition = re.sub(r"^(CREATE (?:UNIQUE )?INDEX )\S+( ON )(?:ONLY )?\S+",
+                                lambda m: f"{m.group(1)}{quote_ident(temp_name)}{m.group(2)}{quote_ident(shadow)}",
+                                definition, count=1)
+            cur.execute(definition)
+            renames.append(("index", temp_name, name))
+    return renames
+
+def _copy_grants(cur, table_name, shadow):
+    cur.execute("""
+        SELECT grantee, privilege_type
+        FROM information_schema.role_table_grants
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table_name,))
+    for grantee, privilege in cur.fetchall():
+        target = "PUBLIC" if grantee == "PUBLIC" else quote_ident(grantee)
+        cur.execute(f"GRANT {privilege} ON {quote_ident(shadow)} TO {target}")
+
+def _adopt_sequences(cur, table_name, shadow):
+    """Sequences owned by the live table (serial columns) would be dropped with it."""
+    cur.execute("""
+        SELECT s.oid::regclass::text, a.attname
+        FROM pg_depend d
+        JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+        JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+        WHERE d.refobjid = %s::regclass AND d.deptype = 'a'
+    """, (quote_ident(table_name),))
+    for sequence, column in cur.fetchall():
+        cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {quote_ident(shadow)}.{quote_ident(column)}")
+
+def _rename_partitions(cur, table_name, shadow):
+    """
+    <shadow>_p20250128 -> <table>_p20250128, once the shadow has taken the table's
+    name; likewise the indexes Postgres named after each partition. The shadow's
+    undated table replaces the table's.
+    """
+    cur.execute(f"DROP TABLE IF EXISTS {quote_ident(undated_table_name(table_name))}")
+    cur.execute("SELECT to_regclass(%s)", (quote_ident(undated_table_name(shadow)),))
+    if cur.fetchone()[0] is not None:
+        cur.execute(f"ALTER TABLE {quote_ident(undated_table_name(shadow))} "
+                    f"RENAME TO {quote_ident(undated_table_name(table_name))}")
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        UNION ALL
+        SELECT c.relname FROM pg_inherits i JOIN pg_index x ON x.indrelid = i.inhrelid
+        JOIN pg_class c ON c.oid = x.indexrelid
+        WHERE i.inhparent = %s::regclass
+    """, (quote_ident(table_name), quote_ident(table_name)))
+    for (name,) in cur.fetchall():
+        if name.startswith(shadow):
+            cur.execute(f"ALTER TABLE {quote_ident(name)} RENAME TO {quote_ident(table_name + name[len(shadow):])}")
+
+def swap_in(conn, table_name, renames):
+    """
+    Replace the live table with its shadow: grants are copied, the live table is
+    dropped and the shadow and its indexes take over the original names. Runs on
+    the caller's transaction so extra statements (e.g. etl_log rows) commit with it.
+    """
+    shadow = shadow_table_name(table_name)
+    with conn.cursor() as cur:
+        cur.execute(f"LOCK TABLE {quote_ident(table_name)} IN ACCESS EXCLUSIVE MODE")
+        _copy_grants(cur, table_name, shadow)
+        _adopt_sequences(cur, table_name, shadow)
+        cur.execute(f"DROP TABLE {quote_ident(table_name)}")
+        cur.execute(f"ALTER TABLE {quote_ident(shadow)} RENAME TO {quote_ident(table_name)}")
+        _rename_partitions(cur, table_name, shadow)
+        for kind, temp_name, name in renames:
+            if kind == "constraint":
+                cur.execute(f"ALTER TABLE {quote_ident(table_name)} "
+                            f"RENAME CONSTRAINT {quote_ident(temp_name)} TO {quote_ident(name)}")
+            else:
+                cur.execute(f"ALTER INDEX {quote_ident(temp_name)} RENAME TO {quote_ident(name)}")
+
+def partition_table(conn, table_name, column):
+    """
+    Turn a plain table into one range-partitioned by day on `column`: its rows are
+    copied into a partitioned shadow, which is then swapped in; rows with no `column`
+    go to its undated table. The caller commits. Returns the number of partitions created.
+    """
+    shadow = create_shadow(conn, table_name, partition_by=column)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT DISTINCT {quote_ident(column)}::date FROM {quote_ident(table_name)}")
+        days = [day for (day,) in cur.fetchall()]
+        created = ensure_partitions(shadow, days, cur=cur)
+        columns = ", ".join(quote_ident(col) for col in insertable_columns(cur, table_name))
+        cur.execute(f"INSERT INTO {quote_ident(shadow)} ({columns}) SELECT {columns} FROM {quote_ident(table_name)} "
+                    f"WHERE {quote_ident(column)} IS NOT NULL")
+        if any(day is None for day in days):
+            cur.execute(f"INSERT INTO {quote_ident(undated_table_name(shadow))} ({columns}) "
+                        f"SELECT {columns} FROM {quote_ident(table_name)} WHERE {quote_ident(column)} IS NULL")
+    swap_in(conn, table_name, build_shadow_indexes(conn, table_name))
+    return len(created)
@@ -2,18 +2,38 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import sys
+import json
+import errno
 import shutil
 import time
-import psycopg2
+import queue
+import socket
+import threading
+import socketserver
 import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 from etl.daily_detail_sales_etl import run_etl as run_sales_etl
-from etl.inbound_shipments_etl import run_etl as run_shipments_etl
+from etl.inbound_shipments_etl import run_etl as run_shipments_etl, iter_etl as stream_shipments_etl
 from etl.daily_sales_tax_etl import run_etl as run_sales_tax_etl
-from utils.postgres_uploader import upload_to_postgres
+from etl.preflight import preflight
+from utils.postgres_uploader import pooled_connection
+from utils.etl_log import (
+    after_rollback, flush_etl_log, is_content_already_loaded, is_file_already_loaded,
+    mark_loaded, queue_etl_log, warm_loaded_index, write_etl_log,
+)
+from utils.fingerprint import file_fingerprint
+from utils.metrics import finish_run, snapshot, stage, start_run, use_run
+from utils.archive import archive_after_commit, archived_chunks
+from utils.staged_load import frame_chunks, needs_staging, publish_staged, stage_chunks
+from utils.delta_load import is_delta, publish_delta
+from utils.rollups import has_rollup, upsert_rollup
+from utils.partitions import partitioned_chunks, prepare_partitions, upload_to_partitions
+from utils.micro_batch import BATCH_WINDOW_S, batchable, coalesce, drain_window, load_batch
 
 # === CONFIG ===
 WATCH_PATHS = {
@@ -28,81 +48,607 @@ etl_func_map = {
     "daily_sales_tax": run_sales_tax_etl
 }
 
-DB_CONFIG = {
-    "host": os.getenv("PG_HOST", "localhost"),
-    "database": os.getenv("PG_DATABASE"),
-    "user": os.getenv("PG_USER"),
-    "password": os.getenv("PG_PASSWORD"),
-    "port": os.getenv("PG_PORT", "5432")
+# Pipelines whose ETL can yield cleaned chunks straight to the uploader
+stream_func_map = {
+    "inbound_shipments": stream_shipments_etl
 }
 
+# A file is picked up once its size and mtime have been unchanged this long
+STABLE_SECONDS = float(os.getenv("ETL_STABLE_SECONDS", "2"))
+POLL_INTERVAL = 0.25
+
+WORKERS_PER_PIPELINE = int(os.getenv("ETL_WORKERS_PER_PIPELINE", "1"))
+
+# Unix socket etl_submit.py sends files to; empty disables it. Relative to this
+# folder, not the working directory, so etl_submit.py finds it the same way
+SUBMIT_SOCKET = os.getenv("ETL_SOCKET", os.path.join("data_files", "etl.sock"))
+if SUBMIT_SOCKET:
+    SUBMIT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), SUBMIT_SOCKET)
+
+# Permissions of the socket: only its owner (the watcher's user) may submit by default
+SUBMIT_SOCKET_MODE = int(os.getenv("ETL_SOCKET_MODE", "600"), 8)
+
+# Folders outside the incoming/ folders that submitted files may come from (os.pathsep-separated)
+SUBMIT_ROOTS = [root for root in os.getenv("ETL_SUBMIT_ROOTS", "").split(os.pathsep) if root]
+
+work_queues = {table_name: queue.Queue() for table_name in WATCH_PATHS}
+
 # === HANDLER ===
 class NewFileHandler(FileSystemEventHandler):
+    """Only enqueues events: parsing and uploading happen on the pipeline workers."""
     def on_created(self, event):
         if event.is_directory or not event.src_path.endswith((".txt", ".tsv", ".csv")):
             return
 
+        file_path = os.path.abspath(event.src_path)
+        if take_rerouted(file_path):
+            return  # moved here by route(), which queued it
+
         for table_name, watch_dir in WATCH_PATHS.items():
-            if event.src_path.startswith(os.path.abspath(watch_dir)):
-                file_path = event.src_path
-                file_name = os.path.basename(file_path)
-                print(f"📁 Detected new file: {file_name} for table {table_name}")
-
-                time.sleep(1.5)  # Delay to ensure file is fully written
-
-                if is_file_already_loaded(table_name, file_name):
-                    print(f"⚠️ Skipping duplicate file: {file_name}")
-                    log_etl_load(table_name, file_name, report_date=None, row_count=0, status="duplicate")
-                    safe_move_file(file_path, table_name, "rejected")
-                    return
-
-                etl_func = etl_func_map[table_name]
-
-                try:
-                    print(f"🧪 Using ETL function: {etl_func.__name__}")
-                    df = etl_func(file_path)
-
-                    if df is not None and not df.empty:
-                        print(f"✅ Parsed {len(df)} rows. Uploading to {table_name}...")
-                        upload_to_postgres(df, table_name)
-
-                        report_date = df["report_date"].iloc[0] if "report_date" in df.columns else None
-                        log_etl_load(table_name, file_name, report_date=report_date, row_count=len(df), status="success")
-                        safe_move_file(file_path, table_name, "processed")
-                        print(f"✅ Finished processing {file_name}\n")
-                    else:
-                        log_etl_load(table_name, file_name, row_count=0, status="empty")
-                        safe_move_file(file_path, table_name, "rejected")
-                        print(f"⚠️ No data found. Moved to rejected.\n")
-
-                except Exception as e:
-                    log_etl_load(table_name, file_name, status="error")
-                    safe_move_file(file_path, table_name, "rejected")
-                    print(f"❌ Error processing {file_name}: {e}")
+            if file_path.startswith(os.path.abspath(watch_dir)):
+                if enqueue(table_name, file_path):
+                    print(f"📁 Detected new file: {os.path.basename(file_path)} for table {table_name}")
                 break
 
-# === HELPERS ===
-def is_file_already_loaded(table, filename):
-    query = """
-        SELECT 1 FROM etl_log
-        WHERE table_name = %s AND filename = %s AND status = 'success'
-    """
-    with psycopg2.connect(**DB_CONFIG) as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (table, filename))
-            return cur.fetchone() is not None
-
-def log_etl_load(table, filename, report_date=None, row_count=None, status="success"):
-    query = """
-        INSERT INTO etl_log (table_name, filename, report_date, row_count, status, load_time)
-        VALUES (%s, %s, %s, %s, %s, NOW())
-    """
-    with psycopg2.connect(**DB_CONFIG) as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (table, filename, report_date, row_count, status))
-        conn.commit()
+# === WORKERS ===
+def wait_until_stable(file_path, stable_seconds=STABLE_SECONDS, poll_interval=POLL_INTERVAL):
+    """
+    Block until the file's size and mtime have not changed for `stable_seconds`,
+    so a file still being written (e.g. a slow SFTP upload) is not picked up.
+    Returns False if the file disappears while waiting.
+    """
+    last_seen = None
+    stable_since = time.monotonic()
+    while True:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+
+        current = (stat.st_size, stat.st_mtime_ns)
+        now = time.monotonic()
+        if current != last_seen:
+            last_seen = current
+            stable_since = now
+        elif now - stable_since >= stable_seconds:
+            return True
+        time.sleep(poll_interval)
+
+def wait_until_all_stable(file_paths, stable_seconds=STABLE_SECONDS, poll_interval=POLL_INTERVAL):
+    """
+    wait_until_stable() for a micro-batch, polling every file in one loop so the
+    batch settles in one `stable_seconds`. Returns the files that did not disappear.
+    """
+    last_seen = dict.fromkeys(file_paths)
+    stable_since = dict.fromkeys(file_paths, time.monotonic())
+    waiting = list(file_paths)
+    gone = set()
+    while waiting:
+        now = time.monotonic()
+        for file_path in list(waiting):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                gone.add(file_path)
+                waiting.remove(file_path)
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != last_seen[file_path]:
+                last_seen[file_path] = current
+                stable_since[file_path] = now
+            elif now - stable_since[file_path] >= stable_seconds:
+                waiting.remove(file_path)
+        if waiting:
+            time.sleep(poll_interval)
+    for file_path in gone:
+        print(f"⚠️ File disappeared before it settled: {os.path.basename(file_path)}")
+    return [file_path for file_path in file_paths if file_path not in gone]
+
+def load_file(table_name, file_name, content_hash, load):
+    """
+    Run `load(conn)` on a pooled connection and write the success log row in the
+    same transaction. `load` returns (row_count, report_date); 0 rows means empty.
+    """
+    with pooled_connection() as conn:
+        row_count, report_date = load(conn)
+        if not row_count:
+            conn.rollback()
+            return 0
+
+        with stage("log"):
+            taken = write_etl_log(conn, table_name, file_name, report_date=report_date,
+                                  row_count=row_count, status="success", content_hash=content_hash)
+            try:
+                conn.commit()
+            except Exception:
+                after_rollback(taken)
+                raise
+
+    mark_loaded(table_name, file_name, content_hash)
+    archive_after_commit(table_name, file_name, content_hash)
+    return row_count
+
+def process_file(table_name, file_path):
+    """Load one settled file, timing its stages for etl_log and the metrics textfile."""
+    start_run(table_name, os.path.basename(file_path))
+    status, row_count = "error", 0
+    try:
+        status, row_count = load_and_move(table_name, file_path)
+    finally:
+        finish_run(status, row_count)
+        resolve(file_path, table_name, status, row_count)
+    return status, row_count
+
+def load_and_move(table_name, file_path):
+    """Returns (status, row_count)."""
+    file_name = os.path.basename(file_path)
+
+    # Fingerprint before parsing so re-exported content under a new name is rejected cheaply
+    content_hash = file_fingerprint(file_path)
+
+    if is_file_already_loaded(table_name, file_name) or is_content_already_loaded(table_name, content_hash):
+        print(f"⚠️ Skipping duplicate file: {file_name}")
+        queue_etl_log(table_name, file_name, report_date=None, row_count=0, status="duplicate",
+                      content_hash=content_hash)
+        safe_move_file(file_path, table_name, "rejected")
+        return "duplicate", 0
+
+    etl_func = etl_func_map[table_name]
+
+    # Large files (or ones a failed attempt began staging) go through a checkpointed
+    # staging table, published on `conn` so the log row commits with them. Snapshot
+    # tables in delta mode are always staged, then merged instead of appended.
+    delta = is_delta(table_name)
+    staged = delta or needs_staging(file_path, table_name, content_hash)
+
+    def load_chunks(conn, chunks_from):
+        """Upload on `conn`, archiving each chunk; load_file() publishes the archive after commit."""
+        def archiving(start_row):
+            return archived_chunks(chunks_from(start_row), table_name, file_name, content_hash, start_row)
+
+        def staging(start_row):
+            # Publishing routes the staged rows to partitions that must exist by then
+            return partitioned_chunks(archiving(start_row), table_name)
+
+        if not staged:
+            return upload_to_partitions(archiving(0), table_name, conn)
+        if delta:
+            if not stage_chunks(staging, table_name, file_name, content_hash):
+                return 0
+            return publish_delta(conn, table_name, content_hash)
+        if not stage_chunks(staging, table_name, file_name, content_hash):
+            return 0
+        return publish_staged(conn, table_name, content_hash)
+
+    def load_stream(conn):
+        stream = stream_func_map[table_name]
+        with stage("upload"):
+            return load_chunks(conn, lambda start: stream(file_path, skip_rows=start)), None
+
+    def load_frame(conn):
+        df = etl_func(file_path)
+        if df is None or df.empty:
+            return 0, None
+        print(f"✅ Parsed {len(df)} rows. Uploading to {table_name}...")
+        with stage("upload"):
+            # Every day's partition exists before this transaction takes any lock
+            prepare_partitions(df, table_name)
+            row_count = load_chunks(conn, lambda start: frame_chunks(df, start))
+            # The store-day totals commit with the rows they summarise
+            if row_count and has_rollup(table_name):
+                upsert_rollup(conn, table_name, df)
+        report_date = df["report_date"].iloc[0] if "report_date" in df.columns else None
+        return row_count, report_date
+
+    try:
+        if table_name in stream_func_map:
+            print(f"🧪 Streaming ETL function: {stream_func_map[table_name].__name__}")
+            row_count = load_file(table_name, file_name, content_hash, load_stream)
+        else:
+            print(f"🧪 Using ETL function: {etl_func.__name__}")
+            row_count = load_file(table_name, file_name, content_hash, load_frame)
+
+        if row_count:
+            safe_move_file(file_path, table_name, "processed")
+            print(f"✅ Finished processing {file_name} ({row_count} rows)\n")
+            return "success", row_count
+
+        queue_etl_log(table_name, file_name, row_count=0, status="empty", content_hash=content_hash)
+        safe_move_file(file_path, table_name, "rejected")
+        print(f"⚠️ No data found. Moved to rejected.\n")
+        return "empty", 0
+
+    except Exception as e:
+        queue_etl_log(table_name, file_name, status="error", content_hash=content_hash)
+        safe_move_file(file_path, table_name, "rejected")
+        print(f"❌ Error processing {file_name}: {e}")
+        return "error", 0
+
+def route(table_name, file_path):
+    """
+    Pre-flight a settled file (etl/preflight.py). Returns True if it should load
+    here; otherwise it has been moved to the incoming folder of the pipeline it
+    belongs to and queued there, or rejected.
+    """
+    action, detail = preflight(table_name, file_path)
+    if action == "load":
+        return True
+
+    file_name = os.path.basename(file_path)
+    if action == "reroute":
+        print(f"↪️ {file_name} is a {detail} report, not {table_name}: moving it to {detail}")
+        new_path = os.path.abspath(move_target(file_path, detail, "incoming"))
+        forward(file_path, new_path)
+        shutil.move(file_path, new_path)
+        enqueue(detail, new_path)
+        return False
+
+    start_run(table_name, file_name)
+    print(f"❌ Rejected {file_name} before parsing: {detail}")
+    queue_etl_log(table_name, file_name, row_count=0, status=f"malformed: {detail[:200]}")
+    safe_move_file(file_path, table_name, "rejected")
+    finish_run("malformed", 0)
+    resolve(file_path, table_name, "malformed", 0)
+    return False
+
+def parse_for_batch(table_name, file_path, content_hash):
+    """Parse one file of a micro-batch in its own metrics run. Returns a file dict for load_batch()."""
+    start_run(table_name, os.path.basename(file_path))
+    try:
+        df, error = etl_func_map[table_name](file_path), None
+    except Exception as e:
+        df, error = None, e
+    return {"path": file_path, "file_name": os.path.basename(file_path), "content_hash": content_hash,
+            "df": df, "run": snapshot(), "error": error}
+
+def load_batch_files(table_name, files):
+    """Load and commit one micro-batch; if it fails, process its files one at a time."""
+    rows = sum(len(file["df"]) for file in files if file["df"] is not None)
+    print(f"📦 Loading {len(files)} {table_name} file(s) as one batch ({rows} rows)")
+    taken = []
+    try:
+        with pooled_connection() as conn:
+            taken = load_batch(conn, table_name, files)
+            conn.commit()
+    except Exception as e:
+        after_rollback(taken)
+        print(f"⚠️ Batch failed ({str(e).strip().splitlines()[0]}); processing its {len(files)} file(s) one at a time")
+        for file in files:
+            process_file(table_name, file["path"])
+        return
+
+    for file in files:
+        use_run(file["run"])
+        if file["rows"]:
+            mark_loaded(table_name, file["file_name"], file["content_hash"])
+            archive_after_commit(table_name, file["file_name"], file["content_hash"])
+            safe_move_file(file["path"], table_name, "processed")
+            print(f"✅ Finished processing {file['file_name']} ({file['rows']} rows)")
+        else:
+            safe_move_file(file["path"], table_name, "rejected")
+            print(f"⚠️ No data found in {file['file_name']}. Moved to rejected.")
+        finish_run(file["status"], file["rows"])
+        resolve(file["path"], table_name, file["status"], file["rows"])
+    print()
+
+def process_batch(table_name, file_paths):
+    """
+    Load settled files that arrived together as micro-batches (utils/micro_batch.py),
+    parsing them concurrently. Duplicates, large and delta-mode files go through
+    process_file() one at a time once the batches have committed.
+    """
+    small, singles, hashes = [], [], set()
+    for file_path in file_paths:
+        file_name = os.path.basename(file_path)
+        content_hash = file_fingerprint(file_path)
+        if (is_file_already_loaded(table_name, file_name) or is_content_already_loaded(table_name, content_hash)
+                or content_hash in hashes or not batchable(table_name, file_path, content_hash)):
+            singles.append(file_path)
+            continue
+        hashes.add(content_hash)
+        small.append((file_path, content_hash))
+
+    with ThreadPoolExecutor(max_workers=min(len(small), os.cpu_count() or 1) or 1) as parsers:
+        parsed = list(parsers.map(lambda item: parse_for_batch(table_name, *item), small))
+
+    loadable = []
+    for file in parsed:
+        if file["error"] is None:
+            loadable.append((table_name, file))
+            continue
+        use_run(file["run"])
+        queue_etl_log(table_name, file["file_name"], status="error", content_hash=file["content_hash"])
+        safe_move_file(file["path"], table_name, "rejected")
+        print(f"❌ Error processing {file['file_name']}: {file['error']}")
+        finish_run("error", 0)
+        resolve(file["path"], table_name, "error", 0)
+
+    for _, files in coalesce(loadable):
+        load_batch_files(table_name, files)
+    for file_path in singles:
+        process_file(table_name, file_path)
+
+def pipeline_worker(table_name):
+    """
+    Drain one pipeline's queue; pipelines each have their own workers and run concurrently.
+    With ETL_BATCH_WINDOW_S set, files arriving within the window are loaded as micro-batches.
+    """
+    work_queue = work_queues[table_name]
+    while True:
+        file_paths = [work_queue.get()]
+        if BATCH_WINDOW_S > 0:
+            file_paths += drain_window(work_queue)
+        try:
+            settled = [path for path in file_paths if take_complete(path)]
+            unsettled = [path for path in file_paths if path not in settled]
+            if len(unsettled) > 1:
+                settled += wait_until_all_stable(unsettled)
+            elif unsettled and wait_until_stable(unsettled[0]):
+                settled += unsettled
+            elif unsettled:
+                print(f"⚠️ File disappeared before it settled: {os.path.basename(unsettled[0])}")
+            for file_path in unsettled:
+                if file_path not in settled:
+                    resolve(file_path, table_name, "missing", 0)
+
+            # Misfiled and malformed files are dealt with here, before fingerprinting or parsing
+            settled = [path for path in settled if route(table_name, path)]
+            if len(settled) > 1:
+                process_batch(table_name, settled)
+            elif settled:
+                process_file(table_name, settled[0])
+        except Exception as e:
+            print(f"❌ Worker error for {', '.join(os.path.basename(path) for path in file_paths)}: {e}")
+        finally:
+            for file_path in file_paths:
+                # Frees any submitter still waiting on a file that was never resolved
+                release(file_path, table_name)
+                work_queue.task_done()
+
+def start_workers():
+    for table_name in WATCH_PATHS:
+        for i in range(WORKERS_PER_PIPELINE):
+            worker = threading.Thread(target=pipeline_worker, args=(table_name,),
+                                      name=f"{table_name}-worker-{i + 1}", daemon=True)
+            worker.start()
+
+def queue_depths():
+    """Files waiting per pipeline (not counting the ones being processed)."""
+    return {table_name: work_queue.qsize() for table_name, work_queue in work_queues.items()}
+
+# === SUBMISSIONS ===
+# The watcher doubles as a warm ETL daemon: etl_submit.py, which imports only the
+# standard library, sends file paths over a Unix socket and the files go through
+# the same pipeline queues as watched files, on a process that already has pandas,
+# the parsers and the connection pool loaded. Each submission waits on a Future
+# that the worker resolves with the file's (status, row_count).
+#
+# Files named in a request are taken to be complete and skip the settle wait;
+# files found by a scan of the incoming folders may still be arriving, so they wait.
+#
+# The socket is readable and writable by the watcher's user only (ETL_SOCKET_MODE),
+# and only files under an incoming/ folder or an ETL_SUBMIT_ROOTS folder are
+# accepted: a submitted file is loaded and then moved away.
+#
+# A path is queued once: until its worker is done with it, a submission of the
+# same path (e.g. --scan finding a file the watcher already queued) waits on the
+# queued one. A file created again under that name meanwhile is queued once the
+# worker is done. Paths are absolute throughout.
+#
+# Protocol: one JSON request line {"files": [...], "pipeline": null, "scan": false};
+# the reply is one JSON line per file (files that could not be queued first), then
+# {"done": true, ...}.
+
+_waiters = {}
+_complete = set()
+_rerouted = set()
+_in_flight = set()   # queued or being processed
+_resolved = set()    # in flight, outcome already handed out
+_requeue = {}        # in flight, to be queued again (path -> table) when its worker is done
+_waiters_lock = threading.Lock()
+
+def pipeline_for(file_path):
+    """The pipeline whose incoming folder holds `file_path`, or None."""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    for table_name, watch_dir in WATCH_PATHS.items():
+        if folder == os.path.abspath(watch_dir):
+            return table_name
+    return None
+
+def submittable(file_path):
+    """True if the file, symlinks resolved, is under an incoming/ folder or an ETL_SUBMIT_ROOTS folder."""
+    real_path = os.path.realpath(file_path)
+    for root in [*WATCH_PATHS.values(), *SUBMIT_ROOTS]:
+        root = os.path.realpath(root)
+        if os.path.commonpath([real_path, root]) == root:
+            return True
+    return False
+
+def submit_file(table_name, file_path, complete=False):
+    """
+    Queue a file for its pipeline worker. The returned Future resolves to
+    (table_name, status, row_count); the table differs if the file was re-routed.
+    `complete` skips waiting for the file to settle.
+    """
+    file_path = os.path.abspath(file_path)
+    future = Future()
+    with _waiters_lock:
+        _waiters.setdefault(file_path, []).append(future)
+        if complete:
+            _complete.add(file_path)
+        if file_path in _in_flight:
+            # Wait on the queued file; if its outcome is already out, this is a new file by that name
+            if file_path in _resolved:
+                _requeue[file_path] = table_name
+            return future
+        _in_flight.add(file_path)
+    work_queues[table_name].put(file_path)
+    return future
+
+def enqueue(table_name, file_path):
+    """
+    Queue a watched file, unless that path is already queued or being processed:
+    then it is queued again once its worker is done (a new file by the same name
+    is loaded; the same file will have been moved away by then). Returns True if queued now.
+    """
+    with _waiters_lock:
+        if file_path in _in_flight:
+            _requeue[file_path] = table_name
+            return False
+        _in_flight.add(file_path)
+    work_queues[table_name].put(file_path)
+    return True
+
+def release(file_path, table_name):
+    """
+    A worker is done with a queued file: submitters of a file that was never
+    resolved get an error, and a file re-created under the same name is queued again.
+    """
+    with _waiters_lock:
+        failed = [] if file_path in _resolved else _waiters.pop(file_path, [])
+        _in_flight.discard(file_path)
+        _resolved.discard(file_path)
+        again = _requeue.pop(file_path, None)
+        missing = []
+        if again and os.path.isfile(file_path):
+            _in_flight.add(file_path)
+        else:
+            again = None
+            missing = _waiters.pop(file_path, [])
+            _complete.discard(file_path)
+    for future in failed:
+        future.set_result((table_name, "error", 0))
+    for future in missing:
+        future.set_result((table_name, "missing", 0))
+    if again:
+        work_queues[again].put(file_path)
 
+def take_complete(file_path):
+    """True (once) if the file was submitted as complete."""
+    with _waiters_lock:
+        if file_path in _complete:
+            _complete.discard(file_path)
+            return True
+    return False
+
+def resolve(file_path, table_name, status, row_count):
+    """Hand a file's outcome to whoever submitted it (no-op for files nobody waits on)."""
+    with _waiters_lock:
+        futures = _waiters.pop(file_path, [])
+        if file_path in _in_flight:
+            _resolved.add(file_path)
+    for future in futures:
+        future.set_result((table_name, status, row_count))
+
+def forward(file_path, new_path):
+    """
+    A settled file is about to move to `new_path` in another incoming folder: its
+    submitters now wait on that, it need not settle again, and the watcher's event
+    for it is ignored (route() queues it).
+    """
+    with _waiters_lock:
+        if file_path in _waiters:
+            _waiters.setdefault(new_path, []).extend(_waiters.pop(file_path))
+        _complete.add(new_path)
+        _rerouted.add(new_path)
+
+def take_rerouted(file_path):
+    with _waiters_lock:
+        if file_path in _rerouted:
+            _rerouted.discard(file_path)
+            return True
+    return False
+
+def incoming_files():
+    """(table_name, path) for every file sitting in an incoming folder, oldest first."""
+    found = []
+    for table_name, watch_dir in WATCH_PATHS.items():
+        for entry in os.scandir(watch_dir):
+            if entry.is_file() and entry.name.endswith((".txt", ".tsv", ".csv")):
+                found.append((entry.stat().st_mtime, table_name, os.path.abspath(entry.path)))
+    return [(table_name, path) for _, table_name, path in sorted(found)]
+
+class SubmitHandler(socketserver.StreamRequestHandler):
+    """One request per connection, answered as each of its files finishes."""
+    def reply(self, **fields):
+        self.wfile.write((json.dumps(fields, default=str) + "\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        start = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            self.reply(done=True, error=f"bad request: {e}")
+            return
+
+        work = [(table_name, path, False) for table_name, path in incoming_files()] if request.get("scan") else []
+        for path in request.get("files") or []:
+            path = os.path.abspath(path)
+            work.append((request.get("pipeline") or pipeline_for(path), path, True))
+
+        submitted = []
+        for table_name, path, complete in work:
+            if table_name not in WATCH_PATHS:
+                self.reply(file=path, pipeline=table_name, status="unknown pipeline", rows=0)
+            elif not submittable(path):
+                print(f"⛔ Refused submission outside the incoming folders and ETL_SUBMIT_ROOTS: {path}")
+                self.reply(file=path, pipeline=table_name, status="not allowed", rows=0)
+            elif not os.path.isfile(path):
+                self.reply(file=path, pipeline=table_name, status="missing", rows=0)
+            else:
+                print(f"📨 Submitted file: {os.path.basename(path)} for table {table_name}")
+                submitted.append((table_name, path, submit_file(table_name, path, complete)))
+
+        for _, path, future in submitted:
+            table_name, status, row_count = future.result()
+            self.reply(file=path, pipeline=table_name, status=status, rows=row_count,
+                       seconds=round(time.perf_counter() - start, 3))
+        self.reply(done=True, files=len(work), seconds=round(time.perf_counter() - start, 3))
+
+def socket_in_use(socket_path):
+    """True if something is listening on `socket_path`; False if it is missing or left behind by a dead watcher."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            if e.errno == errno.ECONNREFUSED:
+                return False
+            raise
+    return True
+
+def start_submit_server(socket_path=SUBMIT_SOCKET):
+    """
+    Serve etl_submit.py on a background thread. Returns the server, or None if
+    disabled. Exits if another watcher is already listening on the socket.
+    """
+    if not socket_path:
+        return None
+    if socket_in_use(socket_path):
+        sys.exit(f"❌ A watcher is already running on {os.path.abspath(socket_path)}")
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # left behind by a watcher that did not shut down cleanly
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, SubmitHandler, bind_and_activate=False)
+    server.daemon_threads = True
+    # Nobody can connect until listen(), so the socket is never open to others
+    server.server_bind()
+    os.chmod(socket_path, SUBMIT_SOCKET_MODE)
+    server.server_activate()
+    threading.Thread(target=server.serve_forever, name="submit-server", daemon=True).start()
+    print(f"🔌 Accepting submissions on {os.path.abspath(socket_path)}")
+    return server
+
+# === HELPERS ===
 def safe_move_file(src_path, pipeline_key, subfolder):
+    dest_path = move_target(src_path, pipeline_key, subfolder)
+    shutil.move(src_path, dest_path)
+    return dest_path
+
+def move_target(src_path, pipeline_key, subfolder):
+    """Where safe_move_file() puts a file: a timestamp is added if the name is taken."""
     target_dir = os.path.join("data_files", pipeline_key, subfolder)
     os.makedirs(target_dir, exist_ok=True)
 
@@ -113,11 +659,12 @@ def safe_move_file(src_path, pipeline_key, subfolder):
         name, ext = os.path.splitext(file_name)
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         dest_path = os.path.join(target_dir, f"{name}_{timestamp}{ext}")
-
-    shutil.move(src_path, dest_path)
+    return dest_path
 
 # === START WATCHING ===
 def start_watching():
+    print(f"🗂️ Loaded {warm_loaded_index()} previously loaded files from etl_log")
+
     observer = Observer()
     for key, path in WATCH_PATHS.items():
         abs_path = os.path.abspath(path)
@@ -125,13 +672,30 @@ def start_watching():
         observer.schedule(NewFileHandler(), path=abs_path, recursive=False)
         print(f"👀 Watching: {abs_path}")
 
+    # Before anything is queued: a second watcher must not process the same folders
+    server = start_submit_server()
+    start_workers()
     observer.start()
+    last_depths = None
     try:
         while True:
             time.sleep(1)
+            depths = queue_depths()
+            if depths != last_depths and (any(depths.values()) or last_depths):
+                print("📥 Queue depth: " + ", ".join(f"{k}={v}" for k, v in depths.items()))
+            last_depths = depths
+            try:
+                flush_etl_log()
+            except Exception as e:
+                print(f"❌ Could not write etl_log rows (will retry): {e}")
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    if server:
+        server.shutdown()
+        server.server_close()
+        os.remove(SUBMIT_SOCKET)
+    flush_etl_log()
 
 if __name__ == "__main__":
     start_watching()